@@ -0,0 +1,302 @@
+"""
+Пакетне пакування маніфестів (JSON у форматі "контейнер + коробки") без GUI.
+
+Кожен маніфест пакується в окремому процесі; одночасно працює не більше
+workers процесів. Після timeout задача повертає частковий результат
+(статус "partial"), а процес, що не відповів і після TIMEOUT_GRACE, зупиняється.
+Результати видаються у порядку завершення і записуються як JSON Lines:
+
+    python batch.py manifests/ -o results.jsonl --workers 4 --timeout 120
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from optimizer import Container, Item, PackingOptimizer
+from result_sink import NullSink
+from scoring import POLICIES
+
+# Скільки секунд після дедлайну чекати на частковий результат перед terminate()
+TIMEOUT_GRACE = 5.0
+
+
+def load_manifest(path: str) -> Tuple[Container, List[Item]]:
+    """
+    Зчитує маніфест: перший елемент – контейнер, решта – коробки
+    (ті самі вимоги до полів, що й у GUI "Зчитати JSON").
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return parse_manifest(data, os.path.splitext(os.path.basename(path))[0])
+
+
+def parse_manifest(data: Any, name: str = "container") -> Tuple[Container, List[Item]]:
+    """Маніфест, уже розібраний з JSON; name – назва контейнера за замовчуванням."""
+    if not isinstance(data, list) or len(data) < 2:
+        raise ValueError("JSON повинен містити контейнер + щонайменше 1 коробку")
+
+    cont = data[0]
+    for key in ("width", "height", "depth", "max_weight"):
+        if key not in cont:
+            raise ValueError(f"Контейнеру бракує поля '{key}'")
+    container = Container(
+        width=cont["width"],
+        height=cont["height"],
+        depth=cont["depth"],
+        max_weight=cont["max_weight"],
+        name=cont.get("name", name),
+        cost=cont.get("cost", 1.0)
+    )
+
+    items = []
+    for box in data[1:]:
+        for key in ("name", "width", "height", "depth", "weight", "quantity"):
+            if key not in box:
+                raise ValueError(f"Коробці бракує поля '{key}'")
+        items.append(Item(
+            name=box["name"],
+            width=box["width"],
+            height=box["height"],
+            depth=box["depth"],
+            weight=box["weight"],
+            quantity=box["quantity"]
+        ))
+    return container, items
+
+
+def expand_manifests(paths: Sequence[str]) -> List[str]:
+    """Каталоги розгортаються у відсортований список *.json усередині них."""
+    manifests = []
+    for path in paths:
+        if os.path.isdir(path):
+            manifests.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(".json")
+            ))
+        else:
+            manifests.append(path)
+    return manifests
+
+
+def pack_manifest(path: str, optimizer_options: Optional[Dict[str, Any]] = None,
+                  deadline: Optional[float] = None, instrument_dir: Optional[str] = None,
+                  profile: bool = False) -> Dict[str, Any]:
+    """
+    Пакує один маніфест і повертає запис результату. Якщо настав deadline
+    (time.time()), повертається частковий результат зі статусом "partial".
+    З instrument_dir у ньому з'являються <маніфест>.stats.json та, з profile,
+    <маніфест>.prof (pstats).
+    """
+    started = time.time()
+    container, items = load_manifest(path)
+    # Результати й так потрапляють у JSON Lines – result.txt не потрібен
+    options = {"result_sink": NullSink(), **(optimizer_options or {})}
+    optimizer = PackingOptimizer(container, **options)
+    for item in items:
+        optimizer.add_item(item)
+    if instrument_dir:
+        os.makedirs(instrument_dir, exist_ok=True)
+        base = os.path.join(instrument_dir, os.path.splitext(os.path.basename(path))[0])
+        optimizer.enable_instrumentation(base + ".stats.json", base + ".prof" if profile else None)
+
+    pack_started = time.time()
+    utilization = optimizer.pack(deadline=deadline)
+    finished = time.time()
+    return {
+        "manifest": path,
+        "status": "partial" if optimizer.interrupted else "ok",
+        "container": {
+            "width": container.width,
+            "height": container.height,
+            "depth": container.depth,
+            "max_weight": container.max_weight
+        },
+        "space_utilization": utilization,
+        "total_weight": optimizer.current_weight,
+        "packed_count": len(optimizer.packed_items),
+        "packed_items": optimizer.packed_items,
+        "failed_items": optimizer.failed_items,
+        "failed_types": optimizer.failed_types,
+        "skipped_items": optimizer.skipped_items,
+        "pending_items": optimizer.pending_items,
+        "search_stats": optimizer.search_stats,
+        "pack_seconds": finished - pack_started,
+        "total_seconds": finished - started
+    }
+
+
+def _run_job(path: str, optimizer_options: Optional[Dict[str, Any]], deadline: Optional[float],
+             instrument_dir: Optional[str], profile: bool, conn):
+    try:
+        result = pack_manifest(path, optimizer_options, deadline, instrument_dir, profile)
+    except Exception as e:
+        result = {"manifest": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+    conn.send(result)
+    conn.close()
+
+
+def run_batch(manifests: Sequence[str], workers: int = 1, timeout: Optional[float] = None,
+              optimizer_options: Optional[Dict[str, Any]] = None, instrument_dir: Optional[str] = None,
+              profile: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Пакує маніфести в пулі з не більше ніж workers процесів і видає
+    результати в міру завершення. Задача, що працює довше за timeout секунд,
+    повертає частковий результат ("partial"); якщо процес не відповів і
+    через TIMEOUT_GRACE секунд, він зупиняється із записом "timeout".
+    """
+    if workers < 1:
+        raise ValueError("Кількість процесів має бути не менше 1")
+    ctx = multiprocessing.get_context()
+    pending = list(manifests)
+    running = {}  # reader -> (process, manifest, start time)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            path = pending.pop(0)
+            reader, writer = ctx.Pipe(duplex=False)
+            started = time.time()
+            deadline = started + timeout if timeout is not None else None
+            process = ctx.Process(target=_run_job, daemon=True, args=(
+                path, optimizer_options, deadline, instrument_dir, profile, writer))
+            process.start()
+            writer.close()
+            running[reader] = (process, path, started)
+
+        now = time.time()
+        wait_for = None
+        if timeout is not None:
+            limit = timeout + TIMEOUT_GRACE
+            wait_for = max(0.0, min(started + limit for _, _, started in running.values()) - now)
+        ready = wait(list(running), timeout=wait_for)
+
+        for reader in ready:
+            process, path, started = running.pop(reader)
+            try:
+                result = reader.recv()
+            except EOFError:
+                result = {"manifest": path, "status": "error",
+                          "error": f"Процес завершився з кодом {process.exitcode}"}
+            reader.close()
+            process.join()
+            result.setdefault("total_seconds", time.time() - started)
+            yield result
+
+        if timeout is not None:
+            now = time.time()
+            for reader, (process, path, started) in list(running.items()):
+                if now - started >= timeout + TIMEOUT_GRACE:
+                    process.terminate()
+                    process.join()
+                    reader.close()
+                    del running[reader]
+                    yield {"manifest": path, "status": "timeout", "total_seconds": now - started}
+
+
+def _manifest_boxes(path: str) -> List[Dict[str, Any]]:
+    """Коробки маніфесту у форматі boxes_data з GUI."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    keys = ("name", "width", "height", "depth", "weight", "quantity")
+    return [{key: box[key] for key in keys} for box in data[1:]]
+
+
+def save_results(results: Iterator[Dict[str, Any]], db_path: str,
+                 batch_size: int = 50) -> Iterator[Dict[str, Any]]:
+    """
+    Пропускає результати далі й зберігає успішні ("ok"/"partial") як сесії
+    в db_path – пачками по batch_size в одній транзакції. Пише лише цей
+    (батьківський) процес, тож робочі процеси не змагаються за БД.
+    """
+    from db import SessionStore
+
+    store = SessionStore(db_path)
+    pending = []
+    try:
+        for result in results:
+            if result.get("status") in ("ok", "partial"):
+                pending.append({
+                    "name": os.path.splitext(os.path.basename(result["manifest"]))[0],
+                    "container": result["container"],
+                    "boxes": _manifest_boxes(result["manifest"]),
+                    "packed_items": result["packed_items"],
+                    "failed_items": result["failed_items"],
+                    "failed_types": result["failed_types"],
+                    "space_utilization": result["space_utilization"],
+                    "total_weight": result["total_weight"]
+                })
+                if len(pending) >= batch_size:
+                    store.save_sessions(pending)
+                    pending = []
+            yield result
+        if pending:
+            store.save_sessions(pending)
+    finally:
+        store.close()
+
+
+def _json_default(obj):
+    # numpy-скаляри та масиви в позиціях/розмірах -> вбудовані типи
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_jsonl(results: Iterator[Dict[str, Any]], out: TextIO) -> int:
+    """Записує кожен результат окремим рядком одразу після його отримання."""
+    count = 0
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False, default=_json_default) + "\n")
+        out.flush()
+        count += 1
+    return count
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Пакетне пакування JSON-маніфестів")
+    parser.add_argument("manifests", nargs="+", help="файли маніфестів або каталоги з ними")
+    parser.add_argument("-o", "--output", default="-", help="файл JSON Lines (за замовчуванням stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--timeout", type=float, default=None, help="ліміт часу на маніфест, с")
+    parser.add_argument("--engine", choices=PackingOptimizer.ENGINES, default="grid")
+    parser.add_argument("--strategy", choices=PackingOptimizer.STRATEGIES, default="exhaustive")
+    parser.add_argument("--search-mode", choices=PackingOptimizer.SEARCH_MODES, default="vectorized")
+    parser.add_argument("--occupancy", choices=PackingOptimizer.OCCUPANCIES, default="dense")
+    parser.add_argument("--grid-size", type=int, default=100, help="крок сітки, мм")
+    parser.add_argument("--coarse-factor", type=int, default=1,
+                        help="розмір блоку грубої сітки в клітинках для пошуку coarse-to-fine")
+    parser.add_argument("--scoring", choices=sorted(POLICIES), default="lowest_contact",
+                        help="політика вибору позиції")
+    parser.add_argument("--instrument", default=None, metavar="DIR",
+                        help="каталог для статистики гарячих методів (<маніфест>.stats.json)")
+    parser.add_argument("--profile", action="store_true",
+                        help="разом з --instrument записувати профіль cProfile (<маніфест>.prof)")
+    parser.add_argument("--db", default=None, help="зберегти результати як сесії в цій БД SQLite")
+    args = parser.parse_args(argv)
+
+    options = {"engine": args.engine, "strategy": args.strategy, "search_mode": args.search_mode,
+               "occupancy": args.occupancy, "grid_size": args.grid_size,
+               "coarse_factor": args.coarse_factor, "scoring": POLICIES[args.scoring]()}
+    results = run_batch(expand_manifests(args.manifests), workers=args.workers,
+                        timeout=args.timeout, optimizer_options=options,
+                        instrument_dir=args.instrument, profile=args.profile)
+    if args.db:
+        results = save_results(results, args.db)
+    if args.output == "-":
+        write_jsonl(results, sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            write_jsonl(results, out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
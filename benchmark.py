@@ -0,0 +1,250 @@
+"""
+Відтворюваний бенчмарк PackingOptimizer.pack() на маніфестах з репозиторію
+та синтетичних маніфестах на 500–5000 коробок.
+
+Кожен маніфест пакується з кожним кроком сітки та стратегією; для кожного
+запуску записуються час, пікова пам'ять (tracemalloc), кількість оцінених
+кандидатів і заповнення. Результати – JSON, який можна порівняти з
+попереднім запуском, щоб помітити регресії:
+
+    python benchmark.py -o bench.json
+    python benchmark.py --synthetic 500 2000 5000 --grid-sizes 100 --strategies extreme_points
+    python benchmark.py -o new.json --compare bench.json --tolerance 0.25
+    python benchmark.py --grid-sizes 20 --strategies exhaustive --workers 1 4
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from batch import parse_manifest
+from optimizer import PackingOptimizer
+
+DEFAULT_MANIFESTS = (
+    "small_container.json",
+    "medium_container.json",
+    "big_container.json",
+    "container_boxes.json",
+    "container_boxes_extended.json",
+    "container_with_70_boxes.json"
+)
+DEFAULT_GRID_SIZES = (100, 50)
+DEFAULT_STRATEGIES = PackingOptimizer.STRATEGIES
+
+# 40-футовий контейнер, як у container_boxes.json
+SYNTHETIC_CONTAINER = {"width": 2438, "height": 2591, "depth": 12192, "max_weight": 26000}
+
+
+def generate_manifest(n_boxes: int, seed: int = 0, fill: float = 1.1,
+                      container: Optional[dict] = None) -> list:
+    """
+    Синтетичний маніфест на n_boxes коробок. Розміри коробок масштабуються так,
+    щоб їхній сумарний об'єм становив fill від об'єму контейнера, – тож
+    і на 500, і на 5000 коробок контейнер наповнюється до кінця.
+    Той самий seed дає той самий маніфест.
+    """
+    rng = random.Random(seed)
+    container = dict(container or SYNTHETIC_CONTAINER)
+    volume = container["width"] * container["height"] * container["depth"]
+    types = min(n_boxes, max(10, n_boxes // 10))
+
+    # Відносні розміри 1..3 по кожній осі, далі – спільний масштаб
+    shapes = [tuple(rng.uniform(1.0, 3.0) for _ in range(3)) for _ in range(types)]
+    counts = [1] * types
+    for _ in range(n_boxes - types):
+        counts[rng.randrange(types)] += 1
+    unit_volume = sum(c * a * b * h for c, (a, b, h) in zip(counts, shapes))
+    scale = (fill * volume / unit_volume) ** (1 / 3)
+
+    boxes = []
+    for index, ((a, b, h), count) in enumerate(zip(shapes, counts), start=1):
+        width, height, depth = (max(1, round(v * scale)) for v in (a, b, h))
+        # Густина 100–300 кг/м³
+        weight = round(width * height * depth * 1e-9 * rng.uniform(100, 300), 1)
+        boxes.append({"id": index, "name": f"Box {index}", "width": width, "height": height,
+                      "depth": depth, "weight": weight, "quantity": count})
+    container["name"] = f"synthetic_{n_boxes}"
+    container["max_weight"] = max(container["max_weight"], sum(b["weight"] * b["quantity"] for b in boxes))
+    return [container] + boxes
+
+
+def run_case(name: str, data: list, grid_size: int, strategy: str, engine: str = "grid",
+             repeats: int = 1, measure_memory: bool = True,
+             case_timeout: Optional[float] = None, workers: int = 1) -> Dict[str, Any]:
+    """
+    Пакує маніфест repeats разів і повертає запис бенчмарку. Час – мінімум
+    і медіана по запусках без tracemalloc; пам'ять – окремий запуск під
+    tracemalloc (він повільніший, тому в час не входить).
+    """
+    container, items = parse_manifest(data, name)
+
+    def pack(deadline: Optional[float]) -> PackingOptimizer:
+        optimizer = PackingOptimizer(container, engine=engine, strategy=strategy, grid_size=grid_size,
+                                     workers=workers)
+        for item in items:
+            optimizer.add_item(item)
+        optimizer.pack(sort_items=True, write_report=False, deadline=deadline)
+        return optimizer
+
+    times = []
+    optimizer = None
+    for _ in range(max(repeats, 1)):
+        started = time.perf_counter()
+        optimizer = pack(time.time() + case_timeout if case_timeout else None)
+        times.append(time.perf_counter() - started)
+
+    peak = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            pack(time.time() + case_timeout if case_timeout else None)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "manifest": name,
+        "boxes": len(optimizer.items),
+        "engine": engine,
+        "strategy": strategy,
+        "grid_size": grid_size,
+        "workers": workers,
+        "wall_seconds": min(times),
+        "wall_seconds_median": statistics.median(times),
+        "peak_memory_bytes": peak,
+        "candidates": optimizer.search_stats["candidates_scored"],
+        "search_stats": dict(optimizer.search_stats),
+        "space_utilization": optimizer.space_utilization,
+        "packed_count": len(optimizer.packed_items),
+        "failed_count": sum(optimizer.failed_items.values()),
+        "interrupted": optimizer.interrupted
+    }
+
+
+def run_suite(manifests: Dict[str, list], grid_sizes: Sequence[int], strategies: Sequence[str],
+              engine: str = "grid", repeats: int = 1, measure_memory: bool = True,
+              case_timeout: Optional[float] = None, log=None,
+              workers: Sequence[int] = (1,)) -> List[Dict[str, Any]]:
+    """Усі комбінації маніфест × крок сітки × стратегія × потоки, по черзі в цьому процесі."""
+    results = []
+    for name, data in manifests.items():
+        for grid_size in grid_sizes:
+            for strategy in strategies:
+                for threads in workers:
+                    record = run_case(name, data, grid_size, strategy, engine, repeats,
+                                      measure_memory, case_timeout, threads)
+                    results.append(record)
+                    if log:
+                        log(record)
+    return results
+
+
+def _case_key(record: Dict[str, Any]) -> tuple:
+    # Записи без workers – з попередніх версій бенчмарку, тобто один потік
+    return (record["manifest"], record["engine"], record["strategy"], record["grid_size"],
+            record.get("workers", 1))
+
+
+def compare(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]],
+            tolerance: float = 0.2) -> List[str]:
+    """
+    Регресії відносно baseline: час або пам'ять зросли більше ніж на
+    tolerance (частка), або змінилося заповнення чи кількість розміщених коробок.
+    """
+    previous = {_case_key(r): r for r in baseline}
+    problems = []
+    for record in current:
+        old = previous.get(_case_key(record))
+        if old is None:
+            continue
+        case = "{} [{}/{}, grid {}, workers {}]".format(*_case_key(record))
+        if record["wall_seconds"] > old["wall_seconds"] * (1 + tolerance):
+            problems.append(f"{case}: час {old['wall_seconds']:.3f} -> {record['wall_seconds']:.3f} с")
+        if (old.get("peak_memory_bytes") and record.get("peak_memory_bytes")
+                and record["peak_memory_bytes"] > old["peak_memory_bytes"] * (1 + tolerance)):
+            problems.append(f"{case}: пам'ять {old['peak_memory_bytes']} -> {record['peak_memory_bytes']} байт")
+        if (abs(record["space_utilization"] - old["space_utilization"]) > 1e-6
+                or record["packed_count"] != old["packed_count"]):
+            problems.append(f"{case}: заповнення {old['space_utilization']:.2f}% -> "
+                            f"{record['space_utilization']:.2f}%, розміщено "
+                            f"{old['packed_count']} -> {record['packed_count']}")
+    return problems
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк PackingOptimizer.pack()")
+    parser.add_argument("manifests", nargs="*", help="маніфести (за замовчуванням – ті, що в репозиторії)")
+    parser.add_argument("-o", "--output", default="-", help="файл JSON (за замовчуванням stdout)")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[],
+                        help="додати синтетичні маніфести на задану кількість коробок")
+    parser.add_argument("--seed", type=int, default=0, help="seed синтетичних маніфестів")
+    parser.add_argument("--only-synthetic", action="store_true", help="не брати маніфести з репозиторію")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=list(DEFAULT_GRID_SIZES))
+    parser.add_argument("--strategies", nargs="+", choices=PackingOptimizer.STRATEGIES,
+                        default=list(DEFAULT_STRATEGIES))
+    parser.add_argument("--engine", choices=PackingOptimizer.ENGINES, default="grid")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1],
+                        help="кількості потоків пошуку, з якими пакується кожен випадок")
+    parser.add_argument("--repeats", type=int, default=1, help="запусків на вимірювання часу")
+    parser.add_argument("--no-memory", action="store_true", help="не вимірювати пікову пам'ять")
+    parser.add_argument("--case-timeout", type=float, default=None,
+                        help="ліміт часу на одне пакування, с (далі – частковий результат)")
+    parser.add_argument("--compare", default=None, help="попередній JSON для пошуку регресій")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустиме сповільнення (частка)")
+    args = parser.parse_args(argv)
+
+    manifests = {}
+    if not args.only_synthetic:
+        paths = args.manifests or [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                                   for name in DEFAULT_MANIFESTS]
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                manifests[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    for n_boxes in args.synthetic:
+        manifests[f"synthetic_{n_boxes}"] = generate_manifest(n_boxes, seed=args.seed)
+
+    def log(record):
+        print(f"{record['manifest']:<32} {record['strategy']:<15} grid {record['grid_size']:>4} "
+              f"x{record['workers']}: "
+              f"{record['wall_seconds']:8.3f} с  {record['space_utilization']:6.2f}%  "
+              f"{record['candidates']} кандидатів", file=sys.stderr)
+
+    results = run_suite(manifests, args.grid_sizes, args.strategies, args.engine, args.repeats,
+                        not args.no_memory, args.case_timeout, log, args.workers)
+    report = {"environment": environment(), "synthetic_seed": args.seed, "results": results}
+    if args.output == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            json.dump(report, out, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(json.load(f)["results"], results, args.tolerance)
+        for problem in problems:
+            print(f"Регресія: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
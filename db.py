@@ -1,115 +1,734 @@
 import sqlite3
+import io
 import json
-import pickle
+import threading
 import time
 import os
-from typing import List, Dict, Any
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 import numpy as np  # <--- Додано імпорт numpy для _to_native
                           
 DB_PATH = "sessions/packing_sessions.db"
 
-def init_db(db_path: str = DB_PATH) -> None:
+# Нормалізована схема: типи контейнерів і коробок спільні для всіх сесій,
+# а замовлені коробки, розміщення та невдачі – рядки окремих таблиць, тож
+# аналітика рахується в SQL без розбору JSON
+SCHEMA = (
     """
-    Ініціалізує базу даних: створює таблицю sessions з назвою, timestamp,
-    даними контейнера, коробок та фігурою, якщо її немає.
+    CREATE TABLE IF NOT EXISTS containers (
+        id INTEGER PRIMARY KEY,
+        width REAL NOT NULL,
+        height REAL NOT NULL,
+        depth REAL NOT NULL,
+        max_weight REAL NOT NULL,
+        UNIQUE (width, height, depth, max_weight)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS item_types (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        width REAL NOT NULL,
+        height REAL NOT NULL,
+        depth REAL NOT NULL,
+        weight REAL NOT NULL,
+        UNIQUE (name, width, height, depth, weight)
+    )
+    """,
     """
-    db_dir = os.path.dirname(db_path)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir, exist_ok=True)
-
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("""
     CREATE TABLE IF NOT EXISTS sessions (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
         timestamp TEXT NOT NULL,
-        container_json TEXT NOT NULL,
-        boxes_json TEXT NOT NULL,
-        fig_pickle BLOB NOT NULL,
-        packed_items_json TEXT NOT NULL DEFAULT '[]'
+        container_id INTEGER NOT NULL REFERENCES containers (id),
+        space_utilization REAL NOT NULL DEFAULT 0,
+        total_weight REAL NOT NULL DEFAULT 0,
+        packed_count INTEGER NOT NULL DEFAULT 0,
+        failed_count INTEGER NOT NULL DEFAULT 0
     )
-    """)
-    conn.commit()
-    conn.close()
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_items (
+        session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        item_type_id INTEGER NOT NULL REFERENCES item_types (id),
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (session_id, seq)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS placements (
+        session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        item_type_id INTEGER NOT NULL REFERENCES item_types (id),
+        x REAL NOT NULL,
+        y REAL NOT NULL,
+        z REAL NOT NULL,
+        width REAL NOT NULL,
+        depth REAL NOT NULL,
+        height REAL NOT NULL,
+        color INTEGER NOT NULL,
+        PRIMARY KEY (session_id, seq)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS failures (
+        session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+        item_type_id INTEGER NOT NULL REFERENCES item_types (id),
+        count INTEGER NOT NULL,
+        PRIMARY KEY (session_id, item_type_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sessions_container ON sessions (container_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_session_items_type ON session_items (item_type_id)",
+    "CREATE INDEX IF NOT EXISTS idx_placements_type ON placements (item_type_id)",
+    "CREATE INDEX IF NOT EXISTS idx_failures_type ON failures (item_type_id)"
+)
+
+
+def _to_native(obj):
+    # рекурсивно конвертує numpy-типи в вбудовані Python-типи
+    if isinstance(obj, dict):
+        return {k: _to_native(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_native(v) for v in obj]
+    # перевіряємо на всі numpy-скалярні типи
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def pack_placements(packed_items: List[Dict[str, Any]]) -> bytes:
+    """
+    Стискає packed_items у компактні масиви NumPy (.npz): позиції та розміри
+    float64 (N, 3) – кеш результатів має відтворювати їх точно, колір uint8 (N, 3),
+    вага float64 і номер типу коробки uint32 в окремому переліку назв.
+    Жодних pickle – лише числові масиви.
+    """
+    names = sorted({item['name'] for item in packed_items})
+    type_index = {name: i for i, name in enumerate(names)}
+    count = len(packed_items)
+    arrays = {
+        "position": np.array([item['position'] for item in packed_items], dtype=np.float64).reshape(count, 3),
+        "size": np.array([item['size'] for item in packed_items], dtype=np.float64).reshape(count, 3),
+        "color": np.round(np.array([item['color'] for item in packed_items], dtype=float).reshape(count, 3)
+                          * 255).astype(np.uint8),
+        "weight": np.array([item['weight'] for item in packed_items], dtype=np.float64),
+        "type_id": np.array([type_index[item['name']] for item in packed_items], dtype=np.uint32),
+        "names": np.array(names, dtype=str)
+    }
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def unpack_placements(blob: bytes) -> List[Dict[str, Any]]:
+    """Відновлює packed_items (як у PackingOptimizer) з pack_placements()."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+        names = data["names"].tolist()
+        return [
+            {
+                'name': names[type_id],
+                'position': tuple(position.tolist()),
+                'size': tuple(size.tolist()),
+                'color': tuple((color / 255.0).tolist()),
+                'weight': float(weight)
+            }
+            for position, size, color, weight, type_id in zip(
+                data["position"], data["size"], data["color"], data["weight"], data["type_id"])
+        ]
+
+
+def _color_to_int(color) -> int:
+    r, g, b = (min(max(int(round(c * 255)), 0), 255) for c in color[:3])
+    return (r << 16) | (g << 8) | b
+
+
+def _int_to_color(value: int) -> tuple:
+    return ((value >> 16) & 255) / 255.0, ((value >> 8) & 255) / 255.0, (value & 255) / 255.0
+
+
+def _container_id(conn: sqlite3.Connection, container: Dict[str, Any]) -> int:
+    key = tuple(float(container[k]) for k in ("width", "height", "depth", "max_weight"))
+    conn.execute(_INSERT_CONTAINER, key)
+    return conn.execute(_SELECT_CONTAINER, key).fetchone()[0]
+
+
+def _item_type_id(conn: sqlite3.Connection, cache: Dict[tuple, int], name: str,
+                  width: float, height: float, depth: float, weight: float) -> int:
+    key = (name, float(width), float(height), float(depth), float(weight))
+    if key not in cache:
+        conn.execute(_INSERT_ITEM_TYPE, key)
+        cache[key] = conn.execute(_SELECT_ITEM_TYPE, key).fetchone()[0]
+    return cache[key]
+
+
+def _shape_key(name: str, dims, weight: float) -> tuple:
+    """Ключ типу коробки, однаковий для всіх її поворотів."""
+    return name, tuple(sorted(float(v) for v in dims)), float(weight)
+
+
+def _insert_session(conn: sqlite3.Connection, session: Dict[str, Any], session_id: Optional[int] = None) -> int:
+    """
+    Записує сесію в нормалізовані таблиці (у вже відкритій транзакції).
+    session – 'name', 'container', 'boxes', 'packed_items' та необов'язкові
+    'timestamp', 'failed_items' ({назва: кількість}), 'failed_types'
+    (невдачі за точним типом – див. PackingOptimizer.failed_types; без них
+    тип береться за назвою), 'space_utilization', 'total_weight' (без них
+    рахуються з розміщень).
+    """
+    container = _to_native(session["container"])
+    boxes = _to_native(session["boxes"])
+    packed_items = _to_native(session["packed_items"])
+    failed_items = session.get("failed_items") or {}
+    failed_types = _to_native(session.get("failed_types"))
+    cache = {}
+
+    utilization = session.get("space_utilization")
+    if utilization is None:
+        volume = container["width"] * container["height"] * container["depth"]
+        packed_volume = sum(w * d * h for w, d, h in (item['size'] for item in packed_items))
+        utilization = packed_volume / volume * 100.0 if volume else 0.0
+    total_weight = session.get("total_weight")
+    if total_weight is None:
+        total_weight = sum(item['weight'] for item in packed_items)
+
+    if failed_types is not None:
+        failed_count = sum(failed["count"] for failed in failed_types)
+    else:
+        failed_count = sum(failed_items.values())
+
+    session_id = conn.execute(_INSERT_SESSION, (
+        session_id, session["name"], session.get("timestamp") or time.strftime("%Y-%m-%d %H:%M:%S"),
+        _container_id(conn, container), float(utilization), float(total_weight),
+        len(packed_items), int(failed_count)
+    )).lastrowid
+
+    # Типи замовлених коробок. Розміщення мають повернутий розмір, тож тип
+    # розміщення шукається за назвою, вагою та відсортованими розмірами
+    types_by_shape = {}
+    types_by_name = defaultdict(set)
+    rows = []
+    for seq, box in enumerate(boxes):
+        type_id = _item_type_id(conn, cache, box["name"], box["width"], box["height"], box["depth"], box["weight"])
+        types_by_shape.setdefault(_shape_key(box["name"], (box["width"], box["height"], box["depth"]),
+                                             box["weight"]), type_id)
+        types_by_name[box["name"]].add(type_id)
+        rows.append((session_id, seq, type_id, int(box["quantity"])))
+    conn.executemany(_INSERT_SESSION_ITEM, rows)
+
+    rows = []
+    for seq, item in enumerate(packed_items):
+        (x, y, z), (w, d, h) = item['position'], item['size']
+        key = _shape_key(item['name'], (w, d, h), item['weight'])
+        type_id = types_by_shape.get(key)
+        if type_id is None:
+            # Коробки немає серед замовлених (старі сесії) – тип за розмірами розміщення
+            type_id = _item_type_id(conn, cache, item['name'], w, h, d, item['weight'])
+            types_by_shape[key] = type_id
+        rows.append((session_id, seq, type_id, x, y, z, w, d, h, _color_to_int(item['color'])))
+    conn.executemany(_INSERT_PLACEMENT, rows)
+
+    failures = defaultdict(int)
+    if failed_types is not None:
+        for failed in failed_types:
+            type_id = _item_type_id(conn, cache, failed["name"], failed["width"], failed["height"],
+                                    failed["depth"], failed["weight"])
+            failures[type_id] += int(failed["count"])
+    else:
+        # Лише назви: тип однозначний, тільки якщо серед замовлених він один
+        for name, count in failed_items.items():
+            if len(types_by_name[name]) != 1:
+                raise ValueError(f"Невдачі «{name}» не зіставляються з одним типом коробки – передайте failed_types")
+            failures[next(iter(types_by_name[name]))] += int(count)
+    rows = [(session_id, type_id, count) for type_id, count in failures.items()]
+    conn.executemany(_INSERT_FAILURE, rows)
+    return session_id
+
+
+def _migrate_legacy(conn: sqlite3.Connection, columns: set) -> None:
+    """
+    Переводить старі схеми на нормалізовану: і найпершу (container_json,
+    boxes_json, pickle фігури fig_pickle та packed_items_json), і проміжну
+    (розміщення у стиснутому blob placements). Фігури відкидаються – їх
+    малюємо наново; після перенесення VACUUM повертає звільнене місце.
+    """
+    packed_column = "packed_items_json" if "packed_items_json" in columns else "placements"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("ALTER TABLE sessions RENAME TO sessions_legacy")
+        # Повнотекстовий індекс посилався на стару таблицю – його буде перебудовано
+        conn.execute("DROP TABLE IF EXISTS sessions_fts")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        rows = conn.execute(
+            f"SELECT id, name, timestamp, container_json, boxes_json, {packed_column} FROM sessions_legacy ORDER BY id"
+        ).fetchall()
+        for sid, name, ts, cont, boxes, packed in rows:
+            if packed_column == "placements":
+                packed_items = unpack_placements(packed)
+            else:
+                packed_items = json.loads(packed or '[]')
+            _insert_session(conn, {"name": name, "timestamp": ts, "container": json.loads(cont),
+                                   "boxes": json.loads(boxes), "packed_items": packed_items}, sid)
+        conn.execute("DROP TABLE sessions_legacy")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("VACUUM")
+    # У режимі WAL файл БД зменшується лише після контрольної точки
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# Індекси для пошуку за датою та повнотекстовий індекс назв (FTS5, синхронізується тригерами)
+_SEARCH_SCHEMA = (
+    "CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp, id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts
+        USING fts5(name, content='sessions', content_rowid='id', tokenize='unicode61')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+        INSERT INTO sessions_fts (rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions BEGIN
+        INSERT INTO sessions_fts (sessions_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_fts_update AFTER UPDATE OF name ON sessions BEGIN
+        INSERT INTO sessions_fts (sessions_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO sessions_fts (rowid, name) VALUES (new.id, new.name);
+    END
+    """
+)
+
+
+def _create_search_index(conn: sqlite3.Connection) -> None:
+    """
+    Створює індекси пошуку. Якщо FTS-таблиця з'являється вперше (нова чи
+    стара БД), її заповнюють з наявних сесій. Без FTS5 пошук іде через LIKE.
+    """
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions_fts'"
+    ).fetchone() is not None
+    conn.execute(_SEARCH_SCHEMA[0])
+    try:
+        for statement in _SEARCH_SCHEMA[1:]:
+            conn.execute(statement)
+    except sqlite3.OperationalError as e:
+        print(f"[WARN] FTS5 недоступний, пошук за назвою без індексу: {e}")
+        return
+    if not existed:
+        conn.execute("INSERT INTO sessions_fts (sessions_fts) VALUES ('rebuild')")
+
+
+def _fts_query(text: str) -> str:
+    """Кожне слово запиту – префікс ("кор" знайде "коробки"), усі слова обов'язкові."""
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
+# Сталі тексти запитів: sqlite3 кешує підготовлені запити за текстом SQL
+_INSERT_CONTAINER = "INSERT OR IGNORE INTO containers (width, height, depth, max_weight) VALUES (?, ?, ?, ?)"
+_SELECT_CONTAINER = "SELECT id FROM containers WHERE width = ? AND height = ? AND depth = ? AND max_weight = ?"
+_INSERT_ITEM_TYPE = "INSERT OR IGNORE INTO item_types (name, width, height, depth, weight) VALUES (?, ?, ?, ?, ?)"
+_SELECT_ITEM_TYPE = """
+    SELECT id FROM item_types WHERE name = ? AND width = ? AND height = ? AND depth = ? AND weight = ?
+"""
+_INSERT_SESSION = """
+    INSERT INTO sessions
+        (id, name, timestamp, container_id, space_utilization, total_weight, packed_count, failed_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_SESSION_ITEM = "INSERT INTO session_items (session_id, seq, item_type_id, quantity) VALUES (?, ?, ?, ?)"
+_INSERT_PLACEMENT = """
+    INSERT INTO placements (session_id, seq, item_type_id, x, y, z, width, depth, height, color)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_FAILURE = "INSERT INTO failures (session_id, item_type_id, count) VALUES (?, ?, ?)"
+_LIST_SESSIONS = "SELECT id, name, timestamp FROM sessions ORDER BY id DESC"
+_LOAD_SESSION = """
+    SELECT s.name, s.timestamp, s.space_utilization, s.total_weight,
+           c.width, c.height, c.depth, c.max_weight
+    FROM sessions AS s JOIN containers AS c ON c.id = s.container_id
+    WHERE s.id = ?
+"""
+_LOAD_SESSION_ITEMS = """
+    SELECT t.name, t.width, t.height, t.depth, t.weight, i.quantity
+    FROM session_items AS i JOIN item_types AS t ON t.id = i.item_type_id
+    WHERE i.session_id = ? ORDER BY i.seq
+"""
+_LOAD_PLACEMENTS = """
+    SELECT t.name, p.x, p.y, p.z, p.width, p.depth, p.height, p.color, t.weight
+    FROM placements AS p JOIN item_types AS t ON t.id = p.item_type_id
+    WHERE p.session_id = ? ORDER BY p.seq
+"""
+_LOAD_FAILURES = """
+    SELECT t.name, t.width, t.height, t.depth, t.weight, f.count
+    FROM failures AS f JOIN item_types AS t ON t.id = f.item_type_id
+    WHERE f.session_id = ? ORDER BY t.id
+"""
+_DELETE_SESSION = "DELETE FROM sessions WHERE id = ?"
+
+
+class SessionStore:
+    """
+    Сховище сесій з довгоживучим з'єднанням на кожен потік: WAL дозволяє
+    читати під час запису, busy_timeout – чекати на блокування замість
+    "database is locked", а кеш підготовлених запитів прибирає повторний
+    розбір SQL. Записи виконуються в явних транзакціях BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, busy_timeout: float = 10.0, cached_statements: int = 128):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._initialized = False
+        self._fts = False
+
+    def connection(self) -> sqlite3.Connection:
+        # Після fork з'єднання батьківського процесу використовувати не можна
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._connections = []
+            self._initialized = False
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                                   cached_statements=self.cached_statements, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+            if not self._initialized:
+                self._init_schema(conn)
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        with self._lock:
+            if self._initialized:
+                return
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            if "container_json" in columns:
+                _migrate_legacy(conn, columns)
+            for statement in SCHEMA:
+                conn.execute(statement)
+            _create_search_index(conn)
+            self._fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sessions_fts'"
+            ).fetchone() is not None
+            self._initialized = True
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Транзакція запису; при винятку – відкат."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def save_session(self, name: str, container: Dict[str, Any], boxes: List[Dict[str, Any]],
+                     packed_items: List[Dict[str, Any]], failed_items: Optional[Dict[str, int]] = None,
+                     space_utilization: Optional[float] = None, total_weight: Optional[float] = None,
+                     failed_types: Optional[List[Dict[str, Any]]] = None) -> int:
+        return self.save_sessions([{"name": name, "container": container, "boxes": boxes,
+                                    "packed_items": packed_items, "failed_items": failed_items,
+                                    "failed_types": failed_types, "space_utilization": space_utilization,
+                                    "total_weight": total_weight}])[0]
+
+    def save_sessions(self, sessions: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Зберігає кілька сесій однією транзакцією (поля – як у _insert_session).
+        Повертає їхні id у тому ж порядку.
+        """
+        sessions = list(sessions)
+        with self.transaction() as conn:
+            return [_insert_session(conn, session) for session in sessions]
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        rows = self.connection().execute(_LIST_SESSIONS).fetchall()
+        return [{"id": row[0], "name": row[1], "timestamp": row[2]} for row in rows]
+
+    def list_sessions_page(self, limit: int = 100, before_id: Optional[int] = None,
+                           query: Optional[str] = None, date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Сторінка історії від найновіших: до limit сесій з id < before_id
+        (keyset-пагінація – наступна сторінка починається після останнього id).
+        query – слова з назви, date_from/date_to – "YYYY-MM-DD[ HH:MM:SS]" включно.
+        """
+        self.connection()
+        where, params = [], []
+        if before_id is not None:
+            where.append("s.id < ?")
+            params.append(before_id)
+        if date_from:
+            where.append("s.timestamp >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("s.timestamp <= ?")
+            params.append(date_to + " 23:59:59" if len(date_to) == 10 else date_to)
+        source = "sessions AS s"
+        if query and query.strip():
+            if self._fts:
+                source = "sessions_fts JOIN sessions AS s ON s.id = sessions_fts.rowid"
+                where.append("sessions_fts MATCH ?")
+                params.append(_fts_query(query))
+            else:
+                where.append("s.name LIKE ?")
+                params.append(f"%{query.strip()}%")
+        sql = f"SELECT s.id, s.name, s.timestamp FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY s.id DESC LIMIT ?"
+        params.append(limit)
+        rows = self.connection().execute(sql, params).fetchall()
+        return [{"id": row[0], "name": row[1], "timestamp": row[2]} for row in rows]
+
+    def load_session(self, session_id: int) -> Dict[str, Any]:
+        conn = self.connection()
+        row = conn.execute(_LOAD_SESSION, (session_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Session {session_id} not found")
+        boxes = [
+            {"name": name, "width": w, "height": h, "depth": d, "weight": weight, "quantity": quantity}
+            for name, w, h, d, weight, quantity in conn.execute(_LOAD_SESSION_ITEMS, (session_id,))
+        ]
+        packed_items = [
+            {'name': name, 'position': (x, y, z), 'size': (w, d, h), 'color': _int_to_color(color), 'weight': weight}
+            for name, x, y, z, w, d, h, color, weight in conn.execute(_LOAD_PLACEMENTS, (session_id,))
+        ]
+        failed_types = [
+            {"name": name, "width": w, "height": h, "depth": d, "weight": weight, "count": count}
+            for name, w, h, d, weight, count in conn.execute(_LOAD_FAILURES, (session_id,))
+        ]
+        failed_items = defaultdict(int)
+        for failed in failed_types:
+            failed_items[failed["name"]] += failed["count"]
+        return {
+            "id": session_id,
+            "name": row[0],
+            "timestamp": row[1],
+            "space_utilization": row[2],
+            "total_weight": row[3],
+            "container": {"width": row[4], "height": row[5], "depth": row[6], "max_weight": row[7]},
+            "boxes": boxes,
+            "packed_items": packed_items,
+            "failed_items": dict(failed_items),
+            "failed_types": failed_types
+        }
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        cursor = self.connection().execute(sql, tuple(params))
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _period(date_from: Optional[str], date_to: Optional[str], column: str = "s.timestamp") -> tuple:
+        where, params = [], []
+        if date_from:
+            where.append(f"{column} >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append(f"{column} <= ?")
+            params.append(date_to + " 23:59:59" if len(date_to) == 10 else date_to)
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def utilization_by_container(self, date_from: Optional[str] = None,
+                                 date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Середнє/мін./макс. заповнення й кількість сесій для кожного типу контейнера."""
+        where, params = self._period(date_from, date_to)
+        return self._query(f"""
+            SELECT c.width, c.height, c.depth, c.max_weight,
+                   COUNT(*) AS sessions,
+                   AVG(s.space_utilization) AS avg_utilization,
+                   MIN(s.space_utilization) AS min_utilization,
+                   MAX(s.space_utilization) AS max_utilization
+            FROM sessions AS s JOIN containers AS c ON c.id = s.container_id
+            {where}
+            GROUP BY c.id ORDER BY sessions DESC
+        """, params)
+
+    def utilization_by_day(self, date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Кількість сесій і середнє заповнення по днях."""
+        where, params = self._period(date_from, date_to)
+        return self._query(f"""
+            SELECT substr(s.timestamp, 1, 10) AS day, COUNT(*) AS sessions,
+                   AVG(s.space_utilization) AS avg_utilization
+            FROM sessions AS s {where}
+            GROUP BY day ORDER BY day
+        """, params)
+
+    def top_failures(self, limit: int = 20, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Типи коробок, що найчастіше не вміщуються: усього невдач, у скількох
+        сесіях, і частка від замовленої кількості.
+        """
+        where, params = self._period(date_from, date_to)
+        return self._query(f"""
+            SELECT t.name, t.width, t.height, t.depth, t.weight,
+                   SUM(f.count) AS failed,
+                   COUNT(DISTINCT f.session_id) AS sessions,
+                   CAST(SUM(f.count) AS REAL) / NULLIF((
+                       SELECT SUM(i.quantity) FROM session_items AS i
+                       JOIN sessions AS s ON s.id = i.session_id
+                       {where + (" AND" if where else " WHERE")} i.item_type_id = t.id
+                   ), 0) AS failure_rate
+            FROM failures AS f
+            JOIN item_types AS t ON t.id = f.item_type_id
+            JOIN sessions AS s ON s.id = f.session_id
+            {where}
+            GROUP BY t.id ORDER BY failed DESC LIMIT ?
+        """, params + params + [limit])
+
+    def delete_session(self, session_id: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(_DELETE_SESSION, (session_id,))
+
+    def close_thread(self) -> None:
+        """
+        Закриває з'єднання потоку, що викликав метод. Короткоживучі потоки
+        (наприклад, потік пакування в GUI) мають викликати його наприкінці,
+        інакше їхні з'єднання лишаються відкритими до close().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close(self) -> None:
+        """Закриває з'єднання всіх потоків."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+_stores: Dict[str, SessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: str = DB_PATH) -> SessionStore:
+    """Спільне для процесу сховище для db_path."""
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = SessionStore(db_path)
+        return _stores[key]
+
+
+def init_db(db_path: str = DB_PATH) -> None:
+    """
+    Ініціалізує базу даних: створює таблицю sessions з назвою, timestamp,
+    даними контейнера, коробок та розміщеннями, якщо її немає, і переводить
+    стару схему з pickle-фігурами на нову.
+    """
+    get_store(db_path).connection()
 
 def save_session_to_db(
     name: str,
     container: Dict[str, Any],
     boxes: List[Dict[str, Any]],
-    fig,
-    packed_items: List[Dict[str, Any]]
+    packed_items: List[Dict[str, Any]],
+    failed_items: Optional[Dict[str, int]] = None,
+    space_utilization: Optional[float] = None,
+    total_weight: Optional[float] = None,
+    db_path: str = DB_PATH,
+    failed_types: Optional[List[Dict[str, Any]]] = None
 ) -> int:
     """
     Зберігає сесію пакування у БД з вказаною назвою "name",
-    контейнер, коробки, згенеровану фігуру та результати packed_items.
+    контейнер, коробки, результати packed_items, невдачі та заповнення.
     Повертає id нової сесії.
     """
-    def _to_native(obj):
-        # рекурсивно конвертує numpy-типи в вбудовані Python-типи
-        if isinstance(obj, dict):
-            return {k: _to_native(v) for k, v in obj.items()}
-        if isinstance(obj, (list, tuple)):
-            return [_to_native(v) for v in obj]
-        # перевіряємо на всі numpy-скалярні типи
-        if isinstance(obj, np.generic):
-            return obj.item()
-        return obj
-
-    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    cont_json   = json.dumps(_to_native(container), ensure_ascii=False)
-    boxes_json  = json.dumps(_to_native(boxes), ensure_ascii=False)
-    packed_json = json.dumps(_to_native(packed_items), ensure_ascii=False)
-    fig_bytes   = pickle.dumps(fig)
-
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        """
-        INSERT INTO sessions
-            (name, timestamp, container_json, boxes_json, fig_pickle, packed_items_json)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (name, ts, cont_json, boxes_json, fig_bytes, packed_json)
-    )
-    session_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return session_id
+    return get_store(db_path).save_session(name, container, boxes, packed_items, failed_items,
+                                           space_utilization, total_weight, failed_types)
 
 def list_sessions(db_path: str = DB_PATH) -> List[Dict[str, Any]]:
     """
     Повертає список сесій із полями 'id', 'name' та 'timestamp'.
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("SELECT id, name, timestamp FROM sessions ORDER BY id DESC")
-    rows = c.fetchall()
-    conn.close()
-    return [{"id": row[0], "name": row[1], "timestamp": row[2]} for row in rows]
+    return get_store(db_path).list_sessions()
+
+
+def list_sessions_page(limit: int = 100, before_id: Optional[int] = None, query: Optional[str] = None,
+                       date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       db_path: str = DB_PATH) -> List[Dict[str, Any]]:
+    """
+    Сторінка історії сесій (див. SessionStore.list_sessions_page).
+    """
+    return get_store(db_path).list_sessions_page(limit, before_id, query, date_from, date_to)
+
+
+def load_session(session_id: int, db_path: str = DB_PATH) -> Dict[str, Any]:
+    """
+    Повертає сесію: 'id', 'name', 'timestamp', 'container', 'boxes'
+    та 'packed_items'.
+    """
+    return get_store(db_path).load_session(session_id)
 
 
 def load_fig_from_db(session_id: int, db_path: str = DB_PATH):
     """
-    Завантажує об'єкт Matplotlib Figure з БД за session_id.
+    Малює Matplotlib Figure сесії session_id за збереженими розміщеннями.
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("SELECT fig_pickle FROM sessions WHERE id = ?", (session_id,))
-    row = c.fetchone()
-    conn.close()
-    if row is None:
-        raise ValueError(f"Session {session_id} not found")
-    fig = pickle.loads(row[0])
-    return fig
+    from optimizer import Container, PackingOptimizer
+
+    session = load_session(session_id, db_path)
+    cont = session["container"]
+    optimizer = PackingOptimizer(Container(
+        width=cont['width'], height=cont['height'], depth=cont['depth'], max_weight=cont['max_weight']
+    ))
+    optimizer.packed_items = session["packed_items"]
+    return optimizer.visualize_packing(show=False)
 
 def delete_session(session_id: int, db_path: str = DB_PATH) -> None:
     """
     Видаляє сесію з бази за її id.
     """
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-    conn.commit()
-    conn.close()
+    get_store(db_path).delete_session(session_id)
+
+
+def utilization_by_container(date_from: Optional[str] = None, date_to: Optional[str] = None,
+                             db_path: str = DB_PATH) -> List[Dict[str, Any]]:
+    """Заповнення по типах контейнерів за період (див. SessionStore)."""
+    return get_store(db_path).utilization_by_container(date_from, date_to)
+
+
+def utilization_by_day(date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       db_path: str = DB_PATH) -> List[Dict[str, Any]]:
+    """Заповнення по днях за період (див. SessionStore)."""
+    return get_store(db_path).utilization_by_day(date_from, date_to)
+
 
+def top_failures(limit: int = 20, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                 db_path: str = DB_PATH) -> List[Dict[str, Any]]:
+    """Коробки, що найчастіше не вміщуються (див. SessionStore)."""
+    return get_store(db_path).top_failures(limit, date_from, date_to)
@@ -0,0 +1,134 @@
+import numpy as np
+from typing import Optional, Tuple
+
+# Допуск для порівняння координат у реальних одиницях (мм)
+EPS = 1e-6
+
+
+def _overlap(a0: np.ndarray, a1: np.ndarray, b0: np.ndarray, b1: np.ndarray) -> np.ndarray:
+    return np.clip(np.minimum(a1, b1) - np.maximum(a0, b0), 0, None)
+
+
+class FreeSpaceManager:
+    """
+    Список максимальних порожніх кубоїдів контейнера в реальних одиницях.
+    Кожен рядок self.spaces та self.boxes – (x, y, z, w, d, h), де x – ширина,
+    y – глибина, z – висота. Пам'ять залежить від кількості коробок,
+    а не від об'єму контейнера.
+    """
+
+    def __init__(self, width: float, depth: float, height: float):
+        self.size = (width, depth, height)
+        self.spaces = np.array([[0.0, 0.0, 0.0, width, depth, height]])
+        self.boxes = np.zeros((0, 6))
+
+    def can_hold(self, dims: Tuple[float, float, float]) -> bool:
+        """Чи є вільний простір, у який коробка (w, d, h) вміщується без урахування опори."""
+        w, d, h = dims
+        spaces = self.spaces
+        return bool(np.any((spaces[:, 3] >= w - EPS) &
+                           (spaces[:, 4] >= d - EPS) &
+                           (spaces[:, 5] >= h - EPS)))
+
+    def find_position(self, dims: Tuple[float, float, float],
+                      support_threshold: float) -> Optional[Tuple[Tuple[float, float, float], float]]:
+        """
+        Повертає найкращий кут вільного простору для коробки dims = (w, d, h):
+        мінімальна z, потім максимальний контакт (мм²), потім порядок (x, y).
+        """
+        w, d, h = dims
+        spaces = self.spaces
+        fits = ((spaces[:, 3] >= w - EPS) &
+                (spaces[:, 4] >= d - EPS) &
+                (spaces[:, 5] >= h - EPS))
+        corners = np.unique(spaces[fits, :3], axis=0)
+        if corners.size == 0:
+            return None
+        corners = corners[np.lexsort((corners[:, 1], corners[:, 0], corners[:, 2]))]
+
+        for z in np.unique(corners[:, 2]):
+            level = corners[corners[:, 2] == z]
+            if z > EPS:
+                support = self._area_on_level(level, w, d)
+                level = level[support / (w * d) >= support_threshold]
+            if level.size == 0:
+                continue
+            contact = self.contact(level, (w, d, h))
+            best = int(np.argmax(contact))
+            x, y, z = level[best]
+            return (float(x), float(y), float(z)), float(contact[best])
+        return None
+
+    def _area_on_level(self, corners: np.ndarray, w: float, d: float) -> np.ndarray:
+        """Площа основи, що лежить на верхніх гранях коробок рівня z."""
+        if self.boxes.size == 0:
+            return np.zeros(len(corners))
+        boxes = self.boxes
+        x, y, z = (corners[:, i:i + 1] for i in range(3))
+        on_level = np.abs(boxes[:, 2] + boxes[:, 5] - z) < EPS
+        area = (_overlap(x, x + w, boxes[:, 0], boxes[:, 0] + boxes[:, 3]) *
+                _overlap(y, y + d, boxes[:, 1], boxes[:, 1] + boxes[:, 4]))
+        return np.sum(area * on_level, axis=1)
+
+    def contact(self, corners: np.ndarray, dims: Tuple[float, float, float]) -> np.ndarray:
+        """
+        Площа дотику (мм²) для кожного кута: підлога або опора знизу
+        плюс бічні грані сусідніх коробок. Стінки контейнера не враховуються.
+        """
+        w, d, h = dims
+        x, y, z = (corners[:, i:i + 1] for i in range(3))
+        contact = np.where(corners[:, 2] <= EPS, w * d, self._area_on_level(corners, w, d))
+        if self.boxes.size == 0:
+            return contact
+
+        bx, by, bz, bw, bd, bh = (self.boxes[:, i] for i in range(6))
+        span_x = _overlap(x, x + w, bx, bx + bw)
+        span_y = _overlap(y, y + d, by, by + bd)
+        span_z = _overlap(z, z + h, bz, bz + bh)
+        touch_x = (np.abs(bx + bw - x) < EPS) | (np.abs(bx - (x + w)) < EPS)
+        touch_y = (np.abs(by + bd - y) < EPS) | (np.abs(by - (y + d)) < EPS)
+        contact = contact + np.sum(touch_x * span_y * span_z, axis=1)
+        contact = contact + np.sum(touch_y * span_x * span_z, axis=1)
+        return contact
+
+    def place(self, pos: Tuple[float, float, float], dims: Tuple[float, float, float]):
+        """
+        Додає коробку та розбиває кожен перетнутий нею вільний простір
+        на до шести максимальних залишків.
+        """
+        box = np.array([*pos, *dims], dtype=float)
+        self.boxes = np.vstack([self.boxes, box])
+
+        spaces = self.spaces
+        lo, hi = box[:3], box[:3] + box[3:]
+        s_lo, s_hi = spaces[:, :3], spaces[:, :3] + spaces[:, 3:]
+        hit = np.all((s_lo < hi - EPS) & (s_hi > lo + EPS), axis=1)
+
+        pieces = []
+        for space in spaces[hit]:
+            for axis in range(3):
+                start, end = space[axis], space[axis] + space[axis + 3]
+                if lo[axis] > start + EPS:
+                    piece = space.copy()
+                    piece[axis + 3] = lo[axis] - start
+                    pieces.append(piece)
+                if hi[axis] < end - EPS:
+                    piece = space.copy()
+                    piece[axis] = hi[axis]
+                    piece[axis + 3] = end - hi[axis]
+                    pieces.append(piece)
+
+        survivors = spaces[~hit]
+        if not pieces:
+            self.spaces = survivors
+            return
+
+        # Залишаємо лише залишки, що не містяться в іншому вільному просторі.
+        # Старі максимальні простори в нових залишках міститися не можуть.
+        pieces = np.unique(np.array(pieces), axis=0)
+        candidates = np.vstack([survivors, pieces])
+        p_lo, p_hi = pieces[:, None, :3], pieces[:, None, :3] + pieces[:, None, 3:]
+        c_lo, c_hi = candidates[None, :, :3], candidates[None, :, :3] + candidates[None, :, 3:]
+        inside = np.all((p_lo >= c_lo - EPS) & (p_hi <= c_hi + EPS), axis=2)
+        maximal = inside.sum(axis=1) == 1
+        self.spaces = np.vstack([survivors, pieces[maximal]])
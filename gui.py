@@ -14,8 +14,8 @@ import json, os
 import numpy as np
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from db import init_db, save_session_to_db, list_sessions, load_fig_from_db, delete_session
-import sqlite3
+from db import get_store
+from result_cache import ResultCache
 
 if platform.system() == 'Darwin':
     matplotlib.use('MacOSX')
@@ -25,6 +25,13 @@ else:
 import matplotlib.pyplot as plt
 
 DB_PATH = "sessions/packing_sessions.db"
+# Скільки сесій історії завантажувати за раз
+HISTORY_PAGE_SIZE = 100
+# Скільки повідомлень прогресу _poll_progress забирає з черги за один тік
+PROGRESS_DRAIN_LIMIT = 1000
+# Кеш результатів пакування (у тій самій БД): розмір у байтах і вік у секундах
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_AGE = 30 * 24 * 3600
 
 
 # Простий клас для реалізації tooltip
@@ -70,7 +77,11 @@ class Application(tk.Tk):
         self.title("3D Bin Packing")
         self.geometry("1000x800")
         self.minsize(1000, 800)
-        init_db()
+        # Одне довгоживуче сховище сесій на весь застосунок (створює/мігрує БД)
+        self.store = get_store(DB_PATH)
+        self.store.connection()
+        # Повторне пакування того самого набору береться з кешу
+        self.result_cache = ResultCache(store=self.store, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE)
 
         self.packed = False  # пакування ще не запускалось
         self.dirty = False  # чи є незбережені зміни після пакування
@@ -84,6 +95,8 @@ class Application(tk.Tk):
         
         self.show_welcome_screen()
         self.progress_q = queue.Queue()
+        # Сигнал скасування поточного пакування (створюється для кожного запуску)
+        self.cancel_event = None
 
     def on_viz_close(self, win):
         win.destroy()
@@ -109,15 +122,36 @@ class Application(tk.Tk):
 
         # Історія сесій
         tk.Label(self.welcome_frame, text="Історія пакувань:", font=("Arial", 12)).pack(pady=(20,5))
-        self.history_tree = ttk.Treeview(self.welcome_frame, columns=("id","name","ts"), show="headings", height=8)
+
+        # Пошук за назвою та датами (YYYY-MM-DD)
+        search_frame = tk.Frame(self.welcome_frame)
+        search_frame.pack(fill="x", pady=(0, 5))
+        tk.Label(search_frame, text="Назва:").pack(side="left")
+        self.history_query_entry = tk.Entry(search_frame, width=25)
+        self.history_query_entry.pack(side="left", padx=(2, 10))
+        tk.Label(search_frame, text="З:").pack(side="left")
+        self.history_from_entry = tk.Entry(search_frame, width=11)
+        self.history_from_entry.pack(side="left", padx=(2, 10))
+        tk.Label(search_frame, text="По:").pack(side="left")
+        self.history_to_entry = tk.Entry(search_frame, width=11)
+        self.history_to_entry.pack(side="left", padx=(2, 10))
+        tk.Button(search_frame, text="Знайти", command=self._reset_history).pack(side="left")
+        for entry in (self.history_query_entry, self.history_from_entry, self.history_to_entry):
+            entry.bind("<Return>", lambda _event: self._reset_history())
+
+        tree_frame = tk.Frame(self.welcome_frame)
+        tree_frame.pack(fill="both", expand=True)
+        self.history_tree = ttk.Treeview(tree_frame, columns=("id","name","ts"), show="headings", height=8)
         self.history_tree.heading("id", text="ID")
         self.history_tree.heading("name", text="Назва")
         self.history_tree.heading("ts", text="Дата/час")
-        self.history_tree.pack(fill="both", expand=True)
+        history_vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=lambda first, last: self._on_history_scroll(history_vsb, first, last))
+        history_vsb.pack(side="right", fill="y")
+        self.history_tree.pack(side="left", fill="both", expand=True)
 
-        # Заповнюємо історію
-        for sess in list_sessions():
-            self.history_tree.insert("", "end", iid=sess["id"], values=(sess["id"], sess["name"], sess["timestamp"]))
+        # Заповнюємо історію – сторінками, наступна підвантажується під час прокрутки
+        self._reset_history()
 
         # Show кнопка
         btn_frame = tk.Frame(self.welcome_frame)
@@ -125,6 +159,39 @@ class Application(tk.Tk):
         tk.Button(btn_frame, text="Переглянути", command=self._on_history_show).pack(pady=5)
         tk.Button(btn_frame, text="Видалити", width=10, command=self._on_history_delete).pack(side="left", padx=5)
 
+    def _reset_history(self):
+        self.history_tree.delete(*self.history_tree.get_children())
+        self._history_last_id = None
+        self._history_exhausted = False
+        self._history_loading = False
+        self._load_history_page()
+
+    def _load_history_page(self):
+        self._history_loading = False
+        if self._history_exhausted:
+            return
+        page = self.store.list_sessions_page(
+            HISTORY_PAGE_SIZE,
+            before_id=self._history_last_id,
+            query=self.history_query_entry.get().strip() or None,
+            date_from=self.history_from_entry.get().strip() or None,
+            date_to=self.history_to_entry.get().strip() or None
+        )
+        for sess in page:
+            self.history_tree.insert("", "end", iid=sess["id"], values=(sess["id"], sess["name"], sess["timestamp"]))
+        if page:
+            self._history_last_id = page[-1]["id"]
+        self._history_exhausted = len(page) < HISTORY_PAGE_SIZE
+
+    def _on_history_scroll(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        # Наближаємось до кінця завантаженого – підвантажуємо наступну сторінку
+        # (доки дерево не показане, його видима частина ще не відома)
+        if (float(last) > 0.9 and not self._history_exhausted and not self._history_loading
+                and self.history_tree.winfo_ismapped()):
+            self._history_loading = True
+            self.after_idle(self._load_history_page)
+
     def _on_history_show(self):
         sel = self.history_tree.focus()
         if not sel:
@@ -148,8 +215,7 @@ class Application(tk.Tk):
 
         # Видаляємо з БД і з дерева
         try:
-            from db import delete_session
-            delete_session(int(sel))
+            self.store.delete_session(int(sel))
             self.history_tree.delete(sel)
             messagebox.showinfo("Готово", f"Сесію «{name}» видалено.")
         except Exception as e:
@@ -158,21 +224,9 @@ class Application(tk.Tk):
     def load_and_show(self, session_id: int):
         try:
             # завантажуємо з БД container, boxes та packed_items
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute(
-                """
-                SELECT container_json, packed_items_json
-                FROM sessions WHERE id = ?
-                """, (session_id,)
-            )
-            row = c.fetchone()
-            conn.close()
-            if not row:
-                raise ValueError(f"Session {session_id} not found")
-
-            cont_dict      = json.loads(row[0])
-            packed_items   = json.loads(row[1])
+            session = self.store.load_session(session_id)
+            cont_dict      = session["container"]
+            packed_items   = session["packed_items"]
 
             # створюємо контейнер і оптимізатор
             container = Container(
@@ -186,15 +240,10 @@ class Application(tk.Tk):
             # відновлюємо результат
             optimizer.packed_items = packed_items
 
-            # обчислюємо заповнення простору для заголовка
-            vol_sum = sum(
-                item['size'][0] * item['size'][1] * item['size'][2]
-                for item in packed_items
-            )
-            total_vol = (container.width *
-                         container.depth *
-                         container.height)
-            optimizer.space_utilization = (vol_sum / total_vol) * 100
+            # заповнення й невдачі збережено разом із сесією
+            optimizer.space_utilization = session["space_utilization"]
+            optimizer.failed_items = session["failed_items"]
+            optimizer.failed_types = session["failed_types"]
 
             # показуємо вікно з вашою функцією-«show_visualization»
             self.show_visualization(optimizer)
@@ -343,6 +392,13 @@ class Application(tk.Tk):
             command=self.start_packing,
             state="disabled"  # спочатку вимкнена, поки не додано хоча б одну коробку
         )
+        # Скасування зупиняє пакування після поточної коробки; розміщене зберігається
+        self.cancel_packing_button = tk.Button(
+            self.input_frame,
+            text="Скасувати",
+            command=self.cancel_packing,
+            state="disabled"
+        )
 
         self.progress = ttk.Progressbar(
             self.input_frame, orient='horizontal',
@@ -353,7 +409,8 @@ class Application(tk.Tk):
         self.progress_lbl = tk.Label(self.input_frame, text="")
         self.progress_lbl.grid(row=16, column=0, columnspan=2)
 
-        self.start_packing_button.grid(row=14, column=0, columnspan=2, pady=10)
+        self.start_packing_button.grid(row=14, column=0, pady=10)
+        self.cancel_packing_button.grid(row=14, column=1, pady=10)
 
         # Оновлення правого блоку зі списком коробок
         self.update_box_list()
@@ -625,14 +682,23 @@ class Application(tk.Tk):
             optimizer.add_item(item)
 
         self.start_packing_button.config(state="disabled")
+        self.cancel_packing_button.config(state="normal")
         self.progress['value'] = 0
         self.progress_lbl.config(text="")
+        cancel_event = self.cancel_event = threading.Event()
 
         def run():
-            # ⬇️ передаємо СВОЮ функцію у pack()
-            optimizer.pack(
-                progress_cb=lambda done, total: self.progress_q.put((done, total))
-            )
+            try:
+                # ⬇️ передаємо СВОЮ функцію у pack(); відомий запит береться з кешу
+                if self.result_cache.pack(
+                    optimizer,
+                    progress_cb=lambda done, total: self.progress_q.put((done, total)),
+                    cancel_event=cancel_event
+                ):
+                    print("[CACHE] Результат узято з кешу")
+            finally:
+                # Потік одноразовий – його з'єднання з БД більше не знадобиться
+                self.store.close_thread()
             # сигнал про завершення
             self.progress_q.put(("DONE", optimizer))
         self.start_time = time.time()          # ⬅️
@@ -642,60 +708,83 @@ class Application(tk.Tk):
 
         # Візуалізація результатів – викликаємо через after, щоб не блокувати головний цикл
 
-    def _poll_progress(self):
-        try:
-            msg = self.progress_q.get_nowait()
-        except queue.Empty:
-            # Якщо немає нових повідомлень — перевіряємо ще раз через 100 мс
-            self.after(100, self._poll_progress)
-            return
-
-        # Якщо оптимізатор завершив роботу
-        if msg[0] == "DONE":
-            _, optimizer = msg
-
-            # 1) Створюємо matplotlib-фігуру, але не відображаємо її в GUI
-            fig = optimizer.visualize_packing(show=False)
+    def cancel_packing(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.cancel_packing_button.config(state="disabled")
+        self.progress_lbl.config(text="Скасування...")
 
-            # 2) Збираємо дані контейнера й коробок для збереження
-            container = {
-                "width":      float(self.container_width_entry.get()),
-                "height":     float(self.container_height_entry.get()),
-                "depth":      float(self.container_depth_entry.get()),
-                "max_weight": float(self.container_max_weight_entry.get())
-            }
-            boxes = self.boxes_data.copy()
-            name = self.session_name_entry.get().strip() or f"Сесія {time.strftime('%Y-%m-%d %H:%M:%S')}"
-
-            # 3) Зберігаємо сесію в БД
-            session_id = save_session_to_db(name, container, boxes, fig, optimizer.packed_items)
-            print(f"[DB] Збережено сесію #{session_id} — «{name}»")
+    def _poll_progress(self):
+        # Забираємо все, що накопичилось за тік: для смуги потрібне лише
+        # останнє значення прогресу, проміжні пропускаються
+        latest = None
+        for _ in range(PROGRESS_DRAIN_LIMIT):
+            try:
+                msg = self.progress_q.get_nowait()
+            except queue.Empty:
+                break
 
-            # 4) Відкриваємо вікно з візуалізацією результату
-            self.show_visualization(optimizer)
+            # Якщо оптимізатор завершив роботу
+            if msg[0] == "DONE":
+                if latest is not None:
+                    self._show_progress(*latest)
+                self._on_packing_done(msg[1])
+                # Повертаємось — більше не читаємо з черги
+                return
+            latest = msg
 
-            # gui.py, у _poll_progress, відразу після виклику self.show_visualization(optimizer)
-            self.packed = True
-            self.visualization_open = True
-            self.dirty = False
-            # кнопка вже була вимкнена перед стартом, лишаємо її в такому стані
+        # Інакше — це оновлення прогресу
+        if latest is not None:
+            self._show_progress(*latest)
 
-            # Повертаємось — більше не читаємо з черги
-            return
+        # Запланувати наступну перевірку
+        self.after(100, self._poll_progress)
 
-        # Інакше — це оновлення прогресу
-        done, total = msg
+    def _show_progress(self, done: int, total: int):
         elapsed = time.time() - self.start_time
 
-        self.progress['maximum'] = total
+        self.progress['maximum'] = max(total, 1)
         self.progress['value']   = done
-        percent = done / total * 100
+        percent = done / total * 100 if total else 100
         self.progress_lbl.config(
             text=f"{done}/{total} ({percent:.0f} %)   {elapsed:.1f} с"
         )
 
-        # Запланувати наступну перевірку
-        self.after(100, self._poll_progress)
+    def _on_packing_done(self, optimizer: PackingOptimizer):
+        self.cancel_event = None
+        self.cancel_packing_button.config(state="disabled")
+
+        # 1) Збираємо дані контейнера й коробок для збереження
+        container = {
+            "width":      float(self.container_width_entry.get()),
+            "height":     float(self.container_height_entry.get()),
+            "depth":      float(self.container_depth_entry.get()),
+            "max_weight": float(self.container_max_weight_entry.get())
+        }
+        boxes = self.boxes_data.copy()
+        name = self.session_name_entry.get().strip() or f"Сесія {time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+        # 2) Зберігаємо сесію в БД (лише розміщення – фігуру малюємо за потреби)
+        session_id = self.store.save_session(name, container, boxes, optimizer.packed_items,
+                                             failed_items=optimizer.failed_items,
+                                             failed_types=optimizer.failed_types,
+                                             space_utilization=optimizer.space_utilization,
+                                             total_weight=optimizer.current_weight)
+        print(f"[DB] Збережено сесію #{session_id} — «{name}»")
+
+        # 3) Відкриваємо вікно з візуалізацією результату
+        if optimizer.interrupted:
+            pending = sum(optimizer.pending_items.values())
+            messagebox.showinfo(
+                "Пакування скасовано",
+                f"Розміщено {len(optimizer.packed_items)} коробок, не розглянуто {pending}.\n"
+                "Показано частковий результат."
+            )
+        self.show_visualization(optimizer)
+
+        self.packed = True
+        self.visualization_open = True
+        self.dirty = False
 
     def show_visualization(self, optimizer: PackingOptimizer):
         # Одне єдине вікно візуалізації
@@ -716,7 +805,7 @@ class Application(tk.Tk):
         failed_btn = tk.Button(
             controls,
             text="Показати непридатні коробки",
-            command=lambda: self.show_failed_modal(optimizer.failed_items)
+            command=lambda: self.show_failed_modal(optimizer.failed_items, optimizer.skipped_items)
         )
         failed_btn.pack(anchor='w', pady=(0, 10))
 
@@ -807,7 +896,7 @@ class Application(tk.Tk):
             )
             cb.pack(anchor='w')
 
-    def show_failed_modal(self, failed_items: dict):
+    def show_failed_modal(self, failed_items: dict, skipped_items: dict = None):
         modal = tk.Toplevel(self)
         modal.title("Непридатні коробки")
         modal.grab_set()  # робимо модальним
@@ -817,20 +906,24 @@ class Application(tk.Tk):
         frame.rowconfigure(0, weight=1)
         frame.columnconfigure(0, weight=1)
 
-        # Treeview для failed_items
+        # Treeview для failed_items; "Без пошуку" – копії, відкинуті
+        # без повторного пошуку, бо така сама коробка вже не вмістилась
+        skipped_items = skipped_items or {}
         tree = ttk.Treeview(
             frame,
-            columns=("name", "qty"),
+            columns=("name", "qty", "skipped"),
             show="headings",
             height=10
         )
         tree.heading("name", text="Назва коробки")
         tree.heading("qty", text="К-ть")
+        tree.heading("skipped", text="Без пошуку")
         tree.column("name", width=200, anchor='w')
         tree.column("qty", width=60, anchor='center')
+        tree.column("skipped", width=90, anchor='center')
 
         for name, cnt in failed_items.items():
-            tree.insert("", "end", values=(name, cnt))
+            tree.insert("", "end", values=(name, cnt, skipped_items.get(name, 0)))
 
         vsb = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
         tree.configure(yscrollcommand=vsb.set)
@@ -0,0 +1,248 @@
+"""
+Покращення жадібного пакування: імітація відпалу над порядком коробок
+і вибором їхньої орієнтації. Кожен кандидат оцінюється повторним запуском
+PackingOptimizer.pack() у заданому порядку – тож варто брати швидкий рушій
+(наприклад, engine="heightmap"). Ланцюжки відпалу працюють в окремих
+процесах до спільного дедлайну і надсилають кожне своє покращення
+батьківському процесу, тож найкращий розв'язок відомий у будь-який момент:
+
+    python improve.py container_boxes.json --budget 60 --workers 4 --engine heightmap
+"""
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+from dataclasses import replace
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from batch import load_manifest
+from optimizer import Container, Item, PackingOptimizer
+
+# (індекс коробки, орієнтація (width, height, depth) або None – поворот обирає оптимізатор)
+Genome = List[Tuple[int, Optional[Tuple[float, float, float]]]]
+
+
+def _orientations(item: Item) -> list:
+    if not item.rotatable or item.shape is not None:
+        return [None]
+    return [None] + sorted(set(itertools.permutations((item.width, item.height, item.depth))))
+
+
+def _apply(items: Sequence[Item], genome: Genome) -> List[Item]:
+    result = []
+    for index, orientation in genome:
+        item = items[index]
+        if orientation is not None:
+            width, height, depth = orientation
+            item = replace(item, width=width, height=height, depth=depth, rotatable=False)
+        result.append(item)
+    return result
+
+
+def evaluate(container: Container, items: Sequence[Item], genome: Genome,
+             optimizer_options: dict) -> PackingOptimizer:
+    """Пакує коробки саме в порядку та орієнтаціях genome."""
+    optimizer = PackingOptimizer(container, **optimizer_options)
+    optimizer.items = _apply(items, genome)
+    optimizer.pack(sort_items=False, write_report=False)
+    return optimizer
+
+
+def _score(optimizer: PackingOptimizer) -> Tuple[float, int]:
+    return optimizer.space_utilization, len(optimizer.packed_items)
+
+
+def _neighbour(genome: Genome, choices: list, rng: random.Random) -> Genome:
+    """Випадковий сусід: обмін, перенесення, розворот відрізка або нова орієнтація."""
+    g = list(genome)
+    n = len(g)
+    move = rng.random()
+    if n >= 2 and move < 0.35:
+        i, j = rng.sample(range(n), 2)
+        g[i], g[j] = g[j], g[i]
+    elif n >= 2 and move < 0.65:
+        i, j = rng.sample(range(n), 2)
+        g.insert(j, g.pop(i))
+    elif n >= 2 and move < 0.75:
+        i, j = sorted(rng.sample(range(n + 1), 2))
+        g[i:j] = reversed(g[i:j])
+    else:
+        rotatable = [k for k, (index, _) in enumerate(g) if len(choices[index]) > 1]
+        if rotatable:
+            k = rng.choice(rotatable)
+            index = g[k][0]
+            g[k] = (index, rng.choice(choices[index]))
+    return g
+
+
+def _anneal(container: Container, items: Sequence[Item], start: Genome, optimizer_options: dict,
+            deadline: float, seed: int, report: Callable, initial_temperature: float, kicks: int = 0) -> int:
+    """
+    Один ланцюжок відпалу до deadline. report(score, genome, evaluations)
+    викликається для стартового розв'язку та для кожного покращення
+    найкращого в ланцюжку. Повертає кількість оцінок.
+    """
+    rng = random.Random(seed)
+    choices = [_orientations(item) for item in items]
+    current = list(start)
+    for _ in range(kicks):
+        current = _neighbour(current, choices, rng)
+    current_score = _score(evaluate(container, items, current, optimizer_options))
+    best_score = current_score
+    report(current_score, current, 1)
+
+    started = time.time()
+    evaluations = 1
+    while time.time() < deadline:
+        candidate = _neighbour(current, choices, rng)
+        score = _score(evaluate(container, items, candidate, optimizer_options))
+        evaluations += 1
+
+        # Температура (у відсотках заповнення) спадає лінійно до дедлайну
+        progress = (time.time() - started) / max(deadline - started, 1e-9)
+        temperature = initial_temperature * max(1.0 - progress, 1e-3)
+        delta = score[0] - current_score[0]
+        if score >= current_score or rng.random() < math.exp(delta / temperature):
+            current, current_score = candidate, score
+        if score > best_score:
+            best_score = score
+            report(score, candidate, evaluations)
+    return evaluations
+
+
+def _chain_process(chain, container, items, start, optimizer_options, deadline, seed, temperature, kicks, results):
+    evaluations = _anneal(container, items, start, optimizer_options, deadline, seed,
+                          lambda *found: results.put((chain, False) + found), temperature, kicks)
+    results.put((chain, True, None, None, evaluations))
+
+
+class OrderImprover:
+    """
+    Жадібний порядок – стартовий і водночас гарантований результат; далі
+    workers ланцюжків відпалу шукають кращий до вичерпання time_budget секунд.
+    run() завжди повертає PackingOptimizer з найкращим знайденим розміщенням.
+    """
+
+    def __init__(self, container: Container, time_budget: float = 30.0, workers: int = 1,
+                 seed: Optional[int] = None, initial_temperature: float = 1.0, **optimizer_options):
+        if workers < 1:
+            raise ValueError("Кількість процесів має бути не менше 1")
+        self.container = container
+        self.time_budget = time_budget
+        self.workers = workers
+        self.seed = seed
+        self.initial_temperature = initial_temperature
+        self.optimizer_options = optimizer_options
+        self.items = []
+        self.initial_utilization = 0.0
+        self.best_utilization = 0.0
+        self.evaluations = 0
+
+    def add_item(self, item: Item):
+        self.items.extend([replace(item, quantity=1)] * item.quantity)
+
+    def run(self) -> PackingOptimizer:
+        deadline = time.time() + self.time_budget
+        items = self.items
+        options = dict(self.optimizer_options)
+        rng = random.Random(self.seed)
+
+        # Стартовий розв'язок – той самий порядок, що й у звичайному pack()
+        greedy = PackingOptimizer(self.container, **options)
+        start = [(index, None) for index in sorted(range(len(items)), key=lambda i: greedy.priority_key(items[i]))]
+        best_optimizer = evaluate(self.container, items, start, options)
+        best = [_score(best_optimizer), start]
+        self.initial_utilization = best_optimizer.space_utilization
+        self.evaluations = 1
+
+        def report(score, genome, evaluations=None):
+            if score > best[0]:
+                best[0], best[1] = score, list(genome)
+
+        seeds = [rng.randrange(2 ** 32) for _ in range(self.workers)]
+        if self.workers == 1:
+            self.evaluations += _anneal(self.container, items, start, options, deadline, seeds[0],
+                                        report, self.initial_temperature)
+        else:
+            self.evaluations += self._run_processes(start, options, deadline, seeds, report)
+
+        if best[1] is not start:
+            best_optimizer = evaluate(self.container, items, best[1], options)
+        self.best_utilization = best_optimizer.space_utilization
+        return best_optimizer
+
+    def _run_processes(self, start: Genome, options: dict, deadline: float,
+                       seeds: List[int], report: Callable) -> int:
+        ctx = multiprocessing.get_context()
+        results = ctx.Queue()
+        processes = []
+        for chain, seed in enumerate(seeds):
+            # Перший ланцюжок стартує з жадібного порядку, решта – зі збуреного
+            kicks = 0 if chain == 0 else max(1, len(start) // 10)
+            process = ctx.Process(target=_chain_process, daemon=True, args=(
+                chain, self.container, self.items, start, options, deadline, seed,
+                self.initial_temperature, kicks, results))
+            process.start()
+            processes.append(process)
+
+        # Оцінки кожного ланцюжка: остаточна кількість приходить разом з "done",
+        # а для зупинених на дедлайні – відома з останнього покращення
+        evaluations = [0] * len(processes)
+        running = len(processes)
+
+        def handle(message):
+            nonlocal running
+            chain, done, score, genome, count = message
+            evaluations[chain] = max(evaluations[chain], count)
+            if done:
+                running -= 1
+            else:
+                report(score, genome)
+
+        while running and time.time() < deadline:
+            try:
+                handle(results.get(timeout=min(0.1, max(deadline - time.time(), 0.01))))
+            except queue.Empty:
+                continue
+        # Після дедлайну забираємо те, що встигли надіслати, і зупиняємо ланцюжки
+        while True:
+            try:
+                handle(results.get_nowait())
+            except queue.Empty:
+                break
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        results.close()
+        return sum(evaluations)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Покращення порядку пакування (імітація відпалу)")
+    parser.add_argument("manifest", help="JSON-маніфест: контейнер + коробки")
+    parser.add_argument("--budget", type=float, default=30.0, help="ліміт часу, с")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=PackingOptimizer.ENGINES, default="heightmap")
+    parser.add_argument("--strategy", choices=PackingOptimizer.STRATEGIES, default="exhaustive")
+    args = parser.parse_args(argv)
+
+    container, items = load_manifest(args.manifest)
+    improver = OrderImprover(container, time_budget=args.budget, workers=args.workers, seed=args.seed,
+                             engine=args.engine, strategy=args.strategy)
+    for item in items:
+        improver.add_item(item)
+    optimizer = improver.run()
+    print(f"Заповнення: {improver.initial_utilization:.2f}% -> {improver.best_utilization:.2f}% "
+          f"({improver.evaluations} оцінок, розміщено {len(optimizer.packed_items)} з {len(improver.items)})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
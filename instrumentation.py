@@ -0,0 +1,157 @@
+"""
+Опційна інструментація PackingOptimizer: кількість викликів і сумарний час
+гарячих методів, гістограми кандидатів і часу на коробку, профіль cProfile.
+
+Вимкнена інструментація нічого не коштує: методи загортаються лише на
+екземплярі, для якого викликано enable_instrumentation(), а клас лишається
+незмінним.
+
+    optimizer.enable_instrumentation(report_path="stats.json", profile_path="pack.prof")
+    optimizer.pack()
+    print(optimizer.instrumentation.format_report())
+"""
+import cProfile
+import functools
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, Optional
+
+# Методи, що викликаються на кожну позицію чи поворот; відсутні в
+# конкретному рушії просто не загортаються
+HOT_METHODS = (
+    "find_best_position",
+    "get_rotation_shapes",
+    "get_possible_rotations",
+    "_compute_rotations",
+    "check_fit",
+    "has_support",
+    "check_stability",
+    "_calculate_contact",
+    "_search_rotation",
+    "_search_rotation_bitset",
+    "_search_rotation_coarse",
+    "_search_rotation_heightmap",
+    "_select_candidate",
+    "_contact_layer",
+    "_evaluate_point",
+    "_update_contact_field",
+    "_update_extreme_points",
+    "place_item"
+)
+
+
+def _bucket(value: float) -> str:
+    """Кошик гістограми за степенями двійки: "0", "1", "2-3", "4-7", ..."""
+    n = int(value)
+    if n <= 1:
+        return str(max(n, 0))
+    low = 1 << (n.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+def _bucket_ms(seconds: float) -> str:
+    """Кошик часу в мілісекундах за степенями двійки."""
+    return _bucket(seconds * 1000.0) + " мс"
+
+
+class Instrumentation:
+    """
+    Лічильники та таймери для одного оптимізатора. Час методу – включний
+    (з вкладеними викликами), тож суми по методах не складаються в загальний.
+    Потокобезпечна: пошук поворотів може йти в кількох потоках.
+    """
+
+    def __init__(self, report_path: Optional[str] = None, profile_path: Optional[str] = None):
+        self.report_path = report_path
+        self.profile_path = profile_path
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.candidates_per_item = Counter()
+        self.time_per_item = Counter()
+        self.items = 0
+        self._lock = threading.Lock()
+        self._profiler = None
+
+    def wrap(self, target: Any, names: Iterable[str] = HOT_METHODS):
+        """Підміняє методи names на екземплярі target обгортками з підрахунком."""
+        for name in names:
+            method = getattr(target, name, None)
+            if method is not None and not hasattr(method, "__wrapped__"):
+                setattr(target, name, self._timed(name, method))
+
+    @staticmethod
+    def unwrap(target: Any, names: Iterable[str] = HOT_METHODS):
+        for name in names:
+            if hasattr(getattr(target, name, None), "__wrapped__"):
+                delattr(target, name)
+
+    def _timed(self, name: str, method):
+        calls, seconds, lock = self.calls, self.seconds, self._lock
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with lock:
+                    calls[name] += 1
+                    seconds[name] += elapsed
+        return wrapper
+
+    def record_item(self, candidates: int, seconds: float):
+        self.items += 1
+        self.candidates_per_item[_bucket(candidates)] += 1
+        self.time_per_item[_bucket_ms(seconds)] += 1
+
+    def start_profile(self):
+        # cProfile бачить лише потік, що викликав pack()
+        if self.profile_path and self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+
+    def report(self) -> Dict[str, Any]:
+        methods = {
+            name: {
+                "calls": self.calls[name],
+                "seconds": self.seconds[name],
+                "us_per_call": self.seconds[name] / self.calls[name] * 1e6
+            }
+            for name in sorted(self.calls, key=self.seconds.get, reverse=True)
+        }
+
+        def ordered(histogram: Counter) -> Dict[str, int]:
+            return dict(sorted(histogram.items(), key=lambda kv: int(kv[0].split("-")[0].split()[0])))
+
+        return {
+            "items": self.items,
+            "methods": methods,
+            "candidates_per_item": ordered(self.candidates_per_item),
+            "time_per_item": ordered(self.time_per_item)
+        }
+
+    def format_report(self) -> str:
+        report = self.report()
+        lines = [f"{'Метод':<28} {'Виклики':>10} {'Час, с':>10} {'мкс/виклик':>12}"]
+        for name, row in report["methods"].items():
+            lines.append(f"{name:<28} {row['calls']:>10} {row['seconds']:>10.3f} {row['us_per_call']:>12.1f}")
+        for title, key in (("Кандидатів на коробку", "candidates_per_item"), ("Час на коробку", "time_per_item")):
+            lines.append(f"\n{title}:")
+            lines.extend(f"  {bucket:>14}: {count}" for bucket, count in report[key].items())
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[str] = None):
+        """Записує звіт у JSON (path або report_path)."""
+        path = path or self.report_path
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,109 @@
+"""
+Пакування в кілька контейнерів: коли відкриті контейнери заповнені,
+відкривається новий – з переліку типів (наприклад, small/medium/big_container.json),
+обраний так, щоб мінімізувати кількість і вартість контейнерів.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from batch import load_manifest
+from optimizer import Container, Item, PackingOptimizer
+
+
+def load_container_types(paths: Sequence[str]) -> List[Container]:
+    """Типи контейнерів беруться з першого елемента кожного маніфесту."""
+    return [load_manifest(path)[0] for path in paths]
+
+
+class MultiContainerPacker:
+    """
+    Кожен контейнер має власний PackingOptimizer і не залежить від інших.
+    Для нового контейнера всі типи пробуються одночасно на залишку коробок;
+    якщо якийсь тип вміщує весь залишок – береться найдешевший з них,
+    інакше – тип з найбільшим розміщеним об'ємом на одиницю вартості.
+    """
+
+    def __init__(self, container_types: Sequence[Container], max_containers: Optional[int] = None,
+                 workers: int = 1, **optimizer_options):
+        if not container_types:
+            raise ValueError("Потрібен хоча б один тип контейнера")
+        self.container_types = list(container_types)
+        self.max_containers = max_containers
+        self.workers = workers
+        self.optimizer_options = optimizer_options
+        self.items = []
+        self.containers: List[PackingOptimizer] = []
+        self.failed_items = {}
+        self.total_cost = 0.0
+
+    def add_item(self, item: Item):
+        self.items.extend([item] * item.quantity)
+
+    def _try_container(self, container: Container, items: List[Item]) -> PackingOptimizer:
+        # Пробне пакування: звіт надсилається лише для обраного контейнера,
+        # а попередження про вагу друкує pack() пакувальника один раз
+        optimizer = PackingOptimizer(container, **self.optimizer_options)
+        optimizer.warn_overweight = False
+        optimizer.items = list(items)
+        optimizer.pack(write_report=False)
+        return optimizer
+
+    @staticmethod
+    def _packed_volume(optimizer: PackingOptimizer) -> float:
+        return sum(w * d * h for w, d, h in (item['size'] for item in optimizer.packed_items))
+
+    def _choose(self, trials: List[PackingOptimizer], remaining: int) -> PackingOptimizer:
+        complete = [opt for opt in trials if len(opt.packed_items) == remaining]
+        if complete:
+            return min(complete, key=lambda opt: (opt.container.cost,
+                                                  opt.container.width * opt.container.height * opt.container.depth))
+        return max(trials, key=lambda opt: self._packed_volume(opt) / max(opt.container.cost, 1e-9))
+
+    def pack(self) -> List[PackingOptimizer]:
+        remaining = list(self.items)
+        self.containers = []
+        self.total_cost = 0.0
+
+        # Вантаж, важчий за один контейнер, – звичайна справа: відкриється ще
+        # один. Попереджаємо лише тоді, коли кількість контейнерів обмежена
+        # і навіть усі вони разом не витримають загальної ваги
+        if self.max_containers is not None:
+            capacity = self.max_containers * max(c.max_weight for c in self.container_types)
+            if sum(item.weight for item in remaining) > capacity:
+                print("Попередження: Загальна вага коробок перевищує ліміт контейнерів.")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while remaining:
+                if self.max_containers is not None and len(self.containers) >= self.max_containers:
+                    break
+                trials = list(executor.map(lambda c: self._try_container(c, remaining), self.container_types))
+                chosen = self._choose(trials, len(remaining))
+                if not chosen.packed_items:
+                    # Залишок не вміщується навіть у порожній контейнер будь-якого типу
+                    break
+                chosen.submit_report()
+                self.containers.append(chosen)
+                self.total_cost += chosen.container.cost
+                remaining = chosen.unplaced_items
+
+        failed = defaultdict(int)
+        for item in remaining:
+            failed[item.name] += 1
+        self.failed_items = dict(failed)
+        return self.containers
+
+    def get_packing_results(self) -> Dict[str, Any]:
+        return {
+            'containers': [
+                {
+                    'container': opt.container.name,
+                    'packed_items': opt.packed_items,
+                    'space_utilization': opt.space_utilization
+                }
+                for opt in self.containers
+            ],
+            'container_count': len(self.containers),
+            'total_cost': self.total_cost,
+            'failed_items': self.failed_items
+        }
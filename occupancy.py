@@ -0,0 +1,114 @@
+import numpy as np
+from typing import Tuple
+
+WORD_BITS = 64
+
+
+def _z_range_mask(start: int, stop: int, words: int) -> np.ndarray:
+    """Слова uint64 з одиничними бітами для шарів z у [start, stop)."""
+    mask = np.zeros(words, dtype=np.uint64)
+    for word in range(start // WORD_BITS, (stop - 1) // WORD_BITS + 1):
+        lo = max(start - word * WORD_BITS, 0)
+        hi = min(stop - word * WORD_BITS, WORD_BITS)
+        ones = (1 << (hi - lo)) - 1
+        mask[word] = np.uint64(ones << lo)
+    return mask
+
+
+class BitGrid:
+    """
+    Матриця зайнятості W×D×H, упакована по осі z: кожен стовпчик (x, y)
+    зберігається у ceil(H / 64) словах uint64 – 1 біт на клітинку замість
+    8 байтів int64. Перевірки fit/support виконуються побітовими операціями.
+
+    Індексування grid[x, y, z] повертає звичайний bool-масив (розпаковується
+    лише потрібна частина), тож скалярні перевірки працюють без змін.
+    """
+
+    def __init__(self, shape: Tuple[int, int, int]):
+        self.shape = tuple(shape)
+        W, D, H = self.shape
+        self.words = np.zeros((W, D, max(1, -(-H // WORD_BITS))), dtype=np.uint64)
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes
+
+    def column_mask(self, z: int, height: int) -> np.ndarray:
+        return _z_range_mask(z, z + height, self.words.shape[2])
+
+    def pack_columns(self, mask: np.ndarray, z: int) -> np.ndarray:
+        """Стовпчики маски (w, d, h), зсунуті на висоту z, у вигляді слів."""
+        w, d, h = mask.shape
+        packed = np.zeros((w, d, self.words.shape[2]), dtype=np.uint64)
+        for k in range(h):
+            word, bit = divmod(z + k, WORD_BITS)
+            packed[:, :, word] |= mask[:, :, k].astype(np.uint64) << np.uint64(bit)
+        return packed
+
+    def fill(self, x: int, y: int, z: int, mask: np.ndarray):
+        """Позначає зайнятими клітинки маски (w, d, h) з початком у (x, y, z)."""
+        w, d, _ = mask.shape
+        self.words[x:x + w, y:y + d] |= self.pack_columns(mask != 0, z)
+
+    def fits(self, x: int, y: int, z: int, mask: np.ndarray) -> bool:
+        """Чи не перетинає маска (w, d, h) з початком у (x, y, z) зайнятих клітинок."""
+        w, d, _ = mask.shape
+        return not np.any(self.words[x:x + w, y:y + d] & self.pack_columns(mask != 0, z))
+
+    def layer(self, z: int) -> np.ndarray:
+        """Шар z як bool-масив (W, D)."""
+        word, bit = divmod(z, WORD_BITS)
+        return ((self.words[:, :, word] >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+
+    def window_or(self, w: int, d: int) -> np.ndarray:
+        """Побітове OR стовпчиків по кожному вікну w×d: (W - w + 1, D - d + 1, слова)."""
+        out = self.words
+        for axis, k in enumerate((w, d)):
+            if k > 1:
+                windows = np.lib.stride_tricks.sliding_window_view(out, k, axis=axis)
+                out = np.bitwise_or.reduce(windows, axis=-1)
+        return out
+
+    def fit_plane(self, mask: np.ndarray, z: int, window_or: np.ndarray = None) -> np.ndarray:
+        """
+        Для всіх (x, y) – чи не перетинає маска (w, d, h), поставлена на
+        висоту z, зайнятих клітинок. Для суцільної маски можна передати
+        готовий window_or(w, d).
+        """
+        w, d, h = mask.shape
+        W, D, _ = self.shape
+        if window_or is not None:
+            return ~np.any(window_or & self.column_mask(z, h), axis=-1)
+
+        nx, ny = W - w + 1, D - d + 1
+        hit = np.zeros((nx, ny), dtype=bool)
+        columns = self.pack_columns(mask != 0, z)
+        for i in range(w):
+            for j in range(d):
+                if columns[i, j].any():
+                    hit |= np.any(self.words[i:i + nx, j:j + ny] & columns[i, j], axis=-1)
+        return ~hit
+
+    def __getitem__(self, key) -> np.ndarray:
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (3 - len(key))
+        x_key, y_key, z_key = key
+        words = self.words[x_key, y_key]
+
+        if isinstance(z_key, (int, np.integer)):
+            word, bit = divmod(int(z_key), WORD_BITS)
+            return ((words[..., word] >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+
+        # Розпаковуємо лише слова, що покривають потрібний діапазон z
+        start, stop, step = z_key.indices(self.shape[2])
+        if step != 1:
+            raise IndexError("BitGrid підтримує лише суцільні діапазони по z")
+        if stop <= start:
+            return np.zeros(words.shape[:-1] + (0,), dtype=bool)
+        first, last = start // WORD_BITS, (stop - 1) // WORD_BITS + 1
+        chunk = np.ascontiguousarray(words[..., first:last].astype('<u8'))
+        bits = np.unpackbits(chunk.view(np.uint8), axis=-1, bitorder='little').astype(bool)
+        offset = first * WORD_BITS
+        return bits[..., start - offset:stop - offset]
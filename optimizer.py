@@ -1,16 +1,132 @@
 import numpy as np
 from dataclasses import dataclass, field
 from typing import List, Tuple, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d.art3d import Line3DCollection, Poly3DCollection
 import random
 import itertools
-from collections import defaultdict
+from collections import Counter, defaultdict
 import time
 from typing import Callable
 from matplotlib.widgets import CheckButtons
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import matplotlib.pyplot as plt
+from free_space import FreeSpaceManager
+from instrumentation import Instrumentation
+from result_sink import ResultSink, get_default_sink
+from occupancy import BitGrid
+from scoring import CandidateBatch, LowestContactPolicy, ScoringPolicy, best_index
+
+def _axis_slice(ndim: int, axis: int, start: int, stop: int) -> tuple:
+    index = [slice(None)] * ndim
+    index[axis] = slice(start, stop)
+    return tuple(index)
+
+
+def _window_sums(arr: np.ndarray, size: Tuple[int, ...]) -> np.ndarray:
+    """
+    Суми arr по всіх вікнах розміру size (для кожного початку вікна)
+    через кумулятивні суми – по одній осі за раз.
+    int32 вистачає: сума не перевищує кількості клітинок сітки.
+    Осі обробляються від тієї, що найбільше зменшує масив, – так проміжні
+    масиви найменші.
+    """
+    out = arr
+    for axis in sorted(range(len(size)), key=lambda a: (arr.shape[a] - size[a] + 1) / max(arr.shape[a], 1)):
+        k = size[axis]
+        n = out.shape[axis]
+        if k > n:
+            shape = list(out.shape)
+            shape[axis] = 0
+            return np.zeros(shape, dtype=np.int32)
+        if k == 1:
+            continue
+        m = n - k + 1
+        if m < k:
+            # Вікно довше за кількість початків: ковзна сума по шарах,
+            # без кумулятивної копії всього масиву
+            src = np.moveaxis(out, axis, 0)
+            sums = np.empty((m,) + src.shape[1:], dtype=np.int32)
+            total = np.sum(src[:k], axis=0, dtype=np.int32)
+            sums[0] = total
+            for i in range(1, m):
+                total += src[i + k - 1]
+                total -= src[i - 1]
+                sums[i] = total
+            out = np.moveaxis(sums, 0, axis)
+            continue
+        # Кумулятивна сума одразу в масив з нульовим шаром попереду – без проміжних копій
+        shape = list(out.shape)
+        shape[axis] = n + 1
+        csum = np.zeros(shape, dtype=np.int32)
+        np.cumsum(out, axis=axis, dtype=np.int32, out=csum[_axis_slice(out.ndim, axis, 1, n + 1)])
+        out = (csum[_axis_slice(out.ndim, axis, k, n + 1)] -
+               csum[_axis_slice(out.ndim, axis, 0, n - k + 1)])
+    return out.astype(np.int32, copy=False)
+
+
+def _masked_window_sums(arr: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Для кожного початку вікна рахує sum(mask * arr[вікно]).
+    Для суцільної маски – кумулятивні суми, інакше – зсуви по клітинках маски.
+    """
+    if mask.size > 0 and np.all(mask == 1):
+        return _window_sums(arr, mask.shape)
+
+    out_shape = tuple(max(n - k + 1, 0) for n, k in zip(arr.shape, mask.shape))
+    out = np.zeros(out_shape, dtype=np.int32)
+    if 0 in out_shape:
+        return out
+    for cell in np.argwhere(mask):
+        window = tuple(slice(c, c + n) for c, n in zip(cell, out_shape))
+        out += int(mask[tuple(cell)]) * arr[window]
+    return out
+
+
+def _block_cells(n: int, f: int) -> np.ndarray:
+    """Кількість клітинок у кожному блоці розміру f уздовж осі довжини n (останній може бути неповним)."""
+    cells = np.full(-(-n // f), f, dtype=np.int32)
+    if n % f:
+        cells[-1] = n % f
+    return cells
+
+
+def _block_sums(arr: np.ndarray, f: int) -> np.ndarray:
+    """Суми 3D-масиву по блоках f×f×f (неповні крайові блоки доповнюються нулями)."""
+    pad = [(0, -n % f) for n in arr.shape]
+    arr = np.pad(arr, pad).astype(np.int32)
+    a, b, c = (n // f for n in arr.shape)
+    return arr.reshape(a, f, b, f, c, f).sum(axis=(1, 3, 5), dtype=np.int32)
+
+
+# Напрямки до сусідів, які враховує поле дотику: знизу та з боків по y.
+# Передня й задня грані (по x) рахуються окремо, як у початковому
+# _calculate_contact – з маскою, обрізаною до min(d, w) × min(h, d)
+_CONTACT_NEIGHBOURS = ((0, -1, 0), (0, 1, 0), (0, 0, -1))
+
+
+def _shift_add(field: np.ndarray, values: np.ndarray, offset: Tuple[int, int, int]):
+    """field[p + offset] += values[p] для всіх p, що не виходять за межі field."""
+    dst, src = [], []
+    for n, o in zip(field.shape, offset):
+        dst.append(slice(max(o, 0), n + min(o, 0)))
+        src.append(slice(max(-o, 0), n - max(o, 0)))
+    field[tuple(dst)] += values[tuple(src)]
+
+
+def _window_max(arr: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Максимум 2D-масиву по всіх вікнах розміру size (окремо по кожній осі).
+    """
+    out = arr
+    for axis, k in enumerate(size):
+        if k > 1:
+            out = np.lib.stride_tricks.sliding_window_view(out, k, axis=axis).max(axis=-1)
+    return out
+
 
 @dataclass
 class Item:
@@ -30,26 +146,276 @@ class Container:
     height: float
     depth: float
     max_weight: float
+    # Для режиму кількох контейнерів (multi_container.py)
+    name: str = ""
+    cost: float = 1.0
+
+
+@dataclass(frozen=True, eq=False)
+class RotationShape:
+    """
+    Один поворот коробки разом із похідними даними, які однакові
+    для всіх копій коробки і тому рахуються лише раз.
+    """
+    shape: np.ndarray                 # (h, w, d), як у get_possible_rotations
+    transposed: np.ndarray            # (w, d, h) – в осях space_matrix
+    mask: np.ndarray                  # зайняті клітинки форми
+    base: np.ndarray                  # нижній шар (w, d)
+    front: np.ndarray                 # маски граней, як у _face_contact
+    back: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    solid: bool                       # суцільний кубоїд – контакт з поля дотику
+    cells: int
+    base_cells: int
+    max_contact: int                  # верхня межа контакту в будь-якій позиції
+    dims: Tuple[float, float, float]  # (w, d, h) у реальних одиницях
+
+
+def _solid_shape(size: Tuple[int, int, int]) -> np.ndarray:
+    """
+    Суцільна форма (h, w, d) з одиниць як перегляд з нульовими кроками:
+    кеш поворотів не тримає по масиву int64 на кожну клітинку коробки.
+    """
+    return np.broadcast_to(np.ones(1, dtype=int), size)
+
+
+def _make_rotation(shape: np.ndarray, dims: Tuple[float, float, float]) -> RotationShape:
+    shape_h, shape_w, shape_d = shape.shape
+    if shape.size > 0 and not any(shape.strides):
+        # Стала форма – транспонування й маска теж лишаються переглядами
+        transposed = shape.transpose(1, 2, 0)
+        mask = np.broadcast_to(shape.flat[0] != 0, transposed.shape)
+    else:
+        transposed = np.ascontiguousarray(shape.transpose(1, 2, 0))
+        mask = transposed != 0
+    if 0 in shape.shape:
+        base = front = back = np.zeros((shape_w, shape_d), dtype=shape.dtype)
+        left = right = np.zeros((shape_w, shape_h), dtype=shape.dtype)
+    else:
+        min_w, min_h = min(shape_d, shape_w), min(shape_h, shape_d)
+        base = transposed[:, :, 0]
+        front = transposed[:min_w, :min_h, 0]
+        back = transposed[:min_w, :min_h, -1]
+        left = transposed[:, 0, :]
+        right = transposed[:, -1, :]
+    rotation = RotationShape(
+        shape=shape,
+        transposed=transposed,
+        mask=mask,
+        base=base,
+        front=front,
+        back=back,
+        left=left,
+        right=right,
+        solid=0 not in shape.shape and bool(np.all(mask)),
+        cells=int(np.sum(shape)),
+        base_cells=int(np.sum(base)),
+        # Кожна клітинка масок низу та граней дає не більше одиниці контакту
+        max_contact=int(sum(np.count_nonzero(m) for m in (base, front, back, left, right))),
+        dims=dims
+    )
+    # Масиви спільні для всіх копій (і оптимізаторів) – захищаємо від змін
+    for value in (shape, transposed, rotation.mask, base, front, back, left, right):
+        value.setflags(write=False)
+    return rotation
+
+
+class _RotationCache:
+    """LRU-кеш поворотів, спільний для всіх оптимізаторів процесу."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+SHARED_ROTATION_CACHE = _RotationCache()
 
 
 class PackingOptimizer:
-    def __init__(self, container: Container):
+    # "vectorized" – пакетна перевірка всіх позицій для кожного повороту,
+    # "scalar" – початковий поклітинковий перебір (для перевірки результатів)
+    SEARCH_MODES = ("vectorized", "scalar")
+    # "grid" – щільна 3D-матриця зайнятості,
+    # "heightmap" – 2.5D карта висот (лише для прямокутних коробок),
+    # "free_space" – максимальні порожні кубоїди в мм, без сітки взагалі
+    ENGINES = ("grid", "heightmap", "free_space")
+    # "exhaustive" – кандидатом є кожна клітинка сітки,
+    # "extreme_points" – лише кутові точки, утворені вже розміщеними коробками
+    STRATEGIES = ("exhaustive", "extreme_points")
+    # Зберігання зайнятості для рушія grid: "dense" – bool (1 байт на клітинку),
+    # "bitset" – BitGrid, 1 біт на клітинку, упакований уздовж z
+    OCCUPANCIES = ("dense", "bitset")
+    # На скільки шарів z щонайменше ділиться паралельний пошук (workers > 1):
+    # шари перевіряються знизу вгору, і пошук зупиняється на першому з позицією
+    PARALLEL_SLABS = 4
+    # Пул потоків вмикається лише від такого обсягу пошуку (клітинки сітки
+    # на задачу × кількість задач): на менших сітках зрізи NumPy короткі,
+    # потоки здебільшого чекають на GIL, а пул лише додає накладні витрати
+    PARALLEL_MIN_CELLS = 32_000_000
+    # Скільки рівнів z щільний пошук обробляє за раз
+    SEARCH_BAND = 8
+
+    def __init__(self, container: Container, search_mode: str = "vectorized", engine: str = "grid",
+                 strategy: str = "exhaustive", shared_rotation_cache: bool = True, workers: int = 1,
+                 occupancy: str = "dense", grid_size: int = 100, coarse_factor: int = 1,
+                 scoring: Optional[ScoringPolicy] = None, result_sink: Optional[ResultSink] = None):
+        if search_mode not in self.SEARCH_MODES:
+            raise ValueError(f"Невідомий режим пошуку: {search_mode}")
+        if engine not in self.ENGINES:
+            raise ValueError(f"Невідомий рушій пакування: {engine}")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Невідома стратегія розміщення: {strategy}")
+        if occupancy not in self.OCCUPANCIES:
+            raise ValueError(f"Невідомий спосіб зберігання зайнятості: {occupancy}")
+        if occupancy != "dense" and engine != "grid":
+            raise ValueError("Упакована зайнятість (bitset) доступна лише для рушія grid")
+        if workers < 1:
+            raise ValueError("Кількість потоків пошуку має бути не менше 1")
+        if grid_size <= 0:
+            raise ValueError("Крок сітки має бути додатним")
+        if coarse_factor < 1:
+            raise ValueError("Коефіцієнт грубої сітки має бути не менше 1")
+        if coarse_factor > 1 and (engine != "grid" or strategy != "exhaustive" or search_mode != "vectorized"):
+            raise ValueError("Пошук coarse-to-fine доступний лише для grid + exhaustive + vectorized")
+        if engine == "free_space" and strategy != "exhaustive":
+            raise ValueError("Рушій free_space сам обирає кандидатів – стратегія має бути exhaustive")
+        scoring = scoring or LowestContactPolicy()
+        if type(scoring) is not LowestContactPolicy:
+            if engine != "grid" or strategy != "exhaustive" or search_mode != "vectorized":
+                raise ValueError("Власна політика оцінки доступна лише для grid + exhaustive + vectorized")
+            if coarse_factor > 1 and not scoring.lowest_first:
+                raise ValueError("Coarse-to-fine можливий лише з політикою, що обирає найнижчий рівень")
         self.container = container
+        self.search_mode = search_mode
+        self.engine = engine
+        self.strategy = strategy
+        self.occupancy = occupancy
+        # Політика вибору серед допустимих позицій (див. scoring.py)
+        self.scoring = scoring
+        # Куди pack() надсилає підсумковий звіт; None – спільний приймач процесу (result.txt)
+        self.result_sink = result_sink
+        # Потоки для паралельного пошуку: ядра NumPy відпускають GIL,
+        # тож на великих сітках повороти та шари z рахуються одночасно
+        self.workers = workers
+        self._executor = None
+        # Повороти за типом коробки: власний словник і, за бажанням, спільний LRU
+        self.shared_rotation_cache = shared_rotation_cache
+        self._rotation_cache = {}
         self.items = []
         self.packed_items = []
         self.space_utilization = 0.0
-        # Зменшено grid_size для точнішої дискретизації простору
-        self.grid_size = 100
+        # Крок сітки (мм): менший – точніше, але більша сітка
+        self.grid_size = grid_size
+        # Розмір блоку грубої сітки в клітинках (1 – coarse-to-fine вимкнено)
+        self.coarse_factor = coarse_factor
         # Задаємо поріг підтримки (support_threshold) нижчим
         self.support_threshold = 0.3
-        self.space_matrix = np.zeros((
+        self.grid_shape = (
             int(container.width // self.grid_size),
             int(container.depth // self.grid_size),
             int(container.height // self.grid_size)
-        ), dtype=int)
+        )
+        if engine == "heightmap":
+            # Для кожного стовпчика (x, y) – висота верхньої поверхні
+            self.space_matrix = None
+            self.height_map = np.zeros(self.grid_shape[:2], dtype=np.int32)
+        elif engine == "free_space":
+            self.space_matrix = None
+            self.free_space = FreeSpaceManager(container.width, container.depth, container.height)
+        elif occupancy == "bitset":
+            self.space_matrix = BitGrid(self.grid_shape)
+        else:
+            # Клітинка лише вільна чи зайнята – bool замість int64 (у 8 разів менше)
+            self.space_matrix = np.zeros(self.grid_shape, dtype=bool)
+        # Поле дотику: для кожної клітинки – скільки її сусідів знизу та з боків
+        # по y зайняті (підлога рахується для z = 0). Для суцільної коробки це
+        # низ і ліва/права грані контакту – сума поля по її клітинках.
+        # Для bitset поле рахується на льоту, щоб не втратити економію пам'яті
+        self.contact_field = None
+        if engine == "grid" and occupancy == "dense":
+            self.contact_field = np.zeros(self.grid_shape, dtype=np.uint8)
+            self.contact_field[:, :, 0] = 1
+        if coarse_factor > 1:
+            # Груба сітка: скільки вільних точних клітинок у кожному блоці
+            f = coarse_factor
+            cx, cy, cz = (_block_cells(n, f) for n in self.grid_shape)
+            self._coarse_cells = cx[:, None, None] * cy[None, :, None] * cz[None, None, :]
+            self._coarse_free = self._coarse_cells.copy()
+        # Індекс кутових точок (x, y, z) для стратегії extreme_points
+        self.extreme_points = {(0, 0, 0)}
         self.current_weight = 0
+        self.failed_items = {}
+        # Копії коробок, що не потрапили в контейнер (у порядку пакування)
+        self.unplaced_items = []
+        # Невдачі за точним типом коробки (назва, розміри, вага) – для БД сесій,
+        # де коробки з однаковою назвою можуть мати різні розміри
+        self.failed_types = []
+        # Скільки з failed_items пропущено без пошуку завдяки _failure_memo
+        self.skipped_items = {}
+        # Коробки, до яких пакування не дійшло через скасування чи дедлайн
+        self.pending_items = {}
+        self.interrupted = None
+        # Тривалість і час завершення останнього pack() – для submit_report()
+        self.duration = 0.0
+        self.finished_at = None
+        # precheck() попереджає про перевищення ваги; пробні пакування
+        # (multi_container.py) вимикають це, щоб не дублювати попередження
+        self.warn_overweight = True
+        self._failure_memo = {}
+        # Статистика відсікань у пошуку позиції (накопичується між викликами)
+        self.search_stats = {
+            "rotations_searched": 0,
+            "rotations_pruned": 0,    # поворот не може перевершити вже знайдену позицію
+            "levels_skipped": 0,      # рівні z вище межі, які не перевірялися
+            "early_exits": 0,         # знайдено контакт, що дорівнює верхній межі
+            "positions_checked": 0,   # лише для скалярного пошуку
+            "candidates_scored": 0    # допустимі позиції, для яких рахувалась оцінка (крім free_space)
+        }
+        # Пошук поворотів може йти в кількох потоках
+        self._stats_lock = threading.Lock()
+        # Лічильники і таймери гарячих методів; None – вимкнено
+        self.instrumentation: Optional[Instrumentation] = None
+
+    def enable_instrumentation(self, report_path: Optional[str] = None,
+                               profile_path: Optional[str] = None) -> Instrumentation:
+        """
+        Вмикає інструментацію цього екземпляра: гарячі методи загортаються
+        лічильниками часу, pack() збирає гістограми на коробку, записує звіт
+        у report_path (JSON) і профіль cProfile у profile_path (pstats).
+        """
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(report_path, profile_path)
+            self.instrumentation.wrap(self)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        if self.instrumentation is not None:
+            Instrumentation.unwrap(self)
+            self.instrumentation = None
 
     def add_item(self, item: Item):
+        if self.engine != "grid" and item.shape is not None:
+            raise ValueError(f"Рушій {self.engine} підтримує лише прямокутні коробки ('{item.name}')")
         self.items.extend([item] * item.quantity)
 
     def check_dimensions(self, size: Tuple[float, float, float]) -> bool:
@@ -59,28 +425,54 @@ class PackingOptimizer:
                 d <= self.container.depth)
 
     def get_possible_rotations(self, item: Item) -> List[np.ndarray]:
+        return [rotation.shape for rotation in self.get_rotation_shapes(item)]
+
+    def _rotation_key(self, item: Item) -> tuple:
+        shape_key = None
+        if item.shape is not None:
+            shape_key = (item.shape.shape, item.shape.dtype.str, item.shape.tobytes())
+        container = (self.container.width, self.container.height, self.container.depth)
+        return (item.width, item.height, item.depth, item.rotatable, shape_key, self.grid_size, container)
+
+    def get_rotation_shapes(self, item: Item) -> List[RotationShape]:
+        """
+        Повороти коробки з кешу: однакові за розмірами/формою коробки
+        (зокрема всі копії з add_item) обчислюються лише раз.
+        """
+        key = self._rotation_key(item)
+        rotations = self._rotation_cache.get(key)
+        if rotations is None and self.shared_rotation_cache:
+            rotations = SHARED_ROTATION_CACHE.get(key)
+        if rotations is None:
+            rotations = self._compute_rotations(item)
+            if self.shared_rotation_cache:
+                SHARED_ROTATION_CACHE.put(key, rotations)
+        self._rotation_cache[key] = rotations
+        return rotations
+
+    def _compute_rotations(self, item: Item) -> List[RotationShape]:
         if not item.rotatable:
             if item.shape is not None:
-                return [item.shape]
+                return [self._shape_rotation(item.shape.copy())]
             else:
-                shape = np.ones((
+                shape = _solid_shape((
                     int(item.height // self.grid_size),
                     int(item.width // self.grid_size),
                     int(item.depth // self.grid_size)
-                ), dtype=int)
-                return [shape]
+                ))
+                return [_make_rotation(shape, (item.width, item.depth, item.height))]
 
         if item.shape is None:
             rotations = list(set(itertools.permutations([item.width, item.height, item.depth])))
             valid_rotations = []
             for r in rotations:
                 if self.check_dimensions(r):
-                    shape = np.ones((
+                    shape = _solid_shape((
                         int(r[1] // self.grid_size),
                         int(r[0] // self.grid_size),
                         int(r[2] // self.grid_size)
-                    ), dtype=int)
-                    valid_rotations.append(shape)
+                    ))
+                    valid_rotations.append(_make_rotation(shape, (r[0], r[2], r[1])))
             return valid_rotations
         else:
             unique_rotations = []
@@ -93,9 +485,14 @@ class PackingOptimizer:
                     shape_tuple = tuple(rotated_shape.flatten())
                     if shape_tuple not in rotations_set and self.check_shape_dimensions(rotated_shape, item):
                         rotations_set.add(shape_tuple)
-                        unique_rotations.append(rotated_shape.copy())
+                        unique_rotations.append(self._shape_rotation(rotated_shape.copy()))
             return unique_rotations
 
+    def _shape_rotation(self, shape: np.ndarray) -> RotationShape:
+        shape_h, shape_w, shape_d = shape.shape
+        g = self.grid_size
+        return _make_rotation(shape, (shape_w * g, shape_d * g, shape_h * g))
+
     def _get_axes(self, axis: str) -> Tuple[int, int]:
         if axis == 'x':
             return (1, 2)
@@ -132,6 +529,8 @@ class PackingOptimizer:
                 z + shape_h > self.space_matrix.shape[2]):
             return False
 
+        if self.occupancy == "bitset":
+            return self.space_matrix.fits(x, y, z, shape_transposed)
         region = self.space_matrix[x:x + shape_w, y:y + shape_d, z:z + shape_h]
         overlap = np.logical_and(region, shape_transposed)
         return not np.any(overlap)
@@ -155,9 +554,27 @@ class PackingOptimizer:
     def _calculate_contact(self, pos: Tuple[int, int, int], shape: np.ndarray) -> int:
         x, y, z = pos
         shape_h, shape_w, shape_d = shape.shape
-        shape_transposed = shape.transpose(1, 2, 0)
-        if shape_transposed.shape[2] == 0:
+        if 0 in shape.shape:
             return 0
+        if not np.all(shape):
+            return self._face_contact(pos, shape)
+        # Низ і грані по y – з поля дотику, передня/задня – з площин x - 1 та x + shape_w
+        field = self._contact_region(slice(x, x + shape_w), slice(y, y + shape_d), z, shape_h)
+        contact = int(np.sum(field))
+        min_w, min_h = min(shape_d, shape_w), min(shape_h, shape_d)
+        for face_x in (x - 1, x + shape_w):
+            if 0 <= face_x < self.grid_shape[0]:
+                contact += int(np.count_nonzero(self.space_matrix[face_x, y:y + min_w, z:z + min_h]))
+        return contact
+
+    def _face_contact(self, pos: Tuple[int, int, int], shape: np.ndarray) -> int:
+        """
+        Контакт по гранях обгортки форми – для несуцільних форм, де поле
+        дотику дало б інший результат, ніж початковий розрахунок.
+        """
+        x, y, z = pos
+        shape_h, shape_w, shape_d = shape.shape
+        shape_transposed = shape.transpose(1, 2, 0)
 
         contact = 0
         if z == 0:
@@ -206,40 +623,104 @@ class PackingOptimizer:
                 min_h = min(right_space.shape[1], right_shape.shape[1])
                 contact += np.sum(right_space[:min_w, :min_h] * right_shape[:min_w, :min_h])
 
-        return contact
+        return int(contact)
+
+    def _contact_region(self, xs: slice, ys: slice, z: int, height: int) -> np.ndarray:
+        """Поле дотику для клітинок xs × ys × [z, z + height)."""
+        if self.contact_field is not None:
+            return self.contact_field[xs, ys, z:z + height]
+
+        # BitGrid: рахуємо поле з зайнятості області з запасом в одну клітинку
+        W, D, H = self.grid_shape
+        x0, y0 = max(xs.start - 1, 0), max(ys.start - 1, 0)
+        z0 = max(z - 1, 0)
+        occupied = self.space_matrix[x0:min(xs.stop + 1, W), y0:min(ys.stop + 1, D), z0:z + height].astype(np.uint8)
+        field = np.zeros(occupied.shape, dtype=np.uint8)
+        for offset in _CONTACT_NEIGHBOURS:
+            # Сусід клітинки p у напрямку offset зайнятий -> поле в p зростає
+            _shift_add(field, occupied, tuple(-o for o in offset))
+        if z0 == 0:
+            field[:, :, 0] += 1
+        return field[xs.start - x0:xs.stop - x0, ys.start - y0:ys.stop - y0, z - z0:]
+
+    def _update_contact_field(self, pos: Tuple[int, int, int], mask: np.ndarray):
+        """Кожна нова зайнята клітинка додає 1 сусідам над нею та з боків."""
+        x, y, z = pos
+        W, D, H = self.grid_shape
+        w, d, h = mask.shape
+        x0, y0, z0 = max(x - 1, 0), max(y - 1, 0), z
+        region = self.contact_field[x0:min(x + w + 1, W), y0:min(y + d + 1, D), z0:min(z + h + 1, H)]
+        values = np.zeros(region.shape, dtype=np.uint8)
+        values[x - x0:x - x0 + w, y - y0:y - y0 + d, :h] = mask
+        for offset in _CONTACT_NEIGHBOURS:
+            _shift_add(region, values, tuple(-o for o in offset))
 
     def check_stability(self, pos: Tuple[int, int, int], shape: np.ndarray) -> bool:
         return self.has_support(pos, shape)
 
     def find_best_position(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        if self.engine == "free_space":
+            return self._find_best_position_free_space(item)
+        if self.strategy == "extreme_points":
+            return self._find_best_position_extreme_points(item)
+        if self.engine == "heightmap":
+            return self._find_best_position_heightmap(item)
+        if self.search_mode == "scalar":
+            return self._find_best_position_scalar(item)
+        if self.coarse_factor > 1:
+            return self._find_best_position_coarse(item)
+        return self._find_best_position_vectorized(item)
+
+    def _find_best_position_scalar(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
         best_pos = None
         best_shape = None
         min_z = float('inf')
         max_contact = float('-inf')
+        stats = self.search_stats
 
-        rotations = self.get_possible_rotations(item)
-
-        for shape in rotations:
+        for rotation in self.get_rotation_shapes(item):
+            shape = rotation.shape
             shape_h, shape_w, shape_d = shape.shape
 
-            for z in range(self.space_matrix.shape[2] - shape_h + 1):
-                if z > min_z:
-                    continue
+            # Рівні вище min_z гірші, а на самому min_z пізніший поворот
+            # виграє лише строго більшим контактом – інакше досить рівнів нижче
+            z_limit = self.space_matrix.shape[2] - shape_h + 1
+            if best_pos is not None:
+                z_limit = min(z_limit, min_z + 1 if rotation.max_contact > max_contact else min_z)
+            stats["levels_skipped"] += self.space_matrix.shape[2] - shape_h + 1 - max(z_limit, 0)
+            if z_limit <= 0:
+                stats["rotations_pruned"] += 1
+                continue
+            stats["rotations_searched"] += 1
+
+            bound_reached = False
+            for z in range(z_limit):
+                if z > min_z or bound_reached:
+                    break
                 for x in range(self.space_matrix.shape[0] - shape_w + 1):
+                    if bound_reached:
+                        break
                     for y in range(self.space_matrix.shape[1] - shape_d + 1):
                         pos = (x, y, z)
+                        stats["positions_checked"] += 1
 
                         if (self.check_fit(pos, shape) and
                                 self.has_support(pos, shape) and
                                 self.check_stability(pos, shape)):
 
                             contact = self._calculate_contact(pos, shape)
+                            stats["candidates_scored"] += 1
 
                             if z < min_z or (z == min_z and contact > max_contact):
                                 min_z = z
                                 max_contact = contact
                                 best_pos = pos
                                 best_shape = shape.copy()
+                                if contact >= rotation.max_contact:
+                                    # Кращого на цьому рівні не буде, а вищі рівні гірші
+                                    stats["early_exits"] += 1
+                                    bound_reached = True
+                                    break
 
         # if best_pos is not None:
         #     print(f"Для елемента '{item.name}' обрана позиція {best_pos} з контактом {max_contact}")
@@ -247,13 +728,670 @@ class PackingOptimizer:
         #     print(f"Не знайдено допустимої позиції для елемента '{item.name}'")
         return best_pos, best_shape
 
+    def _find_best_position_vectorized(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Той самий критерій, що й у скалярному пошуку (мінімальна z, потім
+        максимальний контакт, при рівності – перша позиція в порядку перебору),
+        але fit/support рахуються одразу для всіх позицій повороту.
+        Інший критерій задає self.scoring.
+        """
+        rotations = self.get_rotation_shapes(item)
+        if self.occupancy == "bitset":
+            search = lambda rotation, z_start, z_stop: self._search_rotation_bitset(rotation, z_start, z_stop, item)
+        else:
+            search = lambda rotation, z_start, z_stop: self._search_rotation(
+                rotation, self.space_matrix, z_start, z_stop, item=item)
+        return self._search_rotations(rotations, search)
+
+    def _search_rotations(self, rotations: List[RotationShape],
+                          search: Callable) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Перебір поворотів, search(rotation, z_start, z_stop) шукає в [z_start, z_stop).
+        Без пулу (один потік або замалий обсяг, див. PARALLEL_MIN_CELLS)
+        і критерій за замовчуванням – послідовно з відсіканням
+        (_search_bounded); пул і lowest_first – шарами z знизу вгору
+        (_search_slabs). Інакше будь-який рівень може виявитися кращим,
+        тож повороти та шари z шукаються повністю.
+        """
+        W, D, H = self.grid_shape
+        parallel = self._parallel(W * D * H, len(rotations))
+        if not parallel and type(self.scoring) is LowestContactPolicy:
+            return self._search_bounded(rotations, lambda rotation, z_stop: search(rotation, 0, z_stop))
+        if parallel and self.scoring.lowest_first:
+            return self._search_slabs(rotations, search)
+
+        # Якщо потоків більше, ніж поворотів, ділимо ще й діапазон z на шари
+        workers = self.workers if parallel else 1
+        slabs = min(max(1, -(-workers // max(len(rotations), 1))), max(H, 1))
+        bounds = [(H * i // slabs, H * (i + 1) // slabs) for i in range(slabs)]
+        tasks = [(rot_idx, rotation, z_start, z_stop)
+                 for rot_idx, rotation in enumerate(rotations)
+                 for z_start, z_stop in bounds]
+        results = self._map_tasks(lambda task: search(task[1], task[2], task[3]), tasks, parallel)
+
+        # Шари одного повороту не перетинаються по z, тож мінімум за рангом
+        # дає той самий результат, що й послідовний пошук
+        return self._best_found([(rot_idx, rotation) for rot_idx, rotation, _, _ in tasks], results)
+
+    def _search_slabs(self, rotations: List[RotationShape],
+                      search: Callable) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Паралельний пошук з відсіканням по z: діапазон z ділиться на шари,
+        шари перебираються знизу вгору, а всі повороти одного шару шукаються
+        одночасно. Для lowest_first нижчий рівень завжди кращий, тож коли
+        в шарі знайдено позицію, вищі шари вже не перевіряються. Результат
+        той самий, що й у послідовного пошуку.
+        """
+        stats = self.search_stats
+        H = self.grid_shape[2]
+        slabs = min(max(self.PARALLEL_SLABS, -(-self.workers // max(len(rotations), 1))), max(H, 1))
+        indexed = list(enumerate(rotations))
+        # Найвищий рівень, з якого ще може початися хоч один поворот
+        top = max((H - rotation.shape.shape[0] for rotation in rotations), default=-1)
+        stats["rotations_searched"] += len(rotations)
+        for i in range(slabs):
+            z_start, z_stop = H * i // slabs, H * (i + 1) // slabs
+            if z_start > top:
+                break
+            results = self._map_tasks(lambda rotation: search(rotation, z_start, z_stop), rotations, True)
+            pos, shape = self._best_found(indexed, results)
+            if pos is not None:
+                stats["levels_skipped"] += sum(max(H - rotation.shape.shape[0] + 1 - z_stop, 0)
+                                               for rotation in rotations)
+                return pos, shape
+        return None, None
+
+    @staticmethod
+    def _best_found(rotations: List[Tuple[int, RotationShape]],
+                    results: list) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Найкращий з результатів (x, y, z, ключі) пошуку поворотів: ключі за
+        спаданням, потім індекс повороту та порядок перебору (z, x, y).
+        """
+        best = None  # ранг, позиція, форма
+        for (rot_idx, rotation), found in zip(rotations, results):
+            if found is None:
+                continue
+            x, y, z, key = found
+            rank = (tuple(-k for k in key), rot_idx, z, x, y)
+            if best is None or rank < best[0]:
+                best = (rank, (x, y, z), rotation.shape)
+
+        if best is None:
+            return None, None
+        return best[1], best[2].copy()
+
+    def _find_best_position_coarse(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Coarse-to-fine: груба сітка відкидає рівні z, де коробка точно не
+        вміщується, а точний векторний пошук іде лише по шарах решти рівнів,
+        знизу вгору. Умова на грубій сітці лише необхідна, тож результат
+        збігається з _find_best_position_vectorized.
+        """
+        rotations = self.get_rotation_shapes(item)
+        return self._search_rotations(
+            rotations, lambda rotation, z_start, z_stop: self._search_rotation_coarse(rotation, z_start, z_stop, item))
+
+    def _search_bounded(self, rotations: List[RotationShape],
+                        search: Callable) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Послідовний перебір поворотів з відсіканням: search(rotation, z_stop)
+        шукає лише нижче z_stop. Рівні вище найкращої z гірші, а на ній самій
+        пізніший поворот виграє лише строго більшим контактом – тож поворот,
+        чия верхня межа контакту не більша за найкращий, шукає тільки нижче.
+        Результат той самий, що й без відсікань.
+        """
+        stats = self.search_stats
+        H = self.grid_shape[2]
+        best = None  # (z, -contact, індекс повороту), позиція, форма
+        for rot_idx, rotation in enumerate(rotations):
+            z_stop = None
+            if best is not None:
+                best_z, best_contact = best[0][0], -best[0][1]
+                z_stop = best_z + 1 if rotation.max_contact > best_contact else best_z
+                stats["levels_skipped"] += max(H - rotation.shape.shape[0] + 1 - max(z_stop, 0), 0)
+                if z_stop <= 0:
+                    stats["rotations_pruned"] += 1
+                    continue
+            stats["rotations_searched"] += 1
+            found = search(rotation, z_stop)
+            if found is None:
+                continue
+            x, y, z, (_, contact) = found
+            key = (z, -contact, rot_idx)
+            if best is None or key < best[0]:
+                best = (key, (x, y, z), rotation.shape)
+
+        if best is None:
+            return None, None
+        return best[1], best[2].copy()
+
+    def _search_rotation_coarse(self, rotation: RotationShape, z_start: int = 0, z_stop: Optional[int] = None,
+                                item: Optional[Item] = None) -> Optional[Tuple[int, int, int, tuple]]:
+        if not rotation.mask.all():
+            # Умова на блоках виводиться для суцільного кубоїда; довільна форма
+            # може обійти зайнятий блок своєї обгортки – шукаємо повністю
+            return self._search_rotation(rotation, self.space_matrix, z_start, z_stop, item=item)
+        # BitGrid розпаковується лише у вікні кожного рівня
+        for level_start, level_stop, window in self._coarse_windows(rotation):
+            if z_stop is not None:
+                if level_start >= z_stop:
+                    break
+                level_stop = min(level_stop, z_stop)
+            level_start = max(level_start, z_start)
+            if level_start >= level_stop:
+                continue
+            found = self._search_rotation(rotation, self.space_matrix, level_start, level_stop, window, item)
+            if found is not None:
+                return found
+        return None
+
+    def _coarse_windows(self, rotation: RotationShape) -> List[Tuple[int, int, Tuple[int, int, int, int]]]:
+        """
+        Для кожного рівня грубої сітки, на якому поворот може вміститися, –
+        діапазон z точної сітки [z_start, z_stop) і вікно початків (x0, x1, y0, y1),
+        що охоплює всі придатні блоки цього рівня.
+
+        Коробка розміром s ≥ 2f клітинок повністю накриває щонайменше s // f - 1
+        блоків, і всі вони мають бути цілком вільними; менша – торкається
+        щонайменше ceil(s / f) блоків, і жоден з них не може бути зайнятий повністю.
+        """
+        f = self.coarse_factor
+        if 0 in rotation.shape.shape:
+            return []
+        dims = rotation.transposed.shape
+        inner = tuple(n // f - 1 for n in dims)
+        if min(inner) >= 1:
+            ok = _window_sums(self._coarse_free != self._coarse_cells, inner) == 0
+            first, last = lambda c: (c - 1) * f + 1, lambda c: c * f + 1
+        else:
+            ok = _window_sums(self._coarse_free == 0, tuple(-(-n // f) for n in dims)) == 0
+            first, last = lambda c: c * f, lambda c: (c + 1) * f
+
+        # Межі початків уздовж осі для блоків a..b, обрізані до [0, limit)
+        bounds = lambda a, b, limit: (max(first(int(a)), 0), min(last(int(b)), limit))
+        limits = [n - k + 1 for n, k in zip(self.grid_shape, dims)]
+        windows = []
+        for c in np.flatnonzero(ok.any(axis=(0, 1))):
+            z_start, z_stop = bounds(c, c, limits[2])
+            if z_start >= z_stop:
+                continue
+            xs = np.flatnonzero(ok[:, :, c].any(axis=1))
+            ys = np.flatnonzero(ok[:, :, c].any(axis=0))
+            windows.append((z_start, z_stop, bounds(xs[0], xs[-1], limits[0]) + bounds(ys[0], ys[-1], limits[1])))
+        return windows
+
+    def _update_coarse(self, pos: Tuple[int, int, int], dims: Tuple[int, int, int]):
+        """Перераховує вільні клітинки блоків грубої сітки, яких торкнулася коробка."""
+        f = self.coarse_factor
+        lo = [p // f for p in pos]
+        hi = [-(-(p + n) // f) for p, n in zip(pos, dims)]
+        region = self.space_matrix[lo[0] * f:hi[0] * f, lo[1] * f:hi[1] * f, lo[2] * f:hi[2] * f]
+        blocks = tuple(slice(a, b) for a, b in zip(lo, hi))
+        self._coarse_free[blocks] = self._coarse_cells[blocks] - _block_sums(region, f)
+
+    def _parallel(self, task_cells: int, tasks: int) -> bool:
+        """Чи варто роздавати задачі пулу: кілька потоків і досить великий обсяг пошуку."""
+        return self.workers > 1 and tasks > 1 and task_cells * tasks >= self.PARALLEL_MIN_CELLS
+
+    def _map_tasks(self, func: Callable, tasks: list, parallel: bool) -> list:
+        if not parallel or len(tasks) < 2:
+            return [func(task) for task in tasks]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return list(self._executor.map(func, tasks))
+
+    def close(self):
+        """Зупиняє потоки паралельного пошуку (якщо вони були створені)."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _search_rotation(self, rotation: RotationShape, occupied: np.ndarray,
+                         z_start: int = 0, z_stop: Optional[int] = None,
+                         window: Optional[Tuple[int, int, int, int]] = None,
+                         item: Optional[Item] = None) -> Optional[Tuple[int, int, int, tuple]]:
+        """
+        Найкраща за self.scoring допустима позиція в діапазоні [z_start, z_stop):
+        (x, y, z, ключі) або None. window = (x0, x1, y0, y1) обмежує початки
+        по x та y; поза ним допустимих позицій бути не повинно.
+        """
+        W, D, H = self.space_matrix.shape
+        shape_h, shape_w, shape_d = rotation.shape.shape
+        if shape_w > W or shape_d > D or shape_h > H or 0 in rotation.shape.shape:
+            return None
+        z_stop = H - shape_h + 1 if z_stop is None else min(z_stop, H - shape_h + 1)
+        x0, x1, y0, y1 = window or (0, W - shape_w + 1, 0, D - shape_d + 1)
+        if z_start >= z_stop or x0 >= x1 or y0 >= y1:
+            return None
+        area = (slice(x0, x1 + shape_w - 1), slice(y0, y1 + shape_d - 1))
+
+        # Рівні перебираються смугами знизу вгору, тож тимчасові масиви
+        # обмежені висотою смуги, а не всього контейнера
+        band = self.SEARCH_BAND
+        planes = []
+        for band_start in range(z_start, z_stop, band):
+            band_stop = min(band_start + band, z_stop)
+            feasible = self._feasible_band(rotation, occupied, area, band_start, band_stop)
+            for level in np.flatnonzero(feasible.any(axis=(0, 1))):
+                z = band_start + int(level)
+                planes.append((z, feasible[:, :, level].copy(), self._contact_layer(rotation, z, (x0, x1, y0, y1))))
+                if self.scoring.lowest_first:
+                    break
+            if planes and self.scoring.lowest_first:
+                break
+        if not planes:
+            return None
+        return self._select_candidate(item, rotation, planes, x0, y0)
+
+    def _feasible_band(self, rotation: RotationShape, occupied: np.ndarray, area: tuple,
+                       z_start: int, z_stop: int) -> np.ndarray:
+        """
+        Допустимі початки (x, y, z) для z з [z_start, z_stop) у вікні area:
+        коробка не перетинає зайнятий простір і має опору в шарі z-1.
+        """
+        shape_h = rotation.shape.shape[0]
+        # Перетин з зайнятим простором для всіх початків (x, y, z); індекс 0 – z_start
+        fit = _masked_window_sums(occupied[area + (slice(z_start, z_stop + shape_h - 1),)], rotation.mask) == 0
+
+        # Підтримка шару z-1 під основою коробки (на підлозі – завжди)
+        lifted = max(z_start, 1)
+        if lifted < z_stop:
+            if rotation.base_cells > 0:
+                support = _masked_window_sums(self.space_matrix[area + (slice(lifted - 1, z_stop - 1),)],
+                                              rotation.base[:, :, None])
+                fit[:, :, lifted - z_start:] &= support / rotation.base_cells >= self.support_threshold
+            else:
+                fit[:, :, lifted - z_start:] = False
+        return fit
+
+    def _count_candidates(self, count: int):
+        with self._stats_lock:
+            self.search_stats["candidates_scored"] += count
+
+    def _select_candidate(self, item: Optional[Item], rotation: RotationShape, planes: list,
+                          x0: int = 0, y0: int = 0) -> Tuple[int, int, int, tuple]:
+        """
+        Збирає допустимі позиції з шарів (z, feasible, contact) у CandidateBatch
+        (у порядку z, x, y) і обирає найкращу за self.scoring.
+        Ключі результату – значення ключів політики (для lowest_first – з -z попереду).
+        """
+        xs, ys, zs, contacts = [], [], [], []
+        for z, feasible, contact in planes:
+            px, py = np.nonzero(feasible)
+            xs.append(px + x0)
+            ys.append(py + y0)
+            zs.append(np.full(px.size, z))
+            contacts.append(contact[px, py])
+        batch = CandidateBatch(self, item, rotation, np.concatenate(xs), np.concatenate(ys),
+                               np.concatenate(zs), np.concatenate(contacts))
+        self._count_candidates(batch.x.size)
+
+        keys = list(self.scoring.keys(batch))
+        best = best_index(keys)
+        key = tuple(np.asarray(k)[best].item() for k in keys)
+        z = int(batch.z[best])
+        if self.scoring.lowest_first:
+            key = (-z,) + key
+        return int(batch.x[best]), int(batch.y[best]), z, key
+
+    def _search_rotation_bitset(self, rotation: RotationShape, z_start: int = 0, z_stop: Optional[int] = None,
+                                item: Optional[Item] = None) -> Optional[Tuple[int, int, int, tuple]]:
+        """
+        _search_rotation для BitGrid: fit кожного шару z – побітове AND
+        стовпчиків під вікном коробки з маскою її висот. Шари перебираються
+        знизу вгору, тож повна матриця ніколи не розпаковується.
+        """
+        grid = self.space_matrix
+        W, D, H = grid.shape
+        shape_h, shape_w, shape_d = rotation.shape.shape
+        if shape_w > W or shape_d > D or shape_h > H or 0 in rotation.shape.shape:
+            return None
+        z_stop = H - shape_h + 1 if z_stop is None else min(z_stop, H - shape_h + 1)
+
+        # Для суцільної коробки OR стовпчиків по вікну однаковий для всіх z
+        window = grid.window_or(shape_w, shape_d) if rotation.mask.all() else None
+        planes = []
+        for z in range(z_start, z_stop):
+            feasible = grid.fit_plane(rotation.mask, z, window)
+            if z > 0 and feasible.any():
+                if rotation.base_cells == 0:
+                    break
+                support = _masked_window_sums(grid.layer(z - 1)[:, :, None], rotation.base[:, :, None])[:, :, 0]
+                feasible &= support / rotation.base_cells >= self.support_threshold
+            if not feasible.any():
+                continue
+            planes.append((z, feasible, self._contact_layer(rotation, z)))
+            if self.scoring.lowest_first:
+                break
+        if not planes:
+            return None
+        return self._select_candidate(item, rotation, planes)
+
+    def _contact_layer(self, rotation: RotationShape, z: int,
+                       window: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        _calculate_contact для всіх початків (x, y) шару z одночасно: сума
+        поля дотику по вікну коробки плюс передня/задня грані.
+        Для window = (x0, x1, y0, y1) – лише для початків у ньому.
+        """
+        if not rotation.solid:
+            return self._face_contact_layer(rotation, z, window)
+        W, D, H = self.grid_shape
+        shape_w, shape_d, shape_h = rotation.transposed.shape
+        x0, x1, y0, y1 = window or (0, W - shape_w + 1, 0, D - shape_d + 1)
+        field = self._contact_region(slice(x0, x1 + shape_w - 1), slice(y0, y1 + shape_d - 1), z, shape_h)
+        # Вікно по z охоплює всю висоту поля – сумуємо її одразу в 2D
+        contact = _window_sums(np.sum(field, axis=2, dtype=np.int32), rotation.mask.shape[:2])
+
+        # Передня / задня грань: зайняті клітинки площин x - 1 та x + shape_w
+        # у вікні min(d, w) × min(h, d), як у _calculate_contact
+        face_w, face_h = rotation.front.shape
+        sx, ex = max(x0 - 1, 0), min(x1 + shape_w, W)
+        planes = self.space_matrix[sx:ex, y0:y1 + face_w - 1, z:z + face_h]
+        faces = _window_sums(np.sum(planes, axis=2, dtype=np.int32), (1, face_w))
+        xs = np.arange(x0, x1)
+        front = xs > 0
+        contact[front] += faces[xs[front] - 1 - sx]
+        back = xs + shape_w < W
+        contact[back] += faces[xs[back] + shape_w - sx]
+        return contact
+
+    def _face_contact_layer(self, rotation: RotationShape, z: int,
+                            window: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """_face_contact для всіх (x, y) шару z одночасно (з тими самими масками граней)."""
+        W, D, H = self.space_matrix.shape
+        shape_w, shape_d, shape_h = rotation.transposed.shape
+        if window is not None:
+            # Рахуємо на підматриці з запасом в одну клітинку для сусідніх граней
+            x0, x1, y0, y1 = window
+            sx, sy = max(x0 - 1, 0), max(y0 - 1, 0)
+            matrix = self.space_matrix[sx:min(x1 + shape_w, W), sy:min(y1 + shape_d, D), :]
+            W, D = matrix.shape[:2]
+        else:
+            matrix = self.space_matrix
+        nx, ny = W - shape_w + 1, D - shape_d + 1
+
+        if z == 0:
+            contact = np.full((nx, ny), rotation.base_cells, dtype=np.int64)
+        else:
+            contact = _masked_window_sums(matrix[:, :, z - 1:z], rotation.base[:, :, None])[:, :, 0]
+
+        # Передня / задня грань (x - 1 та x + shape_w)
+        layer = matrix[:, :, z:z + rotation.front.shape[1]]
+        front = _masked_window_sums(layer, rotation.front[None, :, :])[:, :ny, 0]
+        contact[1:] += front[:nx - 1]
+        back = _masked_window_sums(layer, rotation.back[None, :, :])[:, :ny, 0]
+        contact[:nx - 1] += back[shape_w:]
+
+        # Ліва / права грань (y - 1 та y + shape_d)
+        layer = matrix[:, :, z:z + shape_h]
+        left = _masked_window_sums(layer, rotation.left[:, None, :])[:, :, 0]
+        contact[:, 1:] += left[:, :ny - 1]
+        right = _masked_window_sums(layer, rotation.right[:, None, :])[:, :, 0]
+        contact[:, :ny - 1] += right[:, shape_d:]
+
+        if window is not None:
+            return contact[x0 - sx:x1 - sx, y0 - sy:y1 - sy]
+        return contact
+
+    def _find_best_position_heightmap(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Пошук на карті висот: коробка опускається на найвищу точку під своєю
+        основою, тож fit – це максимум по вікну, а підтримка – частка
+        клітинок основи, що лежать саме на цій висоті.
+        """
+        best = None  # (z, -contact, індекс повороту), позиція, форма
+        shapes = self.get_possible_rotations(item)
+        W, D, _ = self.grid_shape
+        results = self._map_tasks(self._search_rotation_heightmap, shapes, self._parallel(W * D, len(shapes)))
+
+        for rot_idx, (shape, found) in enumerate(zip(shapes, results)):
+            if found is None:
+                continue
+            x, y, z, contact = found
+            key = (z, -contact, rot_idx)
+            if best is None or key < best[0]:
+                best = (key, (x, y, z), shape)
+
+        if best is None:
+            return None, None
+        return best[1], best[2].copy()
+
+    def _search_rotation_heightmap(self, shape: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        W, D, H = self.grid_shape
+        shape_h, shape_w, shape_d = shape.shape
+        if shape_w > W or shape_d > D or shape_h > H or 0 in shape.shape:
+            return None
+
+        heights = self.height_map
+        base = _window_max(heights, (shape_w, shape_d))
+        fit = base + shape_h <= H
+        area = shape_w * shape_d
+
+        # Перебираємо лише рівні, що реально трапляються серед кандидатів
+        for z in np.unique(base[fit]):
+            z = int(z)
+            feasible = fit & (base == z)
+            if z > 0:
+                on_level = _window_sums(heights == z, (shape_w, shape_d))
+                feasible &= on_level / area >= self.support_threshold
+            if not np.any(feasible):
+                continue
+
+            contact = self._contact_heightmap(shape_w, shape_d, shape_h, z)
+            self._count_candidates(int(np.count_nonzero(feasible)))
+            scores = np.where(feasible, contact, -1)
+            x, y = np.unravel_index(np.argmax(scores), scores.shape)
+            return int(x), int(y), z, int(scores[x, y])
+        return None
+
+    def _contact_heightmap(self, shape_w: int, shape_d: int, shape_h: int, z: int) -> np.ndarray:
+        """
+        Контакт для всіх (x, y) на рівні z: опора знизу плюс бічні стовпчики,
+        висота яких перекриває проміжок [z, z + shape_h).
+        """
+        W, D, _ = self.grid_shape
+        heights = self.height_map
+        nx, ny = W - shape_w + 1, D - shape_d + 1
+
+        if z == 0:
+            contact = np.full((nx, ny), shape_w * shape_d, dtype=np.int64)
+        else:
+            contact = _window_sums(heights == z, (shape_w, shape_d))
+
+        side = np.clip(heights - z, 0, shape_h)
+        along_y = _window_sums(side, (1, shape_d))
+        contact[1:] += along_y[:nx - 1]
+        contact[:nx - 1] += along_y[shape_w:]
+        along_x = _window_sums(side, (shape_w, 1))
+        contact[:, 1:] += along_x[:, :ny - 1]
+        contact[:, :ny - 1] += along_x[:, shape_d:]
+        return contact
+
+    def _find_best_position_free_space(self, item: Item) -> Tuple[Optional[Tuple[float, float, float]], Optional[Tuple[float, float, float]]]:
+        """
+        Пошук серед кутів максимальних порожніх просторів у мм.
+        Замість форми повертає розміри повороту (w, d, h).
+        """
+        best = None  # (z, -contact, індекс повороту), позиція, розміри
+
+        for rot_idx, rotation in enumerate(self.get_rotation_shapes(item)):
+            w, d, h = rotation.dims
+            if not self.check_dimensions((w, h, d)):
+                continue
+            found = self.free_space.find_position((w, d, h), self.support_threshold)
+            if found is None:
+                continue
+            pos, contact = found
+            key = (pos[2], -contact, rot_idx)
+            if best is None or key < best[0]:
+                best = (key, pos, (w, d, h))
+
+        if best is None:
+            return None, None
+        return best[1], best[2]
+
+    def _find_best_position_extreme_points(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Перевіряє лише кутові точки з self.extreme_points. Критерій той самий:
+        мінімальна z, потім максимальний контакт, при рівності – перша точка
+        в порядку (z, x, y), як у повному переборі.
+        """
+        if self.engine == "heightmap":
+            return self._find_best_position_extreme_points_heightmap(item)
+        points = sorted(self.extreme_points, key=lambda p: (p[2], p[0], p[1]))
+        best = None  # (z, -contact, індекс повороту), позиція, форма
+
+        for rot_idx, shape in enumerate(self.get_possible_rotations(item)):
+            # Поворот, менший за крок сітки, не займає жодної клітинки
+            if 0 in shape.shape:
+                continue
+            for point in points:
+                # Позиція має z самої точки, тож вищі точки вже не кращі
+                if best is not None and point[2] > best[0][0]:
+                    break
+                found = self._evaluate_point(point, shape)
+                if found is None:
+                    continue
+                self.search_stats["candidates_scored"] += 1
+                pos, contact = found
+                key = (pos[2], -contact, rot_idx)
+                if best is None or key < best[0]:
+                    best = (key, pos, shape)
+
+        if best is None:
+            return None, None
+        return best[1], best[2].copy()
+
+    def _find_best_position_extreme_points_heightmap(self, item: Item) -> Tuple[Optional[Tuple[int, int, int]], Optional[np.ndarray]]:
+        """
+        Кутові точки на карті висот: від точки важливі лише (x, y), бо z
+        повороту – найвища поверхня під ним. Тож усі точки оцінюються
+        разом для кожного повороту (_evaluate_points_heightmap).
+        """
+        points = np.array(sorted({(p[0], p[1]) for p in self.extreme_points}), dtype=np.intp).reshape(-1, 2)
+        best = None  # (z, -contact, індекс повороту), позиція, форма
+
+        for rot_idx, shape in enumerate(self.get_possible_rotations(item)):
+            found = self._evaluate_points_heightmap(points, shape)
+            if found is None:
+                continue
+            x, y, z, contact = found
+            key = (z, -contact, rot_idx)
+            if best is None or key < best[0]:
+                best = (key, (x, y, z), shape)
+
+        if best is None:
+            return None, None
+        return best[1], best[2].copy()
+
+    def _evaluate_point(self, point: Tuple[int, int, int], shape: np.ndarray) -> Optional[Tuple[Tuple[int, int, int], int]]:
+        if not (self.check_fit(point, shape) and self.has_support(point, shape)):
+            return None
+        return point, int(self._calculate_contact(point, shape))
+
+    def _evaluate_points_heightmap(self, points: np.ndarray, shape: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Найкраща з точок points (N, 2) для повороту shape: (x, y, z, контакт)
+        або None. z і контакт – як у _search_rotation_heightmap, але лише для
+        вікон, що починаються в цих точках; при рівності – менші x, потім y.
+        """
+        W, D, H = self.grid_shape
+        shape_h, shape_w, shape_d = shape.shape
+        if shape_w > W or shape_d > D or shape_h > H or 0 in shape.shape:
+            return None
+        xs, ys = points[:, 0], points[:, 1]
+        inside = (xs + shape_w <= W) & (ys + shape_d <= D)
+        xs, ys = xs[inside], ys[inside]
+        if xs.size == 0:
+            return None
+
+        heights = self.height_map
+        windows = np.lib.stride_tricks.sliding_window_view(heights, (shape_w, shape_d))[xs, ys]
+        z = windows.max(axis=(1, 2))
+        on_level = np.count_nonzero(windows == z[:, None, None], axis=(1, 2))
+        area = shape_w * shape_d
+        feasible = (z + shape_h <= H) & ((z == 0) | (on_level / area >= self.support_threshold))
+        if not feasible.any():
+            return None
+        xs, ys, z, on_level = xs[feasible], ys[feasible], z[feasible], on_level[feasible]
+        self._count_candidates(int(xs.size))
+
+        # Бічні стовпчики навколо вікна; за межами контейнера висота 0 контакту не дає
+        padded = np.pad(heights, 1)
+        along_y = np.lib.stride_tricks.sliding_window_view(padded, shape_d, axis=1)
+        along_x = np.lib.stride_tricks.sliding_window_view(padded, shape_w, axis=0)
+        sides = np.concatenate([
+            along_y[xs, ys + 1], along_y[xs + shape_w + 1, ys + 1],
+            along_x[xs + 1, ys], along_x[xs + 1, ys + shape_d + 1]
+        ], axis=1)
+        contact = np.where(z == 0, area, on_level) + np.clip(sides - z[:, None], 0, shape_h).sum(axis=1)
+
+        best = np.lexsort((ys, xs, -contact, z))[0]
+        return int(xs[best]), int(ys[best]), int(z[best]), int(contact[best])
+
+    def _update_extreme_points(self, pos: Tuple[int, int, int], shape: np.ndarray):
+        """
+        Додає кутові точки нової коробки (та їх проєкції на найближчі
+        поверхні) і прибирає точки, які вона зайняла.
+        """
+        W, D, H = self.grid_shape
+        x, y, z = pos
+        shape_h, shape_w, shape_d = shape.shape
+
+        if self.engine == "heightmap":
+            # На карті висот z визначається самою картою, тож важливі лише (x, y)
+            corners = [(x, y), (x + shape_w, y), (x, y + shape_d)]
+            self.extreme_points = {
+                p for p in self.extreme_points
+                if not (x <= p[0] < x + shape_w and y <= p[1] < y + shape_d)
+            }
+            for cx, cy in corners:
+                if cx < W and cy < D:
+                    self.extreme_points.add((cx, cy, 0))
+            # z точок – поточна висота карти (дублікати (x, y) зливаються)
+            self.extreme_points = {(px, py, int(self.height_map[px, py])) for px, py, _ in self.extreme_points}
+            return
+
+        corners = [(x + shape_w, y, z), (x, y + shape_d, z), (x, y, z + shape_h)]
+        for corner in corners:
+            if corner[0] >= W or corner[1] >= D or corner[2] >= H or self.space_matrix[corner]:
+                continue
+            self.extreme_points.add(corner)
+            for axis in range(3):
+                self.extreme_points.add(self._project_point(corner, axis))
+        self.extreme_points = {p for p in self.extreme_points if not self.space_matrix[p]}
+
+    def _project_point(self, point: Tuple[int, int, int], axis: int) -> Tuple[int, int, int]:
+        """Зсуває вільну точку вздовж осі до найближчої зайнятої клітинки або стінки."""
+        index = list(point)
+        index[axis] = slice(0, point[axis])
+        occupied = np.flatnonzero(self.space_matrix[tuple(index)])
+        projected = list(point)
+        projected[axis] = int(occupied[-1]) + 1 if occupied.size else 0
+        return tuple(projected)
+
     def place_item(self, pos: Tuple[int, int, int], item: Item, shape: np.ndarray):
+        if self.engine == "free_space":
+            self._place_item_free_space(pos, item, shape)
+            return
         x, y, z = pos
         shape_h, shape_w, shape_d = shape.shape
         shape_transposed = shape.transpose(1, 2, 0)
 
         # Оновлюємо матрицю, позначаючи зайнятий простір
-        self.space_matrix[x:x + shape_w, y:y + shape_d, z:z + shape_h] += shape_transposed
+        if self.engine == "heightmap":
+            self.height_map[x:x + shape_w, y:y + shape_d] = z + shape_h
+        elif self.occupancy == "bitset":
+            self.space_matrix.fill(x, y, z, shape_transposed)
+        else:
+            self.space_matrix[x:x + shape_w, y:y + shape_d, z:z + shape_h] |= shape_transposed != 0
+            self._update_contact_field(pos, shape_transposed != 0)
+        if self.coarse_factor > 1:
+            self._update_coarse(pos, (shape_w, shape_d, shape_h))
+        if self.strategy == "extreme_points":
+            self._update_extreme_points(pos, shape)
 
         occupied = np.argwhere(shape_transposed > 0)
         if occupied.size == 0:
@@ -280,6 +1418,58 @@ class PackingOptimizer:
         })
         self.current_weight += item.weight
 
+    def _place_item_free_space(self, pos: Tuple[float, float, float], item: Item, dims: Tuple[float, float, float]):
+        self.free_space.place(pos, dims)
+        color = (random.random(), random.random(), random.random())
+        self.packed_items.append({
+            'name': item.name,
+            'position': pos,
+            'size': dims,
+            'color': color,
+            'weight': item.weight
+        })
+        self.current_weight += item.weight
+
+    def _is_known_failure(self, key: tuple) -> bool:
+        if key not in self._failure_memo:
+            return False
+        epoch = self._failure_memo[key]
+        return epoch is None or epoch == len(self.packed_items)
+
+    def _remember_failure(self, key: tuple, item: Item):
+        """
+        Зайнятість під час пакування лише зростає, тож коли коробка не
+        вміщується навіть без урахування підтримки – вона не вміститься вже
+        ніколи (None). Інакше невдача дійсна лише до наступного розміщення:
+        нова коробка може дати опору.
+        """
+        self._failure_memo[key] = len(self.packed_items) if self._fits_anywhere(item) else None
+
+    def _fits_anywhere(self, item: Item) -> bool:
+        """Чи є для коробки хоч одне вільне місце без урахування підтримки."""
+        W, D, H = self.grid_shape
+        for rotation in self.get_rotation_shapes(item):
+            if self.engine == "free_space":
+                w, d, h = rotation.dims
+                if self.check_dimensions((w, h, d)) and self.free_space.can_hold((w, d, h)):
+                    return True
+                continue
+
+            shape_h, shape_w, shape_d = rotation.shape.shape
+            if shape_w > W or shape_d > D or shape_h > H or 0 in rotation.shape.shape:
+                continue
+            if self.engine == "heightmap":
+                if np.any(_window_max(self.height_map, (shape_w, shape_d)) + shape_h <= H):
+                    return True
+            elif self.occupancy == "bitset":
+                grid = self.space_matrix
+                window = grid.window_or(shape_w, shape_d) if rotation.mask.all() else None
+                if any(grid.fit_plane(rotation.mask, z, window).any() for z in range(H - shape_h + 1)):
+                    return True
+            elif np.any(_masked_window_sums(self.space_matrix, rotation.mask) == 0):
+                return True
+        return False
+
     def precheck(self) -> bool:
         container_volume = self.container.width * self.container.height * self.container.depth
         total_item_volume = 0
@@ -295,14 +1485,81 @@ class PackingOptimizer:
             total_item_volume += volume
             total_item_weight += item.weight
 
-        if total_item_weight > self.container.max_weight:
+        if total_item_weight > self.container.max_weight and self.warn_overweight:
             print("Попередження: Загальна вага коробок перевищує ліміт контейнера.")
             # ► НЕ повертаємо False, а даємо алгоритму шанс покласти стільки,
             #   скільки дозволяє вага
             # return False          ← забираємо/коментуємо
         return True
 
-    def pack(self, progress_cb: Optional[Callable[[int, int], None]] = None) -> float:
+    def priority_key(self, item: Item) -> tuple:
+        """Ключ жадібного порядку пакування: більші об'єм, площа та вага – раніше."""
+        return (
+            -(item.width * item.height * item.depth if item.shape is None else np.sum(item.shape) * (self.grid_size ** 3)),
+            -(item.width * item.depth if item.shape is None else item.shape.shape[1] * item.shape.shape[2] * (self.grid_size ** 2)),
+            -item.weight
+        )
+
+    def _pack_one(self, item: Item, failed_items: dict, skipped_items: dict,
+                  unplaced_items: list) -> Tuple[str, float]:
+        """
+        Розміщує одну коробку. Повертає статус ("placed", "failed" або
+        "skipped" – без пошуку) та розміщений об'єм.
+        """
+        # Перевірка на ліміт за вагою
+        if self.current_weight + item.weight > self.container.max_weight:
+            failed_items[item.name] += 1
+            unplaced_items.append(item)
+            return "failed", 0.0
+
+        # Та сама коробка вже не вмістилась – результат пошуку відомий
+        item_key = self._rotation_key(item)
+        if self._is_known_failure(item_key):
+            failed_items[item.name] += 1
+            skipped_items[item.name] += 1
+            unplaced_items.append(item)
+            return "skipped", 0.0
+
+        # Пошук найкращої позиції та форми
+        best_pos, best_shape = self.find_best_position(item)
+        if best_pos is None or best_shape is None:
+            # Не вдалося розмістити
+            failed_items[item.name] += 1
+            unplaced_items.append(item)
+            self._remember_failure(item_key, item)
+            return "failed", 0.0
+
+        # Розміщуємо предмет і повертаємо використаний об'єм
+        packed_before = len(self.packed_items)
+        self.place_item(best_pos, item, best_shape)
+        if len(self.packed_items) == packed_before:
+            # place_item нічого не додав (порожня форма) – це невдача, а не розміщення
+            failed_items[item.name] += 1
+            unplaced_items.append(item)
+            self._remember_failure(item_key, item)
+            return "failed", 0.0
+        if item.shape is None:
+            return "placed", item.width * item.height * item.depth
+        return "placed", np.sum(best_shape) * (self.grid_size ** 3)
+
+    def pack(self, progress_cb: Optional[Callable[[int, int], None]] = None,
+             sort_items: bool = True, write_report: bool = True,
+             cancel_event: Optional[threading.Event] = None, deadline: Optional[float] = None,
+             item_cb: Optional[Callable[[List[dict]], None]] = None, progress_interval: float = 0.1) -> float:
+        """
+        Жадібне пакування self.items. sort_items=False зберігає заданий порядок
+        (його підбирає improve.py), write_report=False не надсилає звіт у result_sink.
+
+        Якщо встановлено cancel_event або настав deadline (time.time()), пакування
+        зупиняється перед наступною коробкою: вже розміщені лишаються коректним
+        частковим результатом, self.interrupted = "cancelled" / "deadline",
+        а нерозглянуті коробки потрапляють у unplaced_items та pending_items.
+
+        progress_cb(done, total) викликається по ходу пакування, але не частіше
+        ніж раз на progress_interval секунд (і завжди – для останньої коробки).
+        item_cb отримує з тією ж частотою список записів про оброблені коробки:
+        name, placed, skipped, seconds і stats – приріст search_stats на коробку.
+        """
         # Перед розміщенням перевіряємо, чи допускається завантаження за обʼємом та вагою
         if not self.precheck():
             print("Неможливо розмістити коробки: обʼєм або вага перевищують можливості контейнера.")
@@ -310,13 +1567,16 @@ class PackingOptimizer:
 
         # Ініціалізуємо лічильник непридатних коробок
         failed_items = defaultdict(int)
+        skipped_items = defaultdict(int)
+        pending_items = defaultdict(int)
+        unplaced_items = []
+        self.interrupted = None
+        # Типи коробок, для яких пошук позиції вже завершився невдачею
+        self._failure_memo = {}
 
         # Сортування предметів за пріоритетом (об'єм, площа, вага)
-        self.items.sort(key=lambda x: (
-            -(x.width * x.height * x.depth if x.shape is None else np.sum(x.shape) * (self.grid_size ** 3)),
-            -(x.width * x.depth if x.shape is None else x.shape.shape[1] * x.shape.shape[2] * (self.grid_size ** 2)),
-            -x.weight
-        ))
+        if sort_items:
+            self.items.sort(key=self.priority_key)
 
         total_volume = 0.0
         container_volume = self.container.width * self.container.height * self.container.depth
@@ -325,61 +1585,126 @@ class PackingOptimizer:
         total_items = len(self.items)
         if progress_cb:
             progress_cb(0, total_items)
-
-        for item in self.items:
-            # Перевірка на ліміт за вагою
-            if self.current_weight + item.weight > self.container.max_weight:
-                failed_items[item.name] += 1
-                continue
-
-            # Пошук найкращої позиції та форми
-            best_pos, best_shape = self.find_best_position(item)
-            if best_pos is not None and best_shape is not None:
-                # Розміщуємо предмет
-                self.place_item(best_pos, item, best_shape)
-                # Оновлюємо використаний об'єм
-                if item.shape is None:
-                    total_volume += item.width * item.height * item.depth
-                else:
-                    total_volume += np.sum(best_shape) * (self.grid_size ** 3)
-            else:
-                # Не вдалося розмістити
-                failed_items[item.name] += 1
+        # Записи item_cb, що накопичились з останнього виклику
+        item_records = []
+        last_report = start_time
+
+        def report(done: int, force: bool = False):
+            nonlocal item_records, last_report
+            now = time.time()
+            if not force and now - last_report < progress_interval:
+                return
+            last_report = now
+            if progress_cb:
+                progress_cb(done, total_items)
+            if item_cb and item_records:
+                records, item_records = item_records, []
+                item_cb(records)
+
+        instrumentation = self.instrumentation
+        if instrumentation:
+            instrumentation.start_profile()
+        try:
+            for index, item in enumerate(self.items):
+                if cancel_event is not None and cancel_event.is_set():
+                    self.interrupted = "cancelled"
+                elif deadline is not None and time.time() >= deadline:
+                    self.interrupted = "deadline"
+                if self.interrupted:
+                    for rest in self.items[index:]:
+                        pending_items[rest.name] += 1
+                        unplaced_items.append(rest)
+                    break
+
+                item_started = time.time()
+                stats_before = dict(self.search_stats) if item_cb or instrumentation else None
+                status, volume = self._pack_one(item, failed_items, skipped_items, unplaced_items)
+                total_volume += volume
+
+                if instrumentation:
+                    instrumentation.record_item(
+                        self.search_stats["candidates_scored"] - stats_before["candidates_scored"],
+                        time.time() - item_started)
+                if item_cb:
+                    item_records.append({
+                        'name': item.name,
+                        'placed': status == "placed",
+                        'skipped': status == "skipped",
+                        'seconds': time.time() - item_started,
+                        'stats': {k: v - stats_before[k] for k, v in self.search_stats.items()}
+                    })
+                report(index + 1, force=index + 1 == total_items)
+        finally:
+            # Потоки пошуку потрібні лише під час пакування
+            self.close()
+            if instrumentation:
+                instrumentation.stop_profile()
+                instrumentation.dump()
 
         end_time = time.time()
         duration = end_time - start_time
 
-        # Оновлення прогресу
-        for idx, _ in enumerate(self.items, start=1):
-            if progress_cb:
-                progress_cb(idx, total_items)
+        # Після скасування останні оброблені коробки ще не повідомлені
+        if self.interrupted:
+            report(total_items - sum(pending_items.values()), force=True)
 
         # Обчислення відсотка використання об'єму
         self.space_utilization = (total_volume / container_volume) * 100.0
 
         # Зберігаємо непоміщені елементи для GUI
         self.failed_items = dict(failed_items)
+        self.skipped_items = dict(skipped_items)
+        self.pending_items = dict(pending_items)
+        self.unplaced_items = unplaced_items
+        # Нерозглянуті коробки додаються в кінець unplaced_items, решта – невдачі
+        failed_units = Counter((item.name, item.width, item.height, item.depth, item.weight)
+                               for item in unplaced_items[:len(unplaced_items) - sum(pending_items.values())])
+        self.failed_types = [
+            {"name": name, "width": width, "height": height, "depth": depth, "weight": weight, "count": count}
+            for (name, width, height, depth, weight), count in failed_units.items()
+        ]
+
+        self.duration = duration
+        self.finished_at = end_time
+        if write_report:
+            self.submit_report()
+        return self.space_utilization
 
-        # Підготовка підсумкового звіту
-        final_weight = self.current_weight
+    def submit_report(self):
+        """
+        Надсилає підсумковий звіт останнього pack() у result_sink. pack()
+        робить це сам, якщо write_report=True; з write_report=False звіт
+        можна надіслати пізніше – наприклад, лише для обраного з кількох пробних пакувань.
+        """
         packed_summary = defaultdict(lambda: {'count': 0, 'total_weight': 0.0})
         for packed_item in self.packed_items:
             packed_summary[packed_item['name']]['count'] += 1
             packed_summary[packed_item['name']]['total_weight'] += packed_item['weight']
 
-        with open('result.txt', 'a', encoding='utf-8') as f:
-            f.write("### Результати Пакування\n")
-            f.write(f"Розміри контейнера (W x H x D): {self.container.width} x {self.container.height} x {self.container.depth} мм\n")
-            f.write(f"Час розрахунку: {duration:.2f} с\n")
-            f.write(f"Використання контейнера: {self.space_utilization:.2f}%\n")
-            f.write(f"Загальна вага: {final_weight:.2f} кг\n\n")
-
-        return self.space_utilization
+        # Запис виконує фоновий потік приймача, тут лише передаємо звіт
+        sink = self.result_sink if self.result_sink is not None else get_default_sink()
+        sink.submit({
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.finished_at)),
+            'container': {'width': self.container.width, 'height': self.container.height,
+                          'depth': self.container.depth, 'max_weight': self.container.max_weight},
+            'duration': self.duration,
+            'space_utilization': self.space_utilization,
+            'total_weight': self.current_weight,
+            'packed_count': len(self.packed_items),
+            'packed_summary': dict(packed_summary),
+            'failed_items': self.failed_items,
+            'interrupted': self.interrupted,
+            'pending_items': self.pending_items
+        })
 
     def get_packing_results(self) -> dict:
         return {
             'packed_items': self.packed_items,
-            'space_utilization': self.space_utilization
+            'space_utilization': self.space_utilization,
+            'search_stats': dict(self.search_stats),
+            'interrupted': self.interrupted,
+            'pending_items': dict(self.pending_items),
+            'instrumentation': self.instrumentation.report() if self.instrumentation else None
         }
 
 
@@ -0,0 +1,233 @@
+"""
+Кеш результатів пакування за вмістом запиту. Ключ – sha256 канонічного JSON
+з розмірів контейнера, коробок (у порядку додавання) і налаштувань
+оптимізатора; результат зберігається в тій самій базі, що й сесії
+(таблиця result_cache), тож повторне пакування того ж маніфесту
+повертається одразу і переживає перезапуск програми.
+
+    cache = ResultCache(max_bytes=64 * 1024 * 1024, max_age=30 * 24 * 3600)
+    hit = cache.pack(optimizer, progress_cb=..., cancel_event=...)
+
+Перервані (скасовані чи за дедлайном) пакування не кешуються. Старі записи
+видаляються після кожного запису: спершу старші за max_age секунд, далі
+найдавніше використані, доки кеш не вміститься в max_bytes і max_entries.
+"""
+import hashlib
+import itertools
+import json
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from db import DB_PATH, SessionStore, get_store, pack_placements, unpack_placements
+
+# Збільшується, коли змінюється алгоритм пакування і старі результати
+# перестають відповідати новим (або змінюється склад збереженого результату)
+CACHE_VERSION = 4
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+CACHE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS result_cache (
+        key TEXT PRIMARY KEY,
+        created REAL NOT NULL,
+        last_used REAL NOT NULL,
+        size INTEGER NOT NULL,
+        space_utilization REAL NOT NULL,
+        meta TEXT NOT NULL,
+        placements BLOB NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_result_cache_used ON result_cache (last_used)"
+)
+
+_SELECT_ENTRY = "SELECT space_utilization, meta, placements FROM result_cache WHERE key = ? AND last_used >= ?"
+_TOUCH_ENTRY = "UPDATE result_cache SET last_used = ? WHERE key = ?"
+_UPSERT_ENTRY = """
+    INSERT OR REPLACE INTO result_cache (key, created, last_used, size, space_utilization, meta, placements)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_EVICT_EXPIRED = "DELETE FROM result_cache WHERE last_used < ?"
+# Залишаємо найсвіжіше використані записи, поки їхній сумарний розмір
+# не перевищує max_bytes, а кількість – max_entries
+_EVICT_OVERFLOW = """
+    DELETE FROM result_cache WHERE key IN (
+        SELECT key FROM (
+            SELECT key,
+                   SUM(size) OVER (ORDER BY last_used DESC, key ROWS UNBOUNDED PRECEDING) AS total,
+                   ROW_NUMBER() OVER (ORDER BY last_used DESC, key) AS position
+            FROM result_cache
+        ) WHERE total > ? OR position > ?
+    )
+"""
+
+
+def _settings(optimizer, sort_items: bool) -> Dict[str, Any]:
+    """Налаштування, від яких залежить результат (кількість потоків – ні)."""
+    scoring = optimizer.scoring
+    return {
+        "engine": optimizer.engine,
+        "strategy": optimizer.strategy,
+        "search_mode": optimizer.search_mode,
+        "occupancy": optimizer.occupancy,
+        "grid_size": optimizer.grid_size,
+        "coarse_factor": optimizer.coarse_factor,
+        "support_threshold": optimizer.support_threshold,
+        "scoring": [type(scoring).__name__, scoring.name, vars(scoring)],
+        "sort_items": sort_items
+    }
+
+
+def request_key(optimizer, sort_items: bool = True) -> str:
+    """
+    sha256 канонічного JSON запиту: контейнер, коробки optimizer.items
+    (однакові сусідні коробки згортаються в одну з кількістю) і налаштування.
+    """
+    container = optimizer.container
+    items = [
+        [item.name, item.width, item.height, item.depth, item.weight, item.rotatable,
+         None if item.shape is None else np.asarray(item.shape).tolist()]
+        for item in optimizer.items
+    ]
+    request = {
+        "version": CACHE_VERSION,
+        "container": [container.width, container.height, container.depth, container.max_weight],
+        "items": [row + [len(list(group))] for row, group in itertools.groupby(items)],
+        "settings": _settings(optimizer, sort_items)
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Кеш результатів у базі сесій. Працює через SessionStore, тож кожен
+    потік має власне з'єднання і кеш можна читати з потоку пакування.
+    max_bytes / max_age / max_entries = None – відповідне обмеження вимкнено.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 max_age: Optional[float] = DEFAULT_MAX_AGE, max_entries: Optional[int] = None,
+                 store: Optional[SessionStore] = None):
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("Розмір кешу не може бути від'ємним")
+        if max_age is not None and max_age <= 0:
+            raise ValueError("Термін зберігання кешу має бути додатним")
+        if max_entries is not None and max_entries < 0:
+            raise ValueError("Кількість записів кешу не може бути від'ємною")
+        self.store = store or get_store(db_path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._ready = False
+
+    def _connection(self):
+        conn = self.store.connection()
+        if not self._ready:
+            for statement in CACHE_SCHEMA:
+                conn.execute(statement)
+            self._ready = True
+        return conn
+
+    def _oldest_allowed(self, now: float) -> float:
+        return now - self.max_age if self.max_age is not None else float("-inf")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Збережений результат або None; вдале читання оновлює last_used."""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(_SELECT_ENTRY, (key, self._oldest_allowed(now))).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute(_TOUCH_ENTRY, (now, key))
+        self.hits += 1
+        result = json.loads(row[1])
+        result["space_utilization"] = row[0]
+        result["packed_items"] = unpack_placements(row[2])
+        return result
+
+    def put(self, key: str, optimizer) -> None:
+        """Зберігає результат optimizer.pack() і прибирає зайві записи."""
+        meta = json.dumps({
+            "failed_items": optimizer.failed_items,
+            "failed_types": optimizer.failed_types,
+            "skipped_items": optimizer.skipped_items,
+            "total_weight": float(optimizer.current_weight)
+        }, ensure_ascii=False)
+        placements = pack_placements(optimizer.packed_items)
+        now = time.time()
+        self._connection()
+        with self.store.transaction() as conn:
+            conn.execute(_UPSERT_ENTRY, (key, now, now, len(placements) + len(meta),
+                                         float(optimizer.space_utilization), meta, placements))
+            self._evict(conn, now)
+
+    def evict(self) -> int:
+        """Застосовує обмеження до наявних записів; повертає кількість видалених."""
+        self._connection()
+        with self.store.transaction() as conn:
+            return self._evict(conn, time.time())
+
+    def _evict(self, conn, now: float) -> int:
+        removed = 0
+        if self.max_age is not None:
+            removed += conn.execute(_EVICT_EXPIRED, (self._oldest_allowed(now),)).rowcount
+        if self.max_bytes is not None or self.max_entries is not None:
+            # Вимкнене обмеження – число, якого кеш ніколи не досягне
+            limits = tuple(2 ** 62 if limit is None else limit for limit in (self.max_bytes, self.max_entries))
+            removed += conn.execute(_EVICT_OVERFLOW, limits).rowcount
+        return removed
+
+    def clear(self) -> None:
+        self._connection()
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM result_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM result_cache").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def restore(optimizer, result: Dict[str, Any]) -> None:
+        """
+        Переносить збережений результат в optimizer, ніби pack() щойно
+        завершився. Відновлюються лише результати, а не сітка зайнятості.
+        """
+        optimizer.packed_items = result["packed_items"]
+        optimizer.space_utilization = result["space_utilization"]
+        optimizer.failed_items = dict(result["failed_items"])
+        optimizer.failed_types = list(result["failed_types"])
+        optimizer.skipped_items = dict(result["skipped_items"])
+        optimizer.current_weight = result["total_weight"]
+        optimizer.interrupted = None
+        optimizer.pending_items = {}
+
+    def pack(self, optimizer, sort_items: bool = True, **pack_kwargs) -> bool:
+        """
+        optimizer.pack() з кешем: для вже відомого запиту результат береться
+        з бази, інакше пакування виконується і (якщо не перерване) зберігається.
+        Повертає True, якщо результат узято з кешу. Звіт у result_sink
+        надсилається лише для справжнього пакування.
+        """
+        key = request_key(optimizer, sort_items)
+        result = self.get(key)
+        if result is not None:
+            self.restore(optimizer, result)
+            progress_cb = pack_kwargs.get("progress_cb")
+            if progress_cb:
+                progress_cb(len(optimizer.items), len(optimizer.items))
+            return True
+        optimizer.pack(sort_items=sort_items, **pack_kwargs)
+        if not optimizer.interrupted:
+            try:
+                self.put(key, optimizer)
+            except Exception as e:
+                print(f"[WARN] Не вдалося зберегти результат у кеш: {e}")
+        return False
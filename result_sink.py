@@ -0,0 +1,180 @@
+"""
+Приймачі звітів про пакування. PackingOptimizer.pack() лише передає
+словник-звіт приймачу; запис у файл виконує фоновий потік, тож файловий
+ввід-вивід не впливає на час пакування.
+
+    NullSink()                      – звіти не зберігаються
+    BufferSink(maxlen)              – останні maxlen звітів у пам'яті
+    TextFileSink(path, max_bytes)   – текстовий звіт як раніше, з ротацією файлів
+    JsonLinesSink(path, max_bytes)  – JSON Lines, з ротацією файлів
+
+За замовчуванням використовується TextFileSink("result.txt"); змінити
+його для процесу можна через set_default_sink().
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+class ResultSink:
+    """Базовий приймач: submit() не блокує і не кидає винятків через ввід-вивід."""
+
+    def submit(self, report: Dict[str, Any]):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink(ResultSink):
+    """Звіти вимкнено."""
+
+    def submit(self, report: Dict[str, Any]):
+        pass
+
+
+class BufferSink(ResultSink):
+    """Останні maxlen звітів у пам'яті (None – без обмеження)."""
+
+    def __init__(self, maxlen: Optional[int] = 1000):
+        self.records = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def submit(self, report: Dict[str, Any]):
+        with self._lock:
+            self.records.append(report)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = list(self.records)
+            self.records.clear()
+        return records
+
+
+class _FileSink(ResultSink):
+    """
+    Файловий приймач: звіти стають у чергу, фоновий потік форматує їх
+    і дописує пачками. Коли файл перевищує max_bytes, він перейменовується
+    в path.1 (старіші – у path.2 ...), зберігається не більше backups копій.
+    """
+    _STOP = object()
+
+    def __init__(self, path: str, max_bytes: Optional[int] = 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def format(self, report: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def submit(self, report: Dict[str, Any]):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True,
+                                                    name=f"result-sink:{self.path}")
+                    self._thread.start()
+                    atexit.register(self.close)
+        self._queue.put(report)
+
+    def flush(self):
+        """Чекає, доки всі надіслані звіти буде записано."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Забираємо все, що накопичилось, і пишемо одним викликом
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(report is self._STOP for report in batch)
+            try:
+                self._write("".join(self.format(r) for r in batch if r is not self._STOP))
+            except Exception as e:
+                print(f"[WARN] Не вдалося записати звіт у {self.path}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, text: str):
+        if not text:
+            return
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class TextFileSink(_FileSink):
+    """Людиночитний звіт у форматі колишнього result.txt."""
+
+    def format(self, report: Dict[str, Any]) -> str:
+        container = report["container"]
+        lines = [
+            "### Результати Пакування",
+            f"Розміри контейнера (W x H x D): {container['width']} x {container['height']} x {container['depth']} мм",
+            f"Час розрахунку: {report['duration']:.2f} с",
+            f"Використання контейнера: {report['space_utilization']:.2f}%"
+        ]
+        if report.get("interrupted"):
+            lines.append(f"Пакування зупинено ({report['interrupted']}), "
+                         f"не розглянуто коробок: {sum(report['pending_items'].values())}")
+        lines.append(f"Загальна вага: {report['total_weight']:.2f} кг")
+        return "\n".join(lines) + "\n\n"
+
+
+class JsonLinesSink(_FileSink):
+    """Один JSON-об'єкт на рядок."""
+
+    def format(self, report: Dict[str, Any]) -> str:
+        return json.dumps(report, ensure_ascii=False, default=str) + "\n"
+
+
+_default_sink: Optional[ResultSink] = None
+_default_lock = threading.Lock()
+
+
+def get_default_sink() -> ResultSink:
+    global _default_sink
+    with _default_lock:
+        if _default_sink is None:
+            _default_sink = TextFileSink("result.txt")
+        return _default_sink
+
+
+def set_default_sink(sink: ResultSink):
+    """Приймач для оптимізаторів, створених без власного result_sink."""
+    global _default_sink
+    with _default_lock:
+        _default_sink = sink
@@ -0,0 +1,144 @@
+"""
+Політики оцінки позицій для PackingOptimizer (рушій grid, векторний пошук).
+
+Політика отримує всіх допустимих кандидатів одного повороту коробки
+масивами (CandidateBatch) і повертає ключі порівняння – масиви тієї ж
+довжини, від найважливішого; більше значення – краще. При повній рівності
+перемагає кандидат, що йде раніше (поворот, z, x, y), як і в повному переборі.
+Оцінка – операції NumPy над усіма кандидатами одразу, без циклів по клітинках.
+"""
+from dataclasses import dataclass
+from typing import Any, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class CandidateBatch:
+    """Допустимі позиції одного повороту; x, y, z – у клітинках сітки."""
+    optimizer: Any
+    item: Any
+    rotation: Any
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    contact: np.ndarray
+
+    @property
+    def size(self) -> Tuple[int, int, int]:
+        """(w, d, h) повороту в клітинках."""
+        return self.rotation.transposed.shape
+
+    def centres(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Центри коробки в кожній позиції, мм."""
+        g = self.optimizer.grid_size
+        w, d, h = self.size
+        return (self.x + w / 2) * g, (self.y + d / 2) * g, (self.z + h / 2) * g
+
+
+class ScoringPolicy:
+    """Базовий клас політики оцінки."""
+    name = ""
+    # True – кандидати беруться лише з найнижчого допустимого рівня z, і
+    # нижчий рівень завжди кращий (пошук зупиняється на першому такому рівні)
+    lowest_first = True
+
+    def keys(self, batch: CandidateBatch) -> Sequence[np.ndarray]:
+        raise NotImplementedError
+
+
+class LowestContactPolicy(ScoringPolicy):
+    """Критерій за замовчуванням: найнижчий рівень, потім найбільший контакт."""
+    name = "lowest_contact"
+
+    def keys(self, batch: CandidateBatch) -> Sequence[np.ndarray]:
+        return (batch.contact,)
+
+
+class CenterOfGravityPolicy(ScoringPolicy):
+    """
+    На найнижчому рівні обирає позицію, після якої спільний центр мас
+    вантажу (у площині підлоги) найближчий до центру контейнера; далі – контакт.
+    """
+    name = "center_of_gravity"
+
+    def keys(self, batch: CandidateBatch) -> Sequence[np.ndarray]:
+        opt = batch.optimizer
+        weight = batch.item.weight
+        mass = sum(p['weight'] for p in opt.packed_items)
+        if mass + weight <= 0:
+            return (batch.contact,)
+        moment_x = sum(p['weight'] * (p['position'][0] + p['size'][0] / 2) for p in opt.packed_items)
+        moment_y = sum(p['weight'] * (p['position'][1] + p['size'][1] / 2) for p in opt.packed_items)
+
+        cx, cy, _ = batch.centres()
+        gx = (moment_x + weight * cx) / (mass + weight) - opt.container.width / 2
+        gy = (moment_y + weight * cy) / (mass + weight) - opt.container.depth / 2
+        # Округлення прибирає шум float, щоб рівні відстані порівнювалися за контактом
+        return (-np.round(np.hypot(gx, gy), 6), batch.contact)
+
+
+class DoorSidePolicy(ScoringPolicy):
+    """
+    Завантаження від дальньої стінки до дверей: що раніше коробка пакується,
+    то глибше вона стоїть. door – сторона дверей ("y_max", "y_min", "x_max",
+    "x_min"). Далі – найнижча z та контакт.
+    """
+    name = "door_side"
+    lowest_first = False
+    DOORS = ("y_max", "y_min", "x_max", "x_min")
+
+    def __init__(self, door: str = "y_max"):
+        if door not in self.DOORS:
+            raise ValueError(f"Невідома сторона дверей: {door}")
+        self.door = door
+
+    def keys(self, batch: CandidateBatch) -> Sequence[np.ndarray]:
+        w, d, _ = batch.size
+        # Чим далі від дверей грань коробки, що до них звернена, тим краще
+        depth = {
+            "y_max": -(batch.y + d),
+            "y_min": batch.y,
+            "x_max": -(batch.x + w),
+            "x_min": batch.x
+        }[self.door]
+        return (depth, -batch.z, batch.contact)
+
+
+class WeightOnBottomPolicy(ScoringPolicy):
+    """
+    Важчі коробки не ставляться на легші: спершу найменша площа основи,
+    що спирається на легші коробки, далі – найнижча z та контакт.
+    """
+    name = "weight_on_bottom"
+    lowest_first = False
+
+    def keys(self, batch: CandidateBatch) -> Sequence[np.ndarray]:
+        opt = batch.optimizer
+        lighter = [p for p in opt.packed_items if p['weight'] < batch.item.weight]
+        if not lighter:
+            return (-batch.z, batch.contact)
+
+        boxes = np.array([[*p['position'], *p['size']] for p in lighter], dtype=float) / opt.grid_size
+        bx, by, bz, bw, bd, bh = (boxes[:, i] for i in range(6))
+        w, d, _ = batch.size
+        x, y, z = batch.x[:, None], batch.y[:, None], batch.z[:, None]
+        on_top = np.abs(bz + bh - z) < 1e-6
+        span_x = np.clip(np.minimum(x + w, bx + bw) - np.maximum(x, bx), 0, None)
+        span_y = np.clip(np.minimum(y + d, by + bd) - np.maximum(y, by), 0, None)
+        overload = np.sum(span_x * span_y * on_top, axis=1)
+        return (-overload, -batch.z, batch.contact)
+
+
+POLICIES = {policy.name: policy for policy in (
+    LowestContactPolicy, CenterOfGravityPolicy, DoorSidePolicy, WeightOnBottomPolicy
+)}
+
+
+def best_index(keys: Sequence[np.ndarray]) -> int:
+    """Індекс лексикографічно найбільшого кандидата; при рівності – першого."""
+    if len(keys) == 1:
+        return int(np.argmax(keys[0]))
+    # lexsort стабільний і сортує за останнім ключем – перевертаємо і беремо мінімум
+    order = np.lexsort(tuple(-np.asarray(key, dtype=float) for key in reversed(keys)))
+    return int(order[0])
@@ -0,0 +1,98 @@
+"""Пакетне пакування: статуси задач, часткові результати за дедлайном і запис результатів."""
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import batch
+from batch import load_manifest, main, pack_manifest, run_batch
+from db import SessionStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTAINER = {"width": 1000, "height": 1000, "depth": 1000, "max_weight": 10 ** 6}
+
+fork_only = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                               reason="підміна pack_manifest передається лише через fork")
+
+
+def _manifest(tmp_path, name, boxes):
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps([CONTAINER] + boxes), encoding="utf-8")
+    return str(path)
+
+
+def _box(name, size, quantity):
+    return {"name": name, "width": size, "height": size, "depth": size, "weight": 1, "quantity": quantity}
+
+
+def _total(result):
+    return (result["packed_count"] + sum(result["failed_items"].values())
+            + sum(result["skipped_items"].values()) + sum(result["pending_items"].values()))
+
+
+def test_pack_manifest_ok(tmp_path):
+    # Дев'ята однакова коробка вже не вміщується
+    path = _manifest(tmp_path, "m", [_box("a", 500, 8), _box("b", 500, 1)])
+    result = pack_manifest(path)
+    assert result["status"] == "ok"
+    assert result["packed_count"] == 8
+    assert result["failed_items"] == {"b": 1}
+    assert result["pending_items"] == {}
+    assert _total(result) == 9
+
+
+def test_pack_manifest_past_deadline_is_partial(tmp_path):
+    path = _manifest(tmp_path, "m", [_box("a", 500, 8)])
+    result = pack_manifest(path, deadline=time.time() - 1)
+    assert result["status"] == "partial"
+    assert result["packed_count"] == 0
+    assert result["pending_items"] == {"a": 8}
+    assert _total(result) == 8
+
+
+def test_timeout_returns_partial_result(tmp_path):
+    # На дрібній сітці повний маніфест пакується хвилинами
+    path = os.path.join(ROOT, "container_boxes.json")
+    [result] = run_batch([path], timeout=1.0, optimizer_options={"grid_size": 20})
+    assert result["status"] == "partial"
+    assert sum(result["pending_items"].values()) > 0
+    assert _total(result) == sum(item.quantity for item in load_manifest(path)[1])
+
+
+def test_errors_do_not_stop_the_batch(tmp_path):
+    good = [_manifest(tmp_path, f"good{i}", [_box("a", 500, i + 1)]) for i in range(3)]
+    broken = _manifest(tmp_path, "broken", [{"name": "a", "width": 100}])
+    results = {os.path.basename(r["manifest"]): r for r in run_batch(good + [broken], workers=2)}
+    assert {name: r["status"] for name, r in results.items()} == {
+        "good0.json": "ok", "good1.json": "ok", "good2.json": "ok", "broken.json": "error"}
+    assert "бракує поля" in results["broken.json"]["error"]
+    assert [results[f"good{i}.json"]["packed_count"] for i in range(3)] == [1, 2, 3]
+
+
+@fork_only
+def test_unresponsive_job_is_terminated(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "pack_manifest", lambda *args: time.sleep(60))
+    monkeypatch.setattr(batch, "TIMEOUT_GRACE", 0.2)
+    path = _manifest(tmp_path, "m", [_box("a", 500, 1)])
+    started = time.time()
+    [result] = run_batch([path], timeout=0.2)
+    assert result["status"] == "timeout"
+    assert time.time() - started < 10
+
+
+def test_cli_writes_jsonl_and_sessions(tmp_path):
+    paths = [_manifest(tmp_path, name, [_box("a", 500, 2)]) for name in ("one", "two")]
+    out, db_path = tmp_path / "results.jsonl", str(tmp_path / "sessions.db")
+    assert main([str(tmp_path), "-o", str(out), "--workers", "2", "--db", db_path]) == 0
+
+    lines = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert sorted(line["manifest"] for line in lines) == sorted(paths)
+    assert all(line["status"] == "ok" and line["packed_count"] == 2 for line in lines)
+
+    store = SessionStore(db_path)
+    try:
+        assert sorted(s["name"] for s in store.list_sessions()) == ["one", "two"]
+    finally:
+        store.close()
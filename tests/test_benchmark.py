@@ -0,0 +1,61 @@
+"""Бенчмарк: синтетичні маніфести, записи запусків і пошук регресій."""
+import json
+
+import pytest
+
+from benchmark import SYNTHETIC_CONTAINER, compare, generate_manifest, main, run_case
+
+
+def test_synthetic_manifest_is_reproducible_and_sized():
+    manifest = generate_manifest(500, seed=3)
+    assert manifest == generate_manifest(500, seed=3)
+    assert manifest != generate_manifest(500, seed=4)
+
+    container, boxes = manifest[0], manifest[1:]
+    assert sum(box["quantity"] for box in boxes) == 500
+    volume = sum(box["width"] * box["height"] * box["depth"] * box["quantity"] for box in boxes)
+    capacity = SYNTHETIC_CONTAINER["width"] * SYNTHETIC_CONTAINER["height"] * SYNTHETIC_CONTAINER["depth"]
+    # Округлення розмірів до мм лише трохи зсуває заданий fill = 1.1
+    assert volume / capacity == pytest.approx(1.1, rel=0.05)
+    assert container["max_weight"] >= sum(box["weight"] * box["quantity"] for box in boxes)
+
+
+def test_run_case_record():
+    manifest = [{"width": 1000, "height": 1000, "depth": 1000, "max_weight": 100},
+                {"name": "a", "width": 500, "height": 500, "depth": 500, "weight": 1, "quantity": 9}]
+    record = run_case("m", manifest, 100, "exhaustive", measure_memory=True, workers=2)
+    assert (record["packed_count"], record["failed_count"], record["workers"]) == (8, 1, 2)
+    assert record["space_utilization"] == pytest.approx(100.0)
+    assert record["peak_memory_bytes"] > 0
+    assert record["interrupted"] is None
+
+
+def _record(**changes):
+    record = {"manifest": "m", "engine": "grid", "strategy": "exhaustive", "grid_size": 100,
+              "wall_seconds": 1.0, "peak_memory_bytes": 1000, "space_utilization": 50.0, "packed_count": 10}
+    record.update(changes)
+    return record
+
+
+def test_compare_reports_regressions():
+    assert compare([_record()], [_record(wall_seconds=1.1, peak_memory_bytes=1100)], tolerance=0.2) == []
+    problems = compare([_record()], [_record(wall_seconds=2.0, peak_memory_bytes=5000, packed_count=9)])
+    assert len(problems) == 3
+    # Записи без workers – з одним потоком; інші випадки не порівнюються
+    assert len(compare([_record()], [_record(workers=1, wall_seconds=2.0)])) == 1
+    assert compare([_record()], [_record(workers=4, wall_seconds=2.0)]) == []
+
+
+def test_cli_compare_exit_code(tmp_path):
+    base, new = tmp_path / "base.json", tmp_path / "new.json"
+    args = ["--only-synthetic", "--synthetic", "20", "--grid-sizes", "200",
+            "--strategies", "extreme_points", "--no-memory"]
+    assert main(args + ["-o", str(base)]) == 0
+    report = json.loads(base.read_text(encoding="utf-8"))
+    assert [r["manifest"] for r in report["results"]] == ["synthetic_20"]
+    assert main(args + ["-o", str(new), "--compare", str(base), "--tolerance", "100"]) == 0
+
+    # Штучно кращий попередній результат – регресія
+    report["results"][0]["packed_count"] += 1
+    base.write_text(json.dumps(report), encoding="utf-8")
+    assert main(args + ["-o", str(new), "--compare", str(base), "--tolerance", "100"]) == 1
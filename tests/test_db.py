@@ -0,0 +1,284 @@
+"""Сховище сесій: нормалізована схема, міграція старих БД, потоки та аналітичні запити."""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+
+import pytest
+
+from db import SessionStore, pack_placements
+
+CONTAINER = {"width": 1000, "height": 1000, "depth": 1000, "max_weight": 500}
+
+
+def _placement(name, position, size, weight):
+    return {'name': name, 'position': position, 'size': size, 'color': (0.2, 0.4, 0.6), 'weight': weight}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def test_same_name_boxes_keep_their_own_types(store):
+    boxes = [
+        {"name": "box", "width": 100, "height": 200, "depth": 300, "weight": 5, "quantity": 2},
+        {"name": "box", "width": 400, "height": 400, "depth": 400, "weight": 9, "quantity": 3}
+    ]
+    # Повернуті розміщення обох типів (size – (w, d, h))
+    packed = [
+        _placement("box", (0, 0, 0), (300, 100, 200), 5),
+        _placement("box", (300, 0, 0), (400, 400, 400), 9)
+    ]
+    failed_types = [
+        {"name": "box", "width": 100, "height": 200, "depth": 300, "weight": 5, "count": 1},
+        {"name": "box", "width": 400, "height": 400, "depth": 400, "weight": 9, "count": 2}
+    ]
+    session_id = store.save_session("s", CONTAINER, boxes, packed, {"box": 3}, failed_types=failed_types)
+
+    types = store._query("""
+        SELECT t.width, t.height, t.depth, COUNT(*) AS placed FROM placements AS p
+        JOIN item_types AS t ON t.id = p.item_type_id GROUP BY t.id ORDER BY t.width
+    """)
+    assert [(row["width"], row["height"], row["depth"], row["placed"]) for row in types] == [
+        (100, 200, 300, 1), (400, 400, 400, 1)]
+
+    failures = {(row["width"], row["failed"]): row["failure_rate"] for row in store.top_failures()}
+    assert failures == {(100, 1): pytest.approx(1 / 2), (400, 2): pytest.approx(2 / 3)}
+
+    session = store.load_session(session_id)
+    assert session["failed_items"] == {"box": 3}
+    assert sorted(f["count"] for f in session["failed_types"]) == [1, 2]
+    assert store._query("SELECT failed_count FROM sessions")[0]["failed_count"] == 3
+
+
+def test_failures_by_name_use_the_only_matching_type(store):
+    boxes = [{"name": "box", "width": 100, "height": 100, "depth": 100, "weight": 1, "quantity": 4}]
+    session_id = store.save_session("s", CONTAINER, boxes, [], {"box": 4})
+    assert store.load_session(session_id)["failed_types"] == [
+        {"name": "box", "width": 100, "height": 100, "depth": 100, "weight": 1, "count": 4}]
+
+
+def test_ambiguous_or_unknown_failure_names_are_rejected(store):
+    boxes = [
+        {"name": "box", "width": 100, "height": 100, "depth": 100, "weight": 1, "quantity": 1},
+        {"name": "box", "width": 200, "height": 200, "depth": 200, "weight": 1, "quantity": 1}
+    ]
+    with pytest.raises(ValueError):
+        store.save_session("s", CONTAINER, boxes, [], {"box": 1})
+    with pytest.raises(ValueError):
+        store.save_session("s", CONTAINER, boxes[:1], [], {"other": 1})
+    # Невдала транзакція не лишає сесії
+    assert store.list_sessions() == []
+    assert store._query("SELECT COUNT(*) AS n FROM item_types WHERE width = 0")[0]["n"] == 0
+
+
+def test_optimizer_failed_types_round_trip(store):
+    from optimizer import Container, Item, PackingOptimizer
+    from result_sink import NullSink
+
+    optimizer = PackingOptimizer(Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6),
+                                 result_sink=NullSink())
+    optimizer.add_item(Item("box", 600, 600, 600, 1, quantity=2))
+    optimizer.add_item(Item("box", 200, 200, 200, 1, quantity=1))
+    optimizer.pack()
+    assert optimizer.failed_types == [
+        {"name": "box", "width": 600, "height": 600, "depth": 600, "weight": 1, "count": 1}]
+
+    boxes = [{"name": "box", "width": 600, "height": 600, "depth": 600, "weight": 1, "quantity": 2},
+             {"name": "box", "width": 200, "height": 200, "depth": 200, "weight": 1, "quantity": 1}]
+    session_id = store.save_session("s", CONTAINER, boxes, optimizer.packed_items, optimizer.failed_items,
+                                    failed_types=optimizer.failed_types)
+    session = store.load_session(session_id)
+    assert session["failed_types"] == optimizer.failed_types
+    assert store.top_failures()[0]["width"] == 600
+
+
+def test_aggregates(store):
+    boxes = [{"name": "a", "width": 100, "height": 100, "depth": 100, "weight": 1, "quantity": 1}]
+    for utilization in (10.0, 30.0):
+        store.save_session("s", CONTAINER, boxes, [], {}, space_utilization=utilization)
+    other = dict(CONTAINER, width=2000)
+    store.save_session("s", other, boxes, [], {}, space_utilization=50.0)
+
+    rows = store.utilization_by_container()
+    assert [(row["width"], row["sessions"], row["avg_utilization"]) for row in rows] == [
+        (1000, 2, 20.0), (2000, 1, 50.0)]
+    assert sum(row["sessions"] for row in store.utilization_by_day()) == 3
+
+
+LEGACY_BOXES = [
+    {"name": "crate", "width": 200, "height": 100, "depth": 300, "weight": 4, "quantity": 2},
+    {"name": "tube", "width": 100, "height": 100, "depth": 500, "weight": 1, "quantity": 1}
+]
+LEGACY_PACKED = [
+    _placement("crate", (0, 0, 0), (300, 200, 100), 4),
+    _placement("crate", (300, 0, 0), (200, 300, 100), 4),
+    _placement("tube", (0, 200, 0), (500, 100, 100), 1)
+]
+
+
+def _legacy_db(path, packed_column):
+    """БД старої схеми з двома сесіями: JSON-розміщення з pickle фігури або стиснутий blob."""
+    conn = sqlite3.connect(path)
+    if packed_column == "packed_items_json":
+        conn.execute("""
+            CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                timestamp TEXT NOT NULL, container_json TEXT NOT NULL, boxes_json TEXT NOT NULL,
+                fig_pickle BLOB NOT NULL, packed_items_json TEXT NOT NULL DEFAULT '[]')
+        """)
+        # Замість фігури matplotlib – pickle того ж порядку розміру
+        extra = ("fig_pickle",)
+        values = lambda: (pickle.dumps(os.urandom(256 * 1024)), json.dumps(LEGACY_PACKED))
+    else:
+        conn.execute("""
+            CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+                timestamp TEXT NOT NULL, container_json TEXT NOT NULL, boxes_json TEXT NOT NULL,
+                placements BLOB NOT NULL)
+        """)
+        extra = ()
+        values = lambda: (pack_placements(LEGACY_PACKED),)
+    columns = ", ".join(("id", "name", "timestamp", "container_json", "boxes_json") + extra + (packed_column,))
+    for session_id, name in ((3, "ранкове завантаження"), (7, "вечірнє завантаження")):
+        row = (session_id, name, "2024-05-0%d 10:00:00" % session_id, json.dumps(CONTAINER),
+               json.dumps(LEGACY_BOXES)) + values()
+        conn.execute(f"INSERT INTO sessions ({columns}) VALUES ({', '.join('?' * len(row))})", row)
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("packed_column", ["packed_items_json", "placements"])
+def test_legacy_database_is_migrated(tmp_path, packed_column):
+    path = str(tmp_path / "legacy.db")
+    _legacy_db(path, packed_column)
+    size_before = os.path.getsize(path)
+
+    store = SessionStore(path)
+    try:
+        tables = {row["name"] for row in store._query("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        columns = {row["name"] for row in store._query("PRAGMA table_info(sessions)")}
+        assert "sessions_legacy" not in tables
+        assert not columns & {"container_json", "boxes_json", "fig_pickle", "packed_items_json", "placements"}
+
+        # Ідентифікатори та назви зберігаються, розміщення – з типами коробок
+        assert [(s["id"], s["name"]) for s in store.list_sessions()] == [
+            (7, "вечірнє завантаження"), (3, "ранкове завантаження")]
+        session = store.load_session(3)
+        assert session["container"] == CONTAINER
+        assert session["boxes"] == LEGACY_BOXES
+        assert [(p["name"], p["position"], p["size"]) for p in session["packed_items"]] == [
+            (p["name"], tuple(map(float, p["position"])), tuple(map(float, p["size"]))) for p in LEGACY_PACKED]
+        assert session["packed_items"][0]["color"] == pytest.approx((0.2, 0.4, 0.6), abs=1 / 255)
+        assert session["failed_items"] == {}
+
+        # Індекс назв перебудовано для перенесених сесій
+        assert [s["id"] for s in store.list_sessions_page(query="вечірнє")] == [7]
+        # Нові сесії продовжують нумерацію після перенесених
+        assert store.save_session("нова", CONTAINER, LEGACY_BOXES, LEGACY_PACKED, {}) == 8
+    finally:
+        store.close()
+
+    if packed_column == "packed_items_json":
+        # Без pickle фігур VACUUM повертає місце
+        assert os.path.getsize(path) < size_before / 4
+
+
+def _named_sessions(store, names_and_times):
+    boxes = [{"name": "a", "width": 100, "height": 100, "depth": 100, "weight": 1, "quantity": 1}]
+    return store.save_sessions([{"name": name, "timestamp": timestamp, "container": CONTAINER, "boxes": boxes,
+                                 "packed_items": []} for name, timestamp in names_and_times])
+
+
+def test_history_pages_by_id(store):
+    ids = _named_sessions(store, [(f"s{i}", "2024-01-01 00:00:00") for i in range(25)])
+    pages, before_id = [], None
+    while True:
+        page = store.list_sessions_page(limit=10, before_id=before_id)
+        if not page:
+            break
+        pages.append([s["id"] for s in page])
+        before_id = page[-1]["id"]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == sorted(ids, reverse=True)
+
+
+def test_history_search_and_dates(store):
+    ids = _named_sessions(store, [
+        ("Київ коробки", "2024-03-01 08:00:00"),
+        ("Львів палети", "2024-03-01 23:30:00"),
+        ("Київ палети", "2024-03-02 09:00:00")
+    ])
+    search = lambda **kw: [s["id"] for s in store.list_sessions_page(**kw)]
+
+    assert store._fts
+    # Без урахування регістру, слова – префікси, усі слова обов'язкові
+    assert search(query="київ") == [ids[2], ids[0]]
+    assert search(query="пал") == [ids[2], ids[1]]
+    assert search(query="київ пал") == [ids[2]]
+    assert search(query='"') == []
+    # Дата без часу включає весь день
+    assert search(date_from="2024-03-01", date_to="2024-03-01") == [ids[1], ids[0]]
+    assert search(query="палети", date_from="2024-03-02") == [ids[2]]
+
+    # Індекс назв стежить за видаленням сесій
+    store.delete_session(ids[2])
+    assert search(query="київ") == [ids[0]]
+
+    # Без FTS5 пошук іде через LIKE
+    store._fts = False
+    assert search(query="Львів") == [ids[1]]
+
+
+def test_connection_per_thread(store):
+    main = store.connection()
+    assert store.connection() is main
+    assert store._query("PRAGMA journal_mode")[0]["journal_mode"] == "wal"
+
+    seen = []
+
+    def worker():
+        seen.append(store.connection())
+        store.close_thread()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert seen[0] is not main
+    # Закрите з'єднання потоку більше не тримається сховищем
+    assert seen[0] not in store._connections
+    with pytest.raises(sqlite3.ProgrammingError):
+        seen[0].execute("SELECT 1")
+    assert store._connections == [main]
+
+
+def test_concurrent_writers(store):
+    boxes = [{"name": "a", "width": 100, "height": 100, "depth": 100, "weight": 1, "quantity": 1}]
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(10):
+                store.save_session(f"w{n}-{i}", CONTAINER, boxes, [], {})
+        except Exception as e:
+            errors.append(e)
+        finally:
+            store.close_thread()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(store.list_sessions()) == 40
+    # Спільні типи контейнера й коробки не дублюються
+    assert store._query("SELECT COUNT(*) AS n FROM item_types")[0]["n"] == 1
+    assert store._query("SELECT COUNT(*) AS n FROM containers")[0]["n"] == 1
+
+
+def test_batch_save_keeps_order(store):
+    ids = _named_sessions(store, [("перша", "2024-01-01 00:00:00"), ("друга", "2024-01-01 00:00:00")])
+    assert [store.load_session(i)["name"] for i in ids] == ["перша", "друга"]
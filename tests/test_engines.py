@@ -0,0 +1,146 @@
+"""
+Рушії пакування: розміщення мають лежати в контейнері, не перетинатися
+і спиратися на підлогу чи верх інших коробок.
+"""
+import itertools
+import os
+
+import numpy as np
+import pytest
+
+from batch import load_manifest
+from optimizer import Container, Item, PackingOptimizer, create_l_shape
+from result_sink import NullSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENGINES = [
+    dict(engine="grid"),
+    dict(engine="heightmap"),
+    dict(engine="grid", strategy="extreme_points"),
+    dict(engine="heightmap", strategy="extreme_points")
+]
+IDS = ["grid", "heightmap", "grid_extreme_points", "heightmap_extreme_points"]
+
+
+def _pack(container, items, **options):
+    optimizer = PackingOptimizer(container, result_sink=NullSink(), **options)
+    for item in items:
+        optimizer.add_item(item)
+    optimizer.pack()
+    return optimizer
+
+
+def _boxes(optimizer):
+    return [(tuple(map(float, p['position'])), tuple(map(float, p['size']))) for p in optimizer.packed_items]
+
+
+def _overlap(a, b):
+    (pa, sa), (pb, sb) = a, b
+    return all(pa[i] < pb[i] + sb[i] and pb[i] < pa[i] + sa[i] for i in range(3))
+
+
+def _support(box, boxes):
+    """Частка основи box, що лежить на верхніх гранях інших коробок."""
+    (x, y, z), (w, d, h) = box
+    area = 0.0
+    for (ox, oy, oz), (ow, od, oh) in boxes:
+        if abs(oz + oh - z) < 1e-6:
+            dx = min(x + w, ox + ow) - max(x, ox)
+            dy = min(y + d, oy + od) - max(y, oy)
+            if dx > 0 and dy > 0:
+                area += dx * dy
+    return area / (w * d)
+
+
+def _check_valid(optimizer):
+    container = optimizer.container
+    limits = (container.width, container.depth, container.height)
+    boxes = _boxes(optimizer)
+    for position, size in boxes:
+        assert all(p >= 0 and p + s <= limit + 1e-6 for p, s, limit in zip(position, size, limits))
+    for a, b in itertools.combinations(boxes, 2):
+        assert not _overlap(a, b), (a, b)
+    for box in boxes:
+        if box[0][2] > 0:
+            assert _support(box, boxes) >= optimizer.support_threshold - 1e-9, box
+
+
+@pytest.mark.parametrize("options", ENGINES, ids=IDS)
+def test_manifest_placements_are_valid(options):
+    container, items = load_manifest(os.path.join(ROOT, "container_with_70_boxes.json"))
+    optimizer = _pack(container, items, **options)
+    assert optimizer.packed_items
+    _check_valid(optimizer)
+    assert sum(optimizer.failed_items.values()) + len(optimizer.packed_items) == sum(i.quantity for i in items)
+
+
+@pytest.mark.parametrize("options", ENGINES, ids=IDS)
+def test_stacks_when_floor_is_full(options):
+    container = Container(width=400, height=400, depth=400, max_weight=10 ** 6)
+    optimizer = _pack(container, [Item("box", 200, 200, 200, 1, quantity=8)], **options)
+    assert len(optimizer.packed_items) == 8
+    assert sorted({box[0][2] for box in _boxes(optimizer)}) == [0.0, 200.0]
+    _check_valid(optimizer)
+
+
+def test_heightmap_rejects_custom_shapes():
+    container = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+    optimizer = PackingOptimizer(container, engine="heightmap", result_sink=NullSink())
+    with pytest.raises(ValueError):
+        optimizer.add_item(Item("L", 200, 200, 200, 1, shape=create_l_shape(100)))
+
+
+def test_heightmap_extreme_points_follow_the_height_map():
+    container, items = load_manifest(os.path.join(ROOT, "container_with_70_boxes.json"))
+    optimizer = _pack(container, items, engine="heightmap", strategy="extreme_points")
+    # Одна точка на (x, y), z – поточна висота карти
+    assert len({(x, y) for x, y, _ in optimizer.extreme_points}) == len(optimizer.extreme_points)
+    assert all(z == optimizer.height_map[x, y] for x, y, z in optimizer.extreme_points)
+
+
+def _point_heightmap(optimizer, x, y, shape):
+    """Оцінка однієї точки карти висот напряму – еталон для пакетної."""
+    W, D, H = optimizer.grid_shape
+    shape_h, shape_w, shape_d = shape.shape
+    if x + shape_w > W or y + shape_d > D:
+        return None
+    heights = optimizer.height_map
+    window = heights[x:x + shape_w, y:y + shape_d]
+    z = int(window.max())
+    if z + shape_h > H or (z > 0 and np.sum(window == z) / window.size < optimizer.support_threshold):
+        return None
+    contact = window.size if z == 0 else int(np.sum(window == z))
+    sides = []
+    if x > 0:
+        sides.append(heights[x - 1, y:y + shape_d])
+    if x + shape_w < W:
+        sides.append(heights[x + shape_w, y:y + shape_d])
+    if y > 0:
+        sides.append(heights[x:x + shape_w, y - 1])
+    if y + shape_d < D:
+        sides.append(heights[x:x + shape_w, y + shape_d])
+    for side in sides:
+        contact += int(np.clip(side - z, 0, shape_h).sum())
+    return z, -contact, x, y
+
+
+def test_batched_heightmap_points_match_per_point_evaluation():
+    container, items = load_manifest(os.path.join(ROOT, "container_with_70_boxes.json"))
+    optimizer = PackingOptimizer(container, engine="heightmap", strategy="extreme_points", result_sink=NullSink())
+    for item in items:
+        optimizer.add_item(item)
+    optimizer.items = optimizer.items[:len(optimizer.items) // 2]
+    optimizer.pack()
+
+    points = np.array(sorted({(x, y) for x, y, _ in optimizer.extreme_points}), dtype=np.intp)
+    for item in items:
+        for shape in optimizer.get_possible_rotations(item):
+            found = [f for f in (_point_heightmap(optimizer, x, y, shape) for x, y in points) if f is not None]
+            expected = min(found) if found else None
+            batched = optimizer._evaluate_points_heightmap(points, shape)
+            if expected is None:
+                assert batched is None
+            else:
+                x, y, z, contact = batched
+                assert (z, -contact, x, y) == expected
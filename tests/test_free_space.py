@@ -0,0 +1,85 @@
+"""Максимальні порожні простори (FreeSpaceManager) і рушій free_space."""
+import itertools
+import os
+
+import numpy as np
+import pytest
+
+from batch import load_manifest
+from free_space import FreeSpaceManager
+from optimizer import Container, Item, PackingOptimizer
+from result_sink import NullSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _contains(outer, inner):
+    return all(outer[i] <= inner[i] and inner[i] + inner[i + 3] <= outer[i] + outer[i + 3] for i in range(3))
+
+
+def _intersects(a, b):
+    return all(a[i] < b[i] + b[i + 3] and b[i] < a[i] + a[i + 3] for i in range(3))
+
+
+def test_place_splits_into_maximal_spaces():
+    manager = FreeSpaceManager(1000, 1000, 1000)
+    manager.place((0, 0, 0), (400, 300, 200))
+    # Три максимальні залишки: праворуч, позаду та над коробкою
+    assert sorted(map(tuple, manager.spaces.tolist())) == [
+        (0, 0, 200, 1000, 1000, 800), (0, 300, 0, 1000, 700, 1000), (400, 0, 0, 600, 1000, 1000)]
+
+
+def test_spaces_stay_maximal_and_free():
+    rng = np.random.default_rng(0)
+    manager = FreeSpaceManager(1000, 800, 600)
+    for _ in range(25):
+        dims = tuple(float(v) for v in rng.integers(1, 5, size=3) * 100)
+        found = manager.find_position(dims, 0.3)
+        if found is not None:
+            manager.place(found[0], dims)
+    assert len(manager.boxes) > 5
+
+    spaces = manager.spaces.tolist()
+    for a, b in itertools.permutations(spaces, 2):
+        assert not _contains(b, a), (a, b)
+    for space, box in itertools.product(spaces, manager.boxes.tolist()):
+        assert not _intersects(space, box), (space, box)
+    for a, b in itertools.combinations(manager.boxes.tolist(), 2):
+        assert not _intersects(a, b)
+
+
+def test_find_position_prefers_lowest_level_then_contact():
+    manager = FreeSpaceManager(1000, 1000, 1000)
+    manager.place((0, 0, 0), (500, 1000, 500))
+    # На підлозі є місце – нижчий рівень важливіший за контакт
+    (position, contact) = manager.find_position((500, 1000, 500), 0.3)
+    assert position == (500.0, 0.0, 0.0)
+    assert contact == 500 * 1000 + 1000 * 500
+    assert manager.can_hold((500, 1000, 500))
+    assert not manager.can_hold((600, 1000, 600))
+
+
+def test_free_space_engine_packs_in_real_units():
+    # Розміри не кратні 100 мм – сітка їх округлила б
+    container = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+    optimizer = PackingOptimizer(container, engine="free_space", result_sink=NullSink())
+    optimizer.add_item(Item("a", 333, 333, 333, 1, quantity=27))
+    optimizer.pack()
+    assert len(optimizer.packed_items) == 27
+    assert optimizer.space_utilization == pytest.approx(27 * 333 ** 3 / 1e9 * 100)
+
+
+def test_free_space_engine_manifest_is_valid():
+    container, items = load_manifest(os.path.join(ROOT, "container_with_70_boxes.json"))
+    optimizer = PackingOptimizer(container, engine="free_space", result_sink=NullSink())
+    for item in items:
+        optimizer.add_item(item)
+    optimizer.pack()
+    boxes = [[*map(float, p['position']), *map(float, p['size'])] for p in optimizer.packed_items]
+    limits = (container.width, container.depth, container.height)
+    assert boxes
+    for box in boxes:
+        assert all(box[i] >= 0 and box[i] + box[i + 3] <= limits[i] + 1e-6 for i in range(3))
+    for a, b in itertools.combinations(boxes, 2):
+        assert not _intersects(a, b)
+    assert len(boxes) + sum(optimizer.failed_items.values()) == sum(item.quantity for item in items)
@@ -0,0 +1,59 @@
+"""Інструментація оптимізатора: лічильники гарячих методів, гістограми та профіль."""
+import json
+import pstats
+
+from instrumentation import _bucket
+from optimizer import Container, Item, PackingOptimizer
+from result_sink import NullSink
+
+CONTAINER = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+
+
+def _optimizer():
+    optimizer = PackingOptimizer(CONTAINER, result_sink=NullSink())
+    optimizer.add_item(Item("a", 500, 500, 500, 1, quantity=8))
+    # Довша за контейнер: перша – пошук, решта – пропуск за пам'яттю невдач
+    optimizer.add_item(Item("b", 1100, 100, 100, 1, quantity=3))
+    return optimizer
+
+
+def _placements(optimizer):
+    return [(p['name'], tuple(map(float, p['position']))) for p in optimizer.packed_items]
+
+
+def test_disabled_instrumentation_leaves_methods_alone():
+    optimizer = _optimizer()
+    assert "find_best_position" not in vars(optimizer)
+    optimizer.pack()
+    assert optimizer.get_packing_results()["instrumentation"] is None
+
+
+def test_counts_and_histograms(tmp_path):
+    plain = _optimizer()
+    plain.pack()
+
+    report_path, profile_path = tmp_path / "stats.json", tmp_path / "pack.prof"
+    optimizer = _optimizer()
+    instrumentation = optimizer.enable_instrumentation(str(report_path), str(profile_path))
+    assert optimizer.enable_instrumentation() is instrumentation
+    optimizer.pack()
+    assert _placements(optimizer) == _placements(plain)
+
+    report = optimizer.get_packing_results()["instrumentation"]
+    assert report["items"] == 11
+    assert report["methods"]["find_best_position"]["calls"] == 9
+    assert report["methods"]["place_item"]["calls"] == 8
+    assert sum(report["candidates_per_item"].values()) == sum(report["time_per_item"].values()) == 11
+    # Звіт і профіль записуються наприкінці pack()
+    assert json.loads(report_path.read_text(encoding="utf-8"))["items"] == 11
+    assert pstats.Stats(str(profile_path)).total_calls > 0
+    assert "find_best_position" in instrumentation.format_report()
+
+    optimizer.disable_instrumentation()
+    assert "find_best_position" not in vars(optimizer)
+    assert optimizer.instrumentation is None
+
+
+def test_histogram_buckets():
+    assert [_bucket(v) for v in (0, 1, 2, 3, 4, 7, 8, 1000)] == [
+        "0", "1", "2-3", "2-3", "4-7", "4-7", "8-15", "512-1023"]
@@ -0,0 +1,58 @@
+"""Режим кількох контейнерів: вибір типу, звіти та попередження про вагу."""
+import pytest
+
+from multi_container import MultiContainerPacker
+from optimizer import Container, Item
+from result_sink import BufferSink, NullSink
+
+
+SMALL = Container(width=1000, height=1000, depth=1000, max_weight=100, name="small", cost=1.0)
+BIG = Container(width=2000, height=1000, depth=1000, max_weight=200, name="big", cost=1.5)
+
+
+def test_cheapest_type_that_fits_everything():
+    packer = MultiContainerPacker([SMALL, BIG], result_sink=NullSink())
+    packer.add_item(Item("box", 500, 500, 500, 1, quantity=8))
+    containers = packer.pack()
+    assert [opt.container.name for opt in containers] == ["small"]
+    assert packer.failed_items == {}
+
+
+def test_opens_next_container_when_full():
+    packer = MultiContainerPacker([SMALL, BIG], result_sink=NullSink())
+    packer.add_item(Item("box", 500, 500, 500, 1, quantity=20))
+    containers = packer.pack()
+    assert sum(len(opt.packed_items) for opt in containers) == 20
+    # 16 коробок у великому дешевше, ніж два малі; залишок – у малий
+    assert [opt.container.name for opt in containers] == ["big", "small"]
+    assert packer.total_cost == pytest.approx(2.5)
+
+
+def test_max_containers_leaves_rest_failed():
+    packer = MultiContainerPacker([SMALL], max_containers=1, result_sink=NullSink())
+    packer.add_item(Item("box", 500, 500, 500, 1, quantity=10))
+    packer.pack()
+    assert packer.failed_items == {"box": 2}
+
+
+def test_reports_only_chosen_containers():
+    sink = BufferSink()
+    packer = MultiContainerPacker([SMALL, BIG], result_sink=sink)
+    packer.add_item(Item("box", 500, 500, 500, 1, quantity=20))
+    containers = packer.pack()
+    assert len(sink.drain()) == len(containers)
+
+
+def test_no_weight_warning_when_more_containers_can_open(capsys):
+    packer = MultiContainerPacker([SMALL], result_sink=NullSink())
+    packer.add_item(Item("box", 500, 500, 500, 30, quantity=8))
+    packer.pack()
+    assert "Попередження" not in capsys.readouterr().out
+    assert len(packer.containers) == 3
+
+
+def test_weight_warning_once_when_limit_exceeds_all_containers(capsys):
+    packer = MultiContainerPacker([SMALL, BIG], max_containers=1, result_sink=NullSink())
+    packer.add_item(Item("box", 500, 500, 500, 30, quantity=8))
+    packer.pack()
+    assert capsys.readouterr().out.count("Попередження") == 1
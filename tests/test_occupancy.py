@@ -0,0 +1,109 @@
+"""Компактна зайнятість (BitGrid) та віконні суми щільного пошуку."""
+import itertools
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from occupancy import BitGrid
+from optimizer import Container, Item, PackingOptimizer, _masked_window_sums, _window_sums
+from result_sink import NullSink
+
+
+def _naive_window_sums(arr, mask):
+    out_shape = tuple(n - k + 1 for n, k in zip(arr.shape, mask.shape))
+    out = np.zeros(out_shape, dtype=np.int64)
+    for start in itertools.product(*(range(n) for n in out_shape)):
+        window = tuple(slice(s, s + k) for s, k in zip(start, mask.shape))
+        out[start] = np.sum(arr[window] * mask)
+    return out
+
+
+@pytest.mark.parametrize("size", [(1, 1, 1), (2, 3, 4), (5, 1, 2), (3, 6, 7), (6, 6, 1)])
+def test_window_sums_match_naive(size):
+    # (6, 6, 7) – зокрема вікна довші за кількість початків (ковзна сума)
+    arr = np.random.default_rng(0).random((6, 6, 7)) < 0.4
+    mask = np.ones(size, dtype=int)
+    expected = _naive_window_sums(arr, mask)
+    assert np.array_equal(_window_sums(arr, size), expected)
+    assert np.array_equal(_masked_window_sums(arr, mask), expected)
+
+
+def test_masked_window_sums_with_holes():
+    arr = np.random.default_rng(1).random((7, 5, 6)) < 0.5
+    mask = np.ones((3, 2, 4), dtype=int)
+    mask[1:, :, 2:] = 0
+    assert np.array_equal(_masked_window_sums(arr, mask), _naive_window_sums(arr, mask))
+
+
+def test_window_larger_than_array_is_empty():
+    assert _window_sums(np.ones((3, 3, 3), dtype=bool), (4, 1, 1)).shape == (0, 3, 3)
+
+
+def test_bitgrid_matches_dense_grid():
+    rng = np.random.default_rng(2)
+    shape = (6, 5, 70)  # висота понад одне слово uint64
+    dense = np.zeros(shape, dtype=bool)
+    grid = BitGrid(shape)
+    for _ in range(12):
+        w, d, h = rng.integers(1, 4), rng.integers(1, 4), rng.integers(1, 20)
+        x, y, z = rng.integers(0, shape[0] - w + 1), rng.integers(0, shape[1] - d + 1), rng.integers(0, shape[2] - h + 1)
+        mask = rng.random((w, d, h)) < 0.7
+        dense[x:x + w, y:y + d, z:z + h] |= mask
+        grid.fill(x, y, z, mask)
+
+    assert np.array_equal(grid[:, :, :], dense)
+    assert np.array_equal(grid[1:4, 2, 60:70], dense[1:4, 2, 60:70])
+    for z in (0, 31, 63, 64, 69):
+        assert np.array_equal(grid.layer(z), dense[:, :, z])
+
+    box = np.ones((2, 3, 5), dtype=bool)
+    fit = _window_sums(dense, box.shape) == 0
+    for z in range(shape[2] - 5 + 1):
+        assert np.array_equal(grid.fit_plane(box, z), fit[:, :, z])
+        assert np.array_equal(grid.fit_plane(box, z, grid.window_or(2, 3)), fit[:, :, z])
+        assert grid.fits(0, 0, z, box) == fit[0, 0, z]
+    assert grid.nbytes == shape[0] * shape[1] * 2 * 8
+
+
+@pytest.mark.parametrize("occupancy, dtype", [("dense", np.bool_), ("bitset", np.uint64)])
+def test_compact_occupancy_storage(occupancy, dtype):
+    container = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+    optimizer = PackingOptimizer(container, occupancy=occupancy, result_sink=NullSink())
+    matrix = optimizer.space_matrix
+    assert (matrix.words if occupancy == "bitset" else matrix).dtype == dtype
+    optimizer.add_item(Item("box", 300, 300, 300, 1, quantity=3))
+    optimizer.pack()
+    assert int(np.count_nonzero(matrix[:, :, :])) == 3 * 27
+
+
+def test_dense_search_temporaries_are_bounded_by_band():
+    # Висока коробка: вікно по z майже на весь контейнер, але тимчасові
+    # масиви пошуку обмежені смугою рівнів, а не всією сіткою
+    container = Container(width=2000, height=2000, depth=2000, max_weight=10 ** 6)
+    optimizer = PackingOptimizer(container, grid_size=20, result_sink=NullSink())
+    optimizer.add_item(Item("tall", 400, 1800, 400, 1, quantity=3))
+    cells = int(np.prod(optimizer.grid_shape))
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        optimizer.pack()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    assert len(optimizer.packed_items) == 3
+    # Копії int32 усієї сітки давали тут ~14 байтів на клітинку
+    assert peak < 6 * cells
+
+
+def test_cuboid_rotations_do_not_store_cells():
+    container = Container(width=2000, height=2000, depth=2000, max_weight=10 ** 6)
+    optimizer = PackingOptimizer(container, grid_size=20, result_sink=NullSink())
+    rotations = optimizer.get_rotation_shapes(Item("box", 1000, 600, 400, 1))
+    assert len(rotations) == 6
+    for rotation in rotations:
+        # Перегляди з нульовими кроками замість масиву на кожну клітинку
+        for value in (rotation.shape, rotation.transposed, rotation.mask):
+            assert not any(value.strides)
+        assert rotation.solid and rotation.cells == 50 * 30 * 20
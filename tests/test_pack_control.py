@@ -0,0 +1,117 @@
+"""Керування pack(): скасування, дедлайн з частковим результатом і звіти про хід."""
+import threading
+import time
+
+import pytest
+
+from optimizer import Container, Item, PackingOptimizer
+from result_sink import BufferSink
+
+CONTAINER = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+
+
+def _optimizer(sink=None):
+    optimizer = PackingOptimizer(CONTAINER, result_sink=sink or BufferSink())
+    optimizer.add_item(Item("a", 500, 500, 500, 1, quantity=4))
+    optimizer.add_item(Item("b", 250, 250, 250, 1, quantity=8))
+    return optimizer
+
+
+def _accounted(optimizer):
+    return (len(optimizer.packed_items) + sum(optimizer.failed_items.values())
+            + sum(optimizer.pending_items.values()))
+
+
+def test_cancel_keeps_placed_boxes():
+    optimizer = _optimizer()
+    cancel = threading.Event()
+    seen = []
+
+    def item_cb(records):
+        # Скасування після третьої коробки
+        seen.extend(records)
+        if len(seen) >= 3:
+            cancel.set()
+
+    optimizer.pack(cancel_event=cancel, item_cb=item_cb, progress_interval=0)
+    assert optimizer.interrupted == "cancelled"
+    assert len(optimizer.packed_items) == 3
+    assert optimizer.pending_items == {"a": 1, "b": 8}
+    assert _accounted(optimizer) == 12
+    # Нерозглянуті коробки – в кінці unplaced_items, але не серед невдач
+    assert len(optimizer.unplaced_items) == 9
+    assert optimizer.failed_items == {} and optimizer.failed_types == []
+    assert optimizer.space_utilization == pytest.approx(3 * 12.5)
+
+
+def test_past_deadline_packs_nothing_and_reports_why():
+    sink = BufferSink()
+    optimizer = _optimizer(sink)
+    optimizer.pack(deadline=time.time() - 1)
+    assert optimizer.interrupted == "deadline"
+    assert optimizer.packed_items == []
+    assert optimizer.pending_items == {"a": 4, "b": 8}
+    [report] = sink.drain()
+    assert report["interrupted"] == "deadline"
+    assert report["pending_items"] == {"a": 4, "b": 8}
+
+
+def test_cancel_takes_precedence_over_deadline():
+    optimizer = _optimizer()
+    cancel = threading.Event()
+    cancel.set()
+    optimizer.pack(cancel_event=cancel, deadline=time.time() - 1)
+    assert optimizer.interrupted == "cancelled"
+
+
+def test_uninterrupted_pack():
+    optimizer = _optimizer()
+    optimizer.pack(cancel_event=threading.Event(), deadline=time.time() + 60)
+    assert optimizer.interrupted is None
+    assert optimizer.pending_items == {}
+    assert len(optimizer.packed_items) == 12
+
+
+class _CancelAfter:
+    """Подія, що стає встановленою після n перевірок (тобто перед коробкою n + 1)."""
+
+    def __init__(self, n):
+        self.checks = 0
+        self.n = n
+
+    def is_set(self):
+        self.checks += 1
+        return self.checks > self.n
+
+
+def test_every_item_reported_without_throttling():
+    optimizer = _optimizer()
+    progress, records = [], []
+    optimizer.pack(progress_cb=lambda done, total: progress.append((done, total)),
+                   item_cb=records.extend, progress_interval=0)
+    assert progress == [(done, 12) for done in range(13)]
+    assert [r["name"] for r in records] == ["a"] * 4 + ["b"] * 8
+    assert all(r["placed"] and not r["skipped"] for r in records)
+    # Прирости статистики по коробках складаються в загальну
+    for key, total in optimizer.search_stats.items():
+        assert sum(r["stats"][key] for r in records) == total
+
+
+def test_throttled_progress_reports_start_and_end():
+    optimizer = _optimizer()
+    progress, batches = [], []
+    optimizer.pack(progress_cb=lambda done, total: progress.append((done, total)),
+                   item_cb=batches.append, progress_interval=3600)
+    assert progress == [(0, 12), (12, 12)]
+    # Записи накопичуються і приходять однією пачкою
+    assert [len(batch) for batch in batches] == [12]
+
+
+def test_throttled_progress_reports_where_cancel_stopped():
+    optimizer = _optimizer()
+    progress, batches = [], []
+    optimizer.pack(progress_cb=lambda done, total: progress.append((done, total)),
+                   item_cb=batches.append, progress_interval=3600, cancel_event=_CancelAfter(5))
+    assert optimizer.interrupted == "cancelled"
+    assert progress == [(0, 12), (5, 12)]
+    assert [len(batch) for batch in batches] == [5]
@@ -0,0 +1,146 @@
+"""Кеш результатів: ключ запиту, повторне використання та витіснення записів."""
+import threading
+import types
+
+import pytest
+
+import result_cache
+from db import SessionStore
+from optimizer import Container, Item, PackingOptimizer
+from result_cache import ResultCache, request_key
+from result_sink import BufferSink, NullSink
+from scoring import CenterOfGravityPolicy
+
+CONTAINER = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+
+
+def _optimizer(items=None, container=CONTAINER, **options):
+    optimizer = PackingOptimizer(container, result_sink=options.pop("result_sink", NullSink()), **options)
+    for item in items or [Item("box", 300, 200, 400, 2, quantity=5), Item("big", 800, 800, 800, 1, quantity=2)]:
+        optimizer.add_item(item)
+    return optimizer
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "cache.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Керований час кешу: clock.now пересувається вручну."""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(result_cache, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_key_depends_on_request_only():
+    key = request_key(_optimizer())
+    assert request_key(_optimizer()) == key
+    # Потоки пошуку на результат не впливають
+    assert request_key(_optimizer(workers=2)) == key
+
+    changed = [
+        _optimizer([Item("box", 300, 200, 400, 2, quantity=4), Item("big", 800, 800, 800, 1, quantity=2)]),
+        _optimizer([Item("box", 300, 200, 400, 3, quantity=5), Item("big", 800, 800, 800, 1, quantity=2)]),
+        _optimizer(container=Container(width=1000, height=1000, depth=1000, max_weight=500)),
+        _optimizer(grid_size=50),
+        _optimizer(strategy="extreme_points"),
+        _optimizer(scoring=CenterOfGravityPolicy())
+    ]
+    keys = {request_key(optimizer) for optimizer in changed}
+    assert len(keys) == len(changed) and key not in keys
+    assert request_key(_optimizer(), sort_items=False) != key
+
+
+def test_key_changes_with_cache_version(monkeypatch):
+    key = request_key(_optimizer())
+    monkeypatch.setattr(result_cache, "CACHE_VERSION", result_cache.CACHE_VERSION + 1)
+    assert request_key(_optimizer()) != key
+
+
+def test_repeated_request_is_served_from_cache(store):
+    cache = ResultCache(store=store)
+    first = _optimizer()
+    assert cache.pack(first) is False
+
+    sink = BufferSink()
+    progress = []
+    second = _optimizer(result_sink=sink)
+    assert cache.pack(second, progress_cb=lambda done, total: progress.append((done, total))) is True
+    assert second.packed_items == [dict(p, position=tuple(map(float, p['position'])),
+                                        size=tuple(map(float, p['size'])),
+                                        color=pytest.approx(p['color'], abs=1 / 255))
+                                   for p in first.packed_items]
+    assert second.space_utilization == pytest.approx(first.space_utilization)
+    assert second.failed_items == first.failed_items == {"big": 1}
+    assert second.failed_types == first.failed_types
+    assert second.current_weight == pytest.approx(first.current_weight)
+    assert progress == [(7, 7)]
+    # Звіт надсилається лише для справжнього пакування
+    assert sink.drain() == []
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_interrupted_pack_is_not_cached(store):
+    cache = ResultCache(store=store)
+    cancel = threading.Event()
+    cancel.set()
+    optimizer = _optimizer()
+    assert cache.pack(optimizer, cancel_event=cancel) is False
+    assert optimizer.interrupted == "cancelled"
+    assert cache.stats()["entries"] == 0
+
+
+def _put(cache, clock, quantity):
+    clock.now += 1
+    optimizer = _optimizer([Item("box", 100, 100, 100, 1, quantity=quantity)])
+    optimizer.pack()
+    key = request_key(optimizer)
+    cache.put(key, optimizer)
+    return key
+
+
+def test_eviction_by_entries_keeps_recently_used(store, clock):
+    cache = ResultCache(store=store, max_entries=2)
+    first, second = _put(cache, clock, 1), _put(cache, clock, 2)
+    clock.now += 1
+    assert cache.get(first) is not None
+    third = _put(cache, clock, 3)
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_eviction_by_bytes(store, clock):
+    cache = ResultCache(store=store, max_bytes=None)
+    keys = [_put(cache, clock, quantity) for quantity in (1, 2, 3)]
+    sizes = {row["key"]: row["size"] for row in store._query("SELECT key, size FROM result_cache")}
+
+    cache.max_bytes = sizes[keys[2]] + sizes[keys[1]]
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) is None
+    assert cache.stats()["bytes"] == cache.max_bytes
+
+
+def test_expired_entries_are_not_returned(store, clock):
+    cache = ResultCache(store=store, max_age=60)
+    old = _put(cache, clock, 1)
+    clock.now += 30
+    fresh = _put(cache, clock, 2)
+    clock.now += 45
+    assert cache.get(old) is None
+    assert cache.get(fresh) is not None
+    assert cache.evict() == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalid_limits_are_rejected(store):
+    with pytest.raises(ValueError):
+        ResultCache(store=store, max_bytes=-1)
+    with pytest.raises(ValueError):
+        ResultCache(store=store, max_age=0)
+    with pytest.raises(ValueError):
+        ResultCache(store=store, max_entries=-1)
@@ -0,0 +1,94 @@
+"""Приймачі звітів: формат файлів, ротація та приймач за замовчуванням."""
+import json
+
+import numpy as np
+import pytest
+
+import result_sink
+from optimizer import Container, Item, PackingOptimizer
+from result_sink import BufferSink, JsonLinesSink, TextFileSink, get_default_sink, set_default_sink
+
+CONTAINER = {"width": 1000, "height": 1000, "depth": 1000, "max_weight": 500}
+
+
+def _report(n=0, **extra):
+    report = {"timestamp": "2024-01-01T00:00:00", "container": CONTAINER, "duration": 0.5,
+              "space_utilization": 12.5, "total_weight": float(n), "packed_count": n,
+              "packed_summary": {}, "failed_items": {}, "interrupted": None, "pending_items": {}}
+    report.update(extra)
+    return report
+
+
+def test_text_sink_keeps_result_txt_format(tmp_path):
+    path = tmp_path / "result.txt"
+    sink = TextFileSink(str(path))
+    sink.submit(_report(3))
+    sink.submit(_report(interrupted="deadline", pending_items={"a": 2, "b": 1}))
+    sink.flush()
+    text = path.read_text(encoding="utf-8")
+    assert text.count("### Результати Пакування") == 2
+    assert "Розміри контейнера (W x H x D): 1000 x 1000 x 1000 мм" in text
+    assert "Використання контейнера: 12.50%" in text
+    assert "Загальна вага: 3.00 кг" in text
+    assert "Пакування зупинено (deadline), не розглянуто коробок: 3" in text
+    sink.close()
+
+
+def test_json_lines_sink(tmp_path):
+    path = tmp_path / "results.jsonl"
+    sink = JsonLinesSink(str(path))
+    for n in range(5):
+        sink.submit(_report(n, total_weight=np.float64(n)))
+    sink.close()
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["packed_count"] for line in lines] == list(range(5))
+
+
+@pytest.mark.parametrize("backups", [0, 2])
+def test_rotation_by_size(tmp_path, backups):
+    path = tmp_path / "results.jsonl"
+    sink = JsonLinesSink(str(path), max_bytes=1, backups=backups)
+    for n in range(5):
+        sink.submit(_report(n))
+        # Кожна пачка – окремий запис, тож ротація відбувається перед кожним
+        sink.flush()
+    sink.close()
+
+    kept = [path] + [tmp_path / f"results.jsonl.{i}" for i in range(1, backups + 1)]
+    assert all(p.exists() for p in kept)
+    assert not (tmp_path / f"results.jsonl.{backups + 1}").exists()
+    counts = [json.loads(p.read_text(encoding="utf-8"))["packed_count"] for p in kept]
+    assert counts == list(range(4, 4 - len(kept), -1))
+
+
+def test_write_errors_do_not_raise(tmp_path, capsys):
+    sink = TextFileSink(str(tmp_path / "missing" / "result.txt"))
+    sink.submit(_report())
+    sink.flush()
+    sink.close()
+    assert "Не вдалося записати звіт" in capsys.readouterr().out
+
+
+def test_buffer_sink_keeps_last_reports():
+    sink = BufferSink(maxlen=2)
+    for n in range(3):
+        sink.submit(_report(n))
+    assert [r["packed_count"] for r in sink.drain()] == [1, 2]
+    assert sink.drain() == []
+
+
+def test_default_sink_receives_reports(monkeypatch):
+    monkeypatch.setattr(result_sink, "_default_sink", None)
+    buffer = BufferSink()
+    set_default_sink(buffer)
+    assert get_default_sink() is buffer
+
+    optimizer = PackingOptimizer(Container(width=1000, height=1000, depth=1000, max_weight=500))
+    optimizer.add_item(Item("a", 500, 500, 500, 1, quantity=2))
+    optimizer.pack()
+    [report] = buffer.drain()
+    assert report["packed_count"] == 2
+    assert report["packed_summary"] == {"a": {"count": 2, "total_weight": 2.0}}
+    # write_report=False – звіт не надсилається
+    optimizer.pack(write_report=False)
+    assert buffer.drain() == []
@@ -0,0 +1,90 @@
+"""Кеш поворотів коробок і пам'ять невдач під час pack()."""
+import numpy as np
+import pytest
+
+from optimizer import SHARED_ROTATION_CACHE, Container, Item, PackingOptimizer, _RotationCache, create_l_shape
+from result_sink import NullSink
+
+CONTAINER = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+
+
+def _optimizer(container=CONTAINER, **options):
+    return PackingOptimizer(container, result_sink=NullSink(), **options)
+
+
+@pytest.mark.parametrize("dims, count", [((300, 300, 300), 1), ((300, 300, 500), 3), ((200, 300, 500), 6)])
+def test_cuboid_rotations_are_unique(dims, count):
+    rotations = _optimizer().get_rotation_shapes(Item("box", *dims, 1))
+    assert len(rotations) == count
+    assert len({r.dims for r in rotations}) == count
+    assert len(_optimizer().get_rotation_shapes(Item("box", *dims, 1, rotatable=False))) == 1
+
+
+def test_rotations_too_big_for_container_are_dropped():
+    container = Container(width=1000, height=400, depth=1000, max_weight=10 ** 6)
+    rotations = _optimizer(container).get_rotation_shapes(Item("box", 200, 300, 500, 1))
+    assert sorted(r.dims[2] for r in rotations) == [200, 200, 300, 300]
+
+
+def test_custom_shape_rotations_are_unique():
+    rotations = _optimizer().get_rotation_shapes(Item("L", 200, 200, 200, 1, shape=create_l_shape(100)))
+    shapes = {(r.shape.shape, np.ascontiguousarray(r.shape).tobytes()) for r in rotations}
+    assert len(shapes) == len(rotations) > 1
+    assert all(r.cells == 4 for r in rotations)
+
+
+def test_rotations_are_shared_and_read_only():
+    first, second = _optimizer(), _optimizer()
+    rotations = first.get_rotation_shapes(Item("a", 200, 300, 500, 1))
+    # Назва й вага не входять у ключ, а спільний кеш ділиться між оптимізаторами
+    assert second.get_rotation_shapes(Item("b", 200, 300, 500, 7)) is rotations
+    assert first.get_possible_rotations(Item("a", 200, 300, 500, 1)) == [r.shape for r in rotations]
+    with pytest.raises(ValueError):
+        rotations[0].mask[0, 0, 0] = False
+
+    assert _optimizer(grid_size=50).get_rotation_shapes(Item("a", 200, 300, 500, 1)) is not rotations
+    private = _optimizer(shared_rotation_cache=False)
+    SHARED_ROTATION_CACHE.clear()
+    assert private.get_rotation_shapes(Item("c", 100, 200, 700, 1))
+    assert SHARED_ROTATION_CACHE.get(private._rotation_key(Item("c", 100, 200, 700, 1))) is None
+
+
+def test_lru_keeps_recently_used():
+    cache = _RotationCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def _pack_in_order(container, items):
+    optimizer = _optimizer(container)
+    optimizer.items = list(items)
+    optimizer.pack(sort_items=False)
+    return optimizer
+
+
+def test_box_that_can_never_fit_is_skipped():
+    big = Item("big", 1000, 600, 1000, 1)
+    mid = Item("mid", 500, 500, 500, 1)
+    small = Item("small", 100, 100, 100, 1)
+    optimizer = _pack_in_order(CONTAINER, [big, mid, mid, small, mid])
+    # Місце лише зменшується: після першої невдачі решта пропускається навіть після нових розміщень
+    assert [p['name'] for p in optimizer.packed_items] == ["big", "small"]
+    assert optimizer.failed_items == {"mid": 3}
+    assert optimizer.skipped_items == {"mid": 2}
+
+
+def test_box_without_support_is_retried_after_next_placement():
+    container = Container(width=1000, height=300, depth=1000, max_weight=10 ** 6)
+    # Смуга на 20% підлоги; суцільній плиті над нею бракує опори (поріг 30%)
+    strip = Item("strip", 1000, 100, 200, 1, rotatable=False)
+    slab = Item("slab", 1000, 100, 1000, 1, rotatable=False)
+    optimizer = _pack_in_order(container, [strip, slab, slab, strip, slab])
+    # Друга смуга дає 40% опори – третя плита вже лягає
+    assert [p['name'] for p in optimizer.packed_items] == ["strip", "strip", "slab"]
+    assert optimizer.packed_items[-1]['position'][2] == 100
+    assert optimizer.failed_items == {"slab": 2}
+    assert optimizer.skipped_items == {"slab": 1}
@@ -0,0 +1,61 @@
+"""Політики оцінки позицій: вибір кандидата, вбудовані політики та власні."""
+import numpy as np
+import pytest
+
+from optimizer import Container, Item, PackingOptimizer
+from result_sink import NullSink
+from scoring import (POLICIES, CenterOfGravityPolicy, DoorSidePolicy, LowestContactPolicy, ScoringPolicy,
+                     WeightOnBottomPolicy, best_index)
+
+CUBE = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+
+
+def _positions(container, items, scoring, **options):
+    optimizer = PackingOptimizer(container, scoring=scoring, result_sink=NullSink(), **options)
+    optimizer.items = list(items)
+    optimizer.pack(sort_items=False)
+    return [(p['name'], tuple(int(v) for v in p['position'])) for p in optimizer.packed_items]
+
+
+def test_best_index_is_lexicographic_and_stable():
+    assert best_index([np.array([1, 3, 3])]) == 1
+    assert best_index([np.array([2, 2, 1]), np.array([0, 5, 9])]) == 1
+    # Повна рівність – перший кандидат
+    assert best_index([np.array([1, 1]), np.array([4, 4])]) == 0
+
+
+def test_center_of_gravity_centres_a_single_box():
+    assert _positions(CUBE, [Item("a", 200, 200, 200, 1)], CenterOfGravityPolicy()) == [("a", (400, 400, 0))]
+
+
+@pytest.mark.parametrize("door, position", [("y_max", (0, 0, 0)), ("y_min", (0, 800, 0)), ("x_min", (800, 0, 0))])
+def test_door_side_loads_away_from_the_door(door, position):
+    assert _positions(CUBE, [Item("a", 200, 200, 200, 1)], DoorSidePolicy(door)) == [("a", position)]
+
+
+def test_weight_on_bottom_stacks_on_heavier_box():
+    container = Container(width=1000, height=1000, depth=500, max_weight=10 ** 6)
+    items = [Item("light", 500, 500, 500, 1), Item("heavy", 500, 500, 500, 10), Item("mid", 500, 500, 500, 5)]
+    # За замовчуванням середня стала б на легку (перша позиція з рівних)
+    assert _positions(container, items, LowestContactPolicy())[-1] == ("mid", (0, 0, 500))
+    assert _positions(container, items, WeightOnBottomPolicy())[-1] == ("mid", (500, 0, 500))
+
+
+def test_custom_policy():
+    class FarRight(ScoringPolicy):
+        name = "far_right"
+
+        def keys(self, batch):
+            return (batch.x,)
+
+    assert _positions(CUBE, [Item("a", 200, 200, 200, 1)], FarRight()) == [("a", (800, 0, 0))]
+
+
+def test_policy_registry_and_validation():
+    assert set(POLICIES) == {"lowest_contact", "center_of_gravity", "door_side", "weight_on_bottom"}
+    with pytest.raises(ValueError):
+        DoorSidePolicy("roof")
+    with pytest.raises(ValueError):
+        PackingOptimizer(CUBE, scoring=CenterOfGravityPolicy(), engine="heightmap", result_sink=NullSink())
+    with pytest.raises(ValueError):
+        PackingOptimizer(CUBE, scoring=DoorSidePolicy(), coarse_factor=2, result_sink=NullSink())
@@ -0,0 +1,148 @@
+"""
+Усі способи пошуку позиції мають давати ті самі розміщення, що й
+векторний пошук на щільній сітці: скалярний перебір, BitGrid,
+coarse-to-fine та паралельний пошук. Окремо – коробки, менші за крок
+сітки, для всіх рушіїв і стратегій.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import optimizer as optimizer_module
+from batch import load_manifest
+from optimizer import Container, Item, PackingOptimizer, create_l_shape
+from result_sink import NullSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _small_load():
+    container = Container(width=1000, height=600, depth=900, max_weight=10 ** 6)
+    items = [
+        Item("A", 300, 200, 400, 5, quantity=4),
+        Item("B", 200, 300, 200, 3, quantity=5),
+        Item("C", 100, 100, 300, 1, quantity=6, rotatable=False),
+        Item("D", 400, 100, 200, 2, quantity=3),
+        Item("L", 200, 200, 200, 1, quantity=4, shape=create_l_shape(100)),
+        # Менша за крок сітки в одному з вимірів
+        Item("thin", 80, 300, 300, 1, quantity=2)
+    ]
+    return container, items
+
+
+def _manifest_load():
+    return load_manifest(os.path.join(ROOT, "container_with_70_boxes.json"))
+
+
+LOADS = {"small": _small_load, "container_with_70_boxes": _manifest_load}
+
+# Варіанти пошуку, що мають збігатися з векторним пошуком на тій самій сітці
+BACKENDS = {
+    "scalar": dict(search_mode="scalar"),
+    "bitset": dict(occupancy="bitset"),
+    "workers": dict(workers=3),
+    "bitset_workers": dict(occupancy="bitset", workers=2)
+}
+COARSE_BACKENDS = {
+    "coarse": dict(coarse_factor=2),
+    "coarse_bitset": dict(coarse_factor=2, occupancy="bitset"),
+    "coarse_workers": dict(coarse_factor=2, workers=3)
+}
+
+
+def _pack(load, **options):
+    container, items = LOADS[load]()
+    optimizer = PackingOptimizer(container, result_sink=NullSink(), **options)
+    for item in items:
+        optimizer.add_item(item)
+    optimizer.pack()
+    return optimizer
+
+
+def _placements(optimizer):
+    # Колір випадковий, тож порівнюються лише назва, позиція та розмір
+    return [(p['name'], tuple(map(float, p['position'])), tuple(map(float, p['size'])))
+            for p in optimizer.packed_items]
+
+
+@pytest.fixture
+def always_parallel(monkeypatch):
+    # Тестові сітки менші за поріг пулу – примусово вмикаємо пул
+    monkeypatch.setattr(PackingOptimizer, "PARALLEL_MIN_CELLS", 0)
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("load", sorted(LOADS))
+def test_backend_matches_vectorized(load, backend, always_parallel):
+    if load != "small" and backend == "scalar":
+        pytest.skip("скалярний перебір надто повільний для повного маніфесту")
+    reference = _pack(load)
+    other = _pack(load, **BACKENDS[backend])
+    assert _placements(other) == _placements(reference)
+    assert other.failed_items == reference.failed_items
+    assert other.space_utilization == pytest.approx(reference.space_utilization)
+
+
+@pytest.mark.parametrize("backend", sorted(COARSE_BACKENDS))
+def test_coarse_matches_vectorized(backend, always_parallel):
+    reference = _pack("small", grid_size=50)
+    other = _pack("small", grid_size=50, **COARSE_BACKENDS[backend])
+    assert _placements(other) == _placements(reference)
+    assert other.failed_items == reference.failed_items
+
+
+@pytest.mark.parametrize("engine", ["grid", "heightmap"])
+def test_pool_only_above_work_threshold(engine, monkeypatch):
+    container, items = _small_load()
+    items = [item for item in items if item.shape is None]
+    pools = []
+
+    class CountingPool(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(optimizer_module, "ThreadPoolExecutor", CountingPool)
+
+    def pack():
+        optimizer = PackingOptimizer(container, engine=engine, workers=4, result_sink=NullSink())
+        for item in items:
+            optimizer.add_item(item)
+        optimizer.pack()
+        return optimizer
+
+    small = pack()
+    assert pools == []
+    monkeypatch.setattr(PackingOptimizer, "PARALLEL_MIN_CELLS", 0)
+    pooled = pack()
+    assert len(pools) == 1
+    assert _placements(pooled) == _placements(small)
+
+
+@pytest.mark.parametrize("options", [
+    dict(),
+    dict(strategy="extreme_points"),
+    dict(engine="heightmap"),
+    dict(engine="heightmap", strategy="extreme_points"),
+    dict(engine="free_space")
+], ids=["grid", "grid_extreme_points", "heightmap", "heightmap_extreme_points", "free_space"])
+def test_utilization_matches_placements(options):
+    """
+    Коробка менша за крок сітки не займає жодної клітинки: сіткові рушії
+    мають рахувати її невдачею, а не розміщенням, і заповнення має
+    відповідати об'єму справді розміщених коробок.
+    """
+    container = Container(width=1000, height=1000, depth=1000, max_weight=10 ** 6)
+    optimizer = PackingOptimizer(container, result_sink=NullSink(), **options)
+    optimizer.add_item(Item("thin", 80, 300, 300, 1))
+    optimizer.add_item(Item("box", 300, 300, 300, 1, quantity=3))
+    optimizer.pack()
+
+    packed = sum(np.prod(p['size']) for p in optimizer.packed_items)
+    volume = container.width * container.height * container.depth
+    assert optimizer.space_utilization == pytest.approx(packed / volume * 100.0)
+    assert len(optimizer.packed_items) + sum(optimizer.failed_items.values()) == 4
+    if options.get("engine") != "free_space":
+        assert optimizer.failed_items == {"thin": 1}